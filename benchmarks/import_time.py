@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 計測対象のモジュール（CLIとして起動されるスクリプト）
+DEFAULT_MODULES = ['extract_career_graph', 'create_rdf', 'convert_tsv_to_json']
+
+# 起動時に読み込まれてはいけない重いSDK（プロバイダごとに遅延読み込みする）
+LAZY_MODULES = ['anthropic', 'google.generativeai', 'openai', 'tqdm', 'numpy']
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_import_time(module, repeat=3):
+    """
+    python -X importtime でモジュールの読み込み時間を計測する
+
+    Parameters:
+    -----------
+    module : str
+        計測するモジュール名
+    repeat : int
+        計測回数（最小値を採用）
+
+    Returns:
+    --------
+    dict
+        合計時間（ms）、読み込まれたモジュールごとの累積時間、遅延読み込み対象の混入状況
+    """
+    best = None
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{module} の読み込みに失敗しました:\n{completed.stderr[-2000:]}")
+
+        cumulative = {}
+        total_us = 0
+        for line in completed.stderr.splitlines():
+            match = _IMPORTTIME_RE.match(line)
+            if not match:
+                continue
+            name = match.group(4)
+            cumulative[name] = int(match.group(2))
+            # インデントのない行がトップレベルの読み込み
+            if len(match.group(3)) == 1:
+                total_us += int(match.group(2))
+
+        if best is None or total_us < best['total_us']:
+            best = {'total_us': total_us, 'cumulative': cumulative}
+
+    top = sorted(best['cumulative'].items(), key=lambda kv: kv[1], reverse=True)
+    return {
+        'module': module,
+        'total_ms': round(best['total_us'] / 1000, 1),
+        'top_imports_ms': {name: round(us / 1000, 1) for name, us in top[:15]},
+        'eager_heavy_imports': [name for name in LAZY_MODULES if name in best['cumulative']]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='CLIスクリプトの起動時間（import time）を計測')
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES,
+                        help='計測するモジュール名（デフォルト: 3つのスクリプト）')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='計測回数（最小値を採用、デフォルト: 3）')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='計測結果を保存するJSONファイルのパス')
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='extract_career_graph の読み込み時間の上限（超えた場合は終了コード1）')
+
+    args = parser.parse_args()
+
+    results = []
+    for module in args.modules:
+        result = measure_import_time(module, repeat=args.repeat)
+        results.append(result)
+        print(f"{module}: {result['total_ms']} ms")
+        for name, ms in list(result['top_imports_ms'].items())[:5]:
+            print(f"    {name}: {ms} ms")
+        if result['eager_heavy_imports']:
+            print(f"  警告: 起動時に読み込まれている重いモジュール: {', '.join(result['eager_heavy_imports'])}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n計測結果を保存: {args.output}")
+
+    # 回帰の検出：抽出スクリプトが重いSDKを読み込んでいる、または上限を超えた場合
+    regressions = []
+    for result in results:
+        if result['module'] != 'extract_career_graph':
+            continue
+        if result['eager_heavy_imports']:
+            regressions.append(f"重いモジュールを起動時に読み込んでいます: {result['eager_heavy_imports']}")
+        if args.max_ms is not None and result['total_ms'] > args.max_ms:
+            regressions.append(f"読み込み時間 {result['total_ms']} ms が上限 {args.max_ms} ms を超えています")
+
+    if regressions:
+        for message in regressions:
+            print(f"回帰: {message}")
+        sys.exit(1)
@@ -0,0 +1,188 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from synthetic_edcs import generate_synthetic_tsv
+
+# 計測するJSONの形式（拡張子, インデント付きかどうか）。先頭が現在の形式
+RECORD_FORMATS = [
+    ('json', True),
+    ('json', False),
+    ('json.gz', False),
+    ('json.zst', False),
+    ('jsonl', False),
+    ('jsonl.gz', False),
+    ('jsonl.zst', False),
+]
+
+RDF_FORMATS = ['nt', 'nt.gz', 'nt.zst']
+
+
+def _timed(func, repeat):
+    """
+    func を repeat 回実行し、最短の時間（秒）を返す
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_records(records, work_dir, repeat=3):
+    """
+    filtered_data 形式のレコードを各形式で書き込み・読み込みした時間とサイズを計測する
+    """
+    from edcs_index import EdcsIndex
+    from record_io import ResultWriter, iter_json_records, write_json_records
+
+    results = []
+    for extension, pretty in RECORD_FORMATS:
+        path = os.path.join(work_dir, f'records.{extension}')
+        write_s = _timed(lambda: write_json_records(path, records, pretty=pretty), repeat)
+        read_s = _timed(lambda: sum(1 for _ in iter_json_records(path)), repeat)
+
+        # インデックスの作成と、ファイル順のランダムでない参照（RDF生成時の元データ参照に相当）
+        for stale in (path + '.idx.sqlite',):
+            if os.path.exists(stale):
+                os.remove(stale)
+        start = time.perf_counter()
+        with EdcsIndex(path) as index:
+            index_s = time.perf_counter() - start
+            start = time.perf_counter()
+            for record in records:
+                index.get(record['EDCS-ID'])
+            lookup_s = time.perf_counter() - start
+
+        result = {
+            'format': extension + (' (indent=2)' if pretty else ''),
+            'size_bytes': os.path.getsize(path),
+            'write_s': round(write_s, 4),
+            'read_s': round(read_s, 4),
+            'index_s': round(index_s, 4),
+            'lookup_s': round(lookup_s, 4),
+            'index_bytes': os.path.getsize(path + '.idx.sqlite'),
+        }
+
+        # 抽出結果の追記（1件ごとにフラッシュ）
+        if extension.startswith('jsonl'):
+            append_path = os.path.join(work_dir, f'append.{extension}')
+            if os.path.exists(append_path):
+                os.remove(append_path)
+            start = time.perf_counter()
+            writer = ResultWriter(append_path)
+            for record in records:
+                writer.append(record)
+            writer.close()
+            result['append_s'] = round(time.perf_counter() - start, 4)
+            result['append_size_bytes'] = os.path.getsize(append_path)
+
+        results.append(result)
+    return results
+
+
+def bench_rdf(records, work_dir, repeat=3):
+    """
+    碑文のトリプルを各形式の N-Triples で書き込み・読み込みした時間とサイズを計測する
+    """
+    from create_rdf import STREAM_PREFIXES, add_inscription_to_graph
+    from rdf_writer import StreamingRDFWriter, TripleBlock
+    from record_io import open_input
+
+    # トリプルの生成は計測に含めない
+    blocks = []
+    for record in records:
+        block = TripleBlock()
+        with contextlib.redirect_stdout(io.StringIO()):
+            add_inscription_to_graph(block, {'edcs_id': record['EDCS-ID']}, source_row=record)
+        blocks.append((record['EDCS-ID'], block.triples))
+
+    def write(path):
+        with StreamingRDFWriter(path, 'nt', STREAM_PREFIXES) as writer:
+            for edcs_id, triples in blocks:
+                writer.write_block(triples, edcs_id)
+
+    def read(path):
+        with open_input(path) as f:
+            return sum(1 for _ in f)
+
+    results = []
+    for extension in RDF_FORMATS:
+        path = os.path.join(work_dir, f'graph.{extension}')
+        write_s = _timed(lambda: write(path), repeat)
+        read_s = _timed(lambda: read(path), repeat)
+        results.append({
+            'format': extension,
+            'size_bytes': os.path.getsize(path),
+            'write_s': round(write_s, 4),
+            'read_lines_s': round(read_s, 4),
+        })
+    return results
+
+
+def _print_table(title, results):
+    print(f"\n{title}")
+    base = results[0]['size_bytes']
+    for result in results:
+        timings = ' '.join(f"{key}={value:.3f}s" for key, value in result.items() if key.endswith('_s'))
+        print(f"  {result['format']:22s} {result['size_bytes'] / 1e6:8.2f}MB "
+              f"(×{base / result['size_bytes']:.1f}) {timings}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='圧縮・非圧縮のパイプライン成果物の読み書き速度とサイズを計測')
+    parser.add_argument('--rows', '-n', type=int, default=20000,
+                        help='合成コーパスの行数（デフォルト: 20000）')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='計測回数（最短時間を採用、デフォルト: 3）')
+    parser.add_argument('--skip-rdf', action='store_true',
+                        help='N-Triples の計測を省略する')
+    parser.add_argument('--work-dir', type=str, default=None,
+                        help='中間ファイルの置き場所（指定しない場合は一時ディレクトリ）')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='計測結果を保存するJSONファイルのパス')
+
+    args = parser.parse_args()
+
+    from convert_tsv_to_json import normalize_columns
+    import pandas as pd
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir or tmp_dir
+        tsv_path = os.path.join(work_dir, f'synthetic-{args.rows}.tsv')
+        generate_synthetic_tsv(tsv_path, args.rows)
+        records = normalize_columns(pd.read_csv(tsv_path, sep='\t')).to_dict('records')
+
+        print(f"計測中: {len(records)}件")
+        report = {'records': bench_records(records, work_dir, repeat=args.repeat)}
+        _print_table('filtered_data / 抽出結果（JSON）', report['records'])
+        if not args.skip_rdf:
+            report['rdf'] = bench_rdf(records, work_dir, repeat=args.repeat)
+            _print_table('RDF（N-Triples）', report['rdf'])
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'rows': args.rows,
+        **report,
+    }
+    output_path = args.output or os.path.join(BENCH_DIR, 'results',
+                                              f"io_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n計測結果を保存: {output_path}")
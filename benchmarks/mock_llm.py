@@ -0,0 +1,245 @@
+import hashlib
+import json
+import random
+import re
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+
+# 合成碑文に含まれる官職と、抽出結果で使う分類
+_OFFICE_TYPES = {
+    'aed(ilis)': ('aedilis', 'local-administration'),
+    'IIvir': ('duovir', 'local-administration'),
+    'flamen perpetuus': ('flamen', 'local-priesthood'),
+    'decurio': ('decurio', 'local-administration'),
+    'quaestor': ('quaestor', 'local-administration'),
+    'pontifex': ('pontifex', 'local-priesthood'),
+    'trib(unus) mil(itum)': ('tribunus', 'military'),
+    'praef(ectus) coh(ortis)': ('praefectus', 'military'),
+}
+
+_NAME_RE = re.compile(r'([A-Z][a-z]*\([a-z]+\)) ([A-Z][a-z]+) ([A-Z][a-z]+)')
+
+
+# extract_career_graph.py に渡す model_type（MockLLMClient は Anthropic SDK と同じ呼び出し方に対応する）
+MOCK_MODEL_TYPE = 'claude'
+
+# 暴走した出力の末尾に繰り返される文章（JSONの後に説明文を書き続けるモデルの模擬）
+_RUNAWAY_TEXT = "\n\nNote: the inscription above has been analysed according to the instructions. "
+
+
+class MockLLMClient:
+    """
+    ベンチマーク用の決定的なローカルLLM
+
+    プロンプト中の碑文テキストから人物名と官職を拾い、extract_career_graph.py の
+    出力形式に沿ったJSONを返す。応答時間とエラー率を指定できる。
+    Anthropic SDK の client.messages.create() / stream() と同じ呼び出し方に対応するので、
+    process_inscriptions(model_type=MOCK_MODEL_TYPE, client=MockLLMClient()) として渡す。
+
+    Parameters:
+    -----------
+    latency : float
+        1回の呼び出しにかける時間（秒）
+    error_rate : float
+        エラーを返す確率（半分はAPI例外、半分は壊れたJSON）
+    seed : int
+        エラー発生の乱数シード
+    runaway_rate : float
+        JSONの後に出力の上限まで文章を書き続ける確率
+    char_latency : float
+        出力1文字あたりの生成時間（秒）
+    max_output_chars : int
+        出力の上限（文字数、APIの max_tokens に相当）
+    small_error_rate : float
+        小さなモデル（small_model）の結果に語彙外のラベルや存在しない
+        person_id を混ぜる確率（カスケード抽出の計測用）
+    small_model : str, optional
+        小さなモデルのモデル名（extract_career_graph.CASCADE_MODELS[MOCK_MODEL_TYPE]）
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0, runaway_rate=0.0, char_latency=0.0,
+                 max_output_chars=32768, small_error_rate=0.0, small_model=None):
+        self.latency = latency
+        self.small_error_rate = small_error_rate
+        self.small_model = small_model
+        self.error_rate = error_rate
+        self.runaway_rate = runaway_rate
+        self.char_latency = char_latency
+        self.max_output_chars = max_output_chars
+        self.calls = 0
+        self.calls_by_model = {}
+        self.output_chars = 0
+        self._rng = random.Random(seed)
+        self.messages = _MockMessages(self)
+
+    def _respond(self, prompt, model=None):
+        self.calls += 1
+        self.calls_by_model[model] = self.calls_by_model.get(model, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self.error_rate and self._rng.random() < self.error_rate:
+            if self._rng.random() < 0.5:
+                raise RuntimeError("mock API error")
+            return '{"persons": [{"person_id": 0, "person_name": '
+
+        text = prompt.split('Inscription text:\n', 1)[-1].split('\n\n', 1)[0]
+        result = self._extract(text)
+        if model == self.small_model and self.small_error_rate and self._rng.random() < self.small_error_rate:
+            self._degrade(result)
+        response = json.dumps(result, ensure_ascii=False)
+        if self.runaway_rate and self._rng.random() < self.runaway_rate:
+            repeat = (self.max_output_chars - len(response)) // len(_RUNAWAY_TEXT) + 1
+            response = (response + _RUNAWAY_TEXT * repeat)[:self.max_output_chars]
+        return response
+
+    def generate(self, prompt, model=None):
+        response = self._respond(prompt, model)
+        if self.char_latency:
+            time.sleep(self.char_latency * len(response))
+        self.output_chars += len(response)
+        return response
+
+    def stream(self, prompt, chunk_chars=64, model=None):
+        """
+        出力を chunk_chars 文字ずつ返す（途中で close() すると残りは生成しない）
+        """
+        response = self._respond(prompt, model)
+        for start in range(0, len(response), chunk_chars):
+            chunk = response[start:start + chunk_chars]
+            if self.char_latency:
+                time.sleep(self.char_latency * len(chunk))
+            self.output_chars += len(chunk)
+            yield chunk
+
+    def _degrade(self, result):
+        """
+        小さなモデルにありがちな誤り（語彙外のラベル、存在しない person_id）を混ぜる
+        """
+        person = result['persons'][0]
+        if person.get('career_path'):
+            person['career_path'][0]['position_type'] = 'magistrate'
+        else:
+            result['person_relationships'].append({
+                'source_person_id': 0, 'target_person_id': len(result['persons']),
+                'target_community_id': None, 'type': 'family', 'property': 'son',
+                'property_text': '', 'notes': ''
+            })
+
+    def _extract(self, text):
+        digest = int(hashlib.md5(text.encode('utf-8')).hexdigest(), 16)
+        segments = text.split(' / ')
+
+        persons = []
+        current = None
+        for segment in segments:
+            match = _NAME_RE.search(segment.replace('[', '').replace(']', ''))
+            if match:
+                praenomen, nomen, cognomen = match.groups()
+                current = {
+                    'person_id': len(persons),
+                    'person_name': match.group(0),
+                    'person_name_readable': f"{praenomen.split('(')[0]} {nomen} {cognomen}",
+                    'praenomen': praenomen.replace('(', '').replace(')', ''),
+                    'nomen': nomen,
+                    'cognomen': cognomen,
+                    'person_name_normalized': '',
+                    'person_name_link': '',
+                    'social_status': '',
+                    'social_status_evidence': '',
+                    'gender': 'male',
+                    'gender_evidence': nomen,
+                    'ethnicity': 'Roman',
+                    'ethnicity_evidence': 'tria nomina',
+                    'age_at_death': '',
+                    'age_at_death_evidence': '',
+                    'has_career': False,
+                    'career_path': [],
+                    'benefactions': []
+                }
+                persons.append(current)
+                continue
+
+            if current is None:
+                continue
+            for office, (abstract, position_type) in _OFFICE_TYPES.items():
+                if office in segment:
+                    current['has_career'] = True
+                    current['social_status'] = current['social_status'] or 'municipal-magistrate'
+                    current['career_path'].append({
+                        'position': segment,
+                        'position_normalized': abstract,
+                        'position_abstract': abstract,
+                        'position_type': position_type,
+                        'position_description': f"{abstract} (synthetic)",
+                        'order': len(current['career_path']) + 1
+                    })
+                    break
+            if 'de sua pecunia fecit' in segment:
+                current['benefactions'].append({
+                    'benefaction_type': 'construction',
+                    'object': 'opus',
+                    'object_type': 'building',
+                    'object_description': 'synthetic building',
+                    'benefaction_text': segment,
+                    'cost': '',
+                    'notes': 'de sua pecunia'
+                })
+
+        if not persons:
+            persons.append({'person_id': 0, 'person_name': 'Unknown', 'person_name_readable': 'Unknown',
+                            'has_career': False, 'career_path': [], 'benefactions': []})
+
+        communities = []
+        relationships = []
+        if 'coloniae' in text or 'd(ecurionum)' in text:
+            communities.append({
+                'community_id': 0,
+                'community_name': 'colonia',
+                'community_name_normalized': 'colonia',
+                'community_type': 'colonia',
+                'community_description': 'synthetic colony',
+                'evidence': 'coloniae'
+            })
+            relationships.append({
+                'source_person_id': 0, 'target_person_id': None, 'target_community_id': 0,
+                'type': 'affiliation', 'property': 'citizen', 'property_text': 'coloniae', 'notes': ''
+            })
+        for idx in range(1, len(persons)):
+            relationships.append({
+                'source_person_id': 0, 'target_person_id': idx, 'target_community_id': None,
+                'type': 'family' if digest % 2 else 'colleague',
+                'property': 'father' if digest % 2 else 'colleague',
+                'property_text': persons[idx]['person_name'], 'notes': ''
+            })
+
+        return {
+            'persons': persons,
+            'communities': communities,
+            'person_relationships': relationships,
+            'notes': 'synthetic extraction'
+        }
+
+
+class _MockMessages:
+    """
+    Anthropic SDK の client.messages のうち、抽出で使う create() と stream() を模したもの
+    """
+
+    def __init__(self, llm):
+        self._llm = llm
+
+    def create(self, model=None, max_tokens=None, temperature=None, messages=()):
+        text = self._llm.generate(messages[-1]['content'], model=model)
+        return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+    @contextmanager
+    def stream(self, model=None, max_tokens=None, temperature=None, messages=()):
+        chunks = self._llm.stream(messages[-1]['content'], model=model)
+        try:
+            yield SimpleNamespace(text_stream=chunks)
+        finally:
+            # 途中で抜けた場合は残りを生成しない
+            chunks.close()
@@ -0,0 +1,174 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from synthetic_edcs import generate_synthetic_tsv
+
+
+def build_results(rows, work_dir, compact=False):
+    """
+    合成コーパスに対する抽出結果（process_inscriptions が .json で保持する形式）をJSON Linesで作る
+    """
+    import pandas as pd
+    from career_schema import add_legacy_fields
+    from convert_tsv_to_json import normalize_columns
+    from mock_llm import MockLLMClient
+
+    tsv_path = os.path.join(work_dir, f'synthetic-{rows}.tsv')
+    generate_synthetic_tsv(tsv_path, rows)
+    records = normalize_columns(pd.read_csv(tsv_path, sep='\t')).to_dict('records')
+
+    client = MockLLMClient()
+    results_path = os.path.join(work_dir, f'results-{rows}.jsonl')
+    with open(results_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            result = client._extract(record.get('inscription') or '')
+            result['edcs_id'] = record['EDCS-ID']
+            if not compact:
+                result = add_legacy_fields(result)
+                result['original_data'] = record
+            f.write(json.dumps(result, ensure_ascii=False) + '\n')
+    return results_path
+
+
+def _load(path, convert):
+    with open(path, encoding='utf-8') as f:
+        return [convert(json.loads(line)) for line in f]
+
+
+def measure_memory(path, convert):
+    """
+    全件をメモリに保持したときの確保量（tracemalloc）と読み込み時間を計測する
+    """
+    gc.collect()
+    tracemalloc.start()
+    records = _load(path, convert)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    gc.collect()
+
+    start = time.perf_counter()
+    records = _load(path, convert)
+    load_s = time.perf_counter() - start
+    return records, current, peak, load_s
+
+
+def _count_position_types_dict(records):
+    counts = {}
+    for record in records:
+        for person in record.get('persons', []):
+            for position in person.get('career_path', []):
+                position_type = position.get('position_type')
+                counts[position_type] = counts.get(position_type, 0) + 1
+    return counts
+
+
+def _count_position_types_model(records):
+    counts = {}
+    for record in records:
+        for person in record.persons or ():
+            for position in person.career_path or ():
+                position_type = position.position_type
+                counts[position_type] = counts.get(position_type, 0) + 1
+    return counts
+
+
+def _timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench(path, repeat=3):
+    from career_model import Inscription
+
+    dicts, dict_bytes, dict_peak, dict_load_s = measure_memory(path, lambda record: record)
+    models, model_bytes, model_peak, model_load_s = measure_memory(path, Inscription.from_dict)
+    count = len(dicts)
+
+    if [model.to_dict() for model in models] != dicts:
+        raise AssertionError("Inscription.to_dict() が元の辞書と一致しません")
+    if _count_position_types_dict(dicts) != _count_position_types_model(models):
+        raise AssertionError("属性アクセスの集計が辞書の集計と一致しません")
+
+    return {
+        'inscriptions': count,
+        'dict': {
+            'bytes_per_inscription': round(dict_bytes / count),
+            'peak_mb': round(dict_peak / 1e6, 1),
+            'load_s': round(dict_load_s, 4),
+            'scan_s': round(_timed(lambda: _count_position_types_dict(dicts), repeat), 4),
+            'dump_s': round(_timed(lambda: [json.dumps(record, ensure_ascii=False) for record in dicts], 1), 4),
+        },
+        'model': {
+            'bytes_per_inscription': round(model_bytes / count),
+            'peak_mb': round(model_peak / 1e6, 1),
+            'load_s': round(model_load_s, 4),
+            'scan_s': round(_timed(lambda: _count_position_types_model(models), repeat), 4),
+            'dump_s': round(_timed(lambda: [json.dumps(model.to_dict(), ensure_ascii=False)
+                                            for model in models], 1), 4),
+        },
+    }
+
+
+def _print_report(title, result):
+    dict_result, model_result = result['dict'], result['model']
+    print(f"\n{title}（{result['inscriptions']}件）")
+    for key, label in (('bytes_per_inscription', '1件あたりのメモリ (B)'), ('peak_mb', '読み込み時のピーク (MB)'),
+                       ('load_s', '読み込み (s)'), ('scan_s', 'position_type の集計 (s)'),
+                       ('dump_s', 'JSONへの書き出し (s)')):
+        ratio = dict_result[key] / model_result[key] if model_result[key] else float('nan')
+        print(f"  {label:28s} 辞書 {dict_result[key]:>10}  モデル {model_result[key]:>10}  (×{ratio:.2f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='抽出結果の辞書表現と career_model の表現のメモリと処理時間を比較')
+    parser.add_argument('--rows', '-n', type=int, default=50000,
+                        help='合成コーパスの行数（デフォルト: 50000）')
+    parser.add_argument('--repeat', '-r', type=int, default=3,
+                        help='集計の計測回数（最短時間を採用、デフォルト: 3）')
+    parser.add_argument('--work-dir', type=str, default=None,
+                        help='中間ファイルの置き場所（指定しない場合は一時ディレクトリ）')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='計測結果を保存するJSONファイルのパス')
+
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir or tmp_dir
+        for name, compact, title in (('full', False, '旧形式（元データ付き）'), ('compact', True, 'コンパクト形式')):
+            path = build_results(args.rows, work_dir, compact=compact)
+            report[name] = bench(path, repeat=args.repeat)
+            _print_report(title, report[name])
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'rows': args.rows,
+        **report,
+    }
+    output_path = args.output or os.path.join(BENCH_DIR, 'results',
+                                              f"model_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n計測結果を保存: {output_path}")
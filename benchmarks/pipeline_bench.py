@@ -0,0 +1,294 @@
+import argparse
+import contextlib
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from synthetic_edcs import generate_synthetic_tsv
+
+
+def _stage_convert(tsv_path, json_path):
+    from convert_tsv_to_json import convert_tsv_to_json
+    inscriptions, _ = convert_tsv_to_json(tsv_path, json_path)
+    return {'rows': len(inscriptions)}
+
+
+def _stage_extract(json_path, career_path, latency, error_rate, checkpoint_interval, compact,
+                   stream=False, runaway_rate=0.0, char_latency=0.0, cascade=False, small_error_rate=0.0):
+    import record_io
+    from extract_career_graph import CASCADE_MODELS, process_inscriptions
+    from mock_llm import MOCK_MODEL_TYPE, MockLLMClient
+
+    # チェックポイント（結果ファイルへの書き込み）にかかった時間を計測する
+    checkpoint_time = [0.0]
+
+    def timed(method):
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                checkpoint_time[0] += time.perf_counter() - start
+        return wrapper
+
+    record_io.ResultWriter.append = timed(record_io.ResultWriter.append)
+    record_io.ResultWriter.flush = timed(record_io.ResultWriter.flush)
+
+    client = MockLLMClient(latency=latency, error_rate=error_rate, runaway_rate=runaway_rate,
+                           char_latency=char_latency, small_error_rate=small_error_rate,
+                           small_model=CASCADE_MODELS[MOCK_MODEL_TYPE])
+    stats = process_inscriptions(json_path, career_path, model_type=MOCK_MODEL_TYPE, client=client,
+                                 limit=None, checkpoint_interval=checkpoint_interval,
+                                 show_progress=False, compact=compact, stream=stream, cascade=cascade)
+    return {
+        'inscriptions': stats['total'],
+        'processed': stats['processed'],
+        'errors': stats['errors'],
+        'llm_calls': client.calls,
+        'llm_output_chars': client.output_chars,
+        'llm_calls_by_model': {str(model): count for model, count in client.calls_by_model.items()},
+        'cascade': stats.get('cascade'),
+        'checkpoint_s': round(checkpoint_time[0], 4)
+    }
+
+
+def _stage_rdf(career_path, rdf_path, rdf_format, source_path):
+    from create_rdf import create_rdf_graph
+    stats = create_rdf_graph(career_path, rdf_path, format=rdf_format, source_path=source_path)
+    return {'inscriptions': stats['inscriptions'], 'triples': stats['triples']}
+
+
+def _stage_pipeline(json_path, career_path, rdf_path, rdf_format, latency, error_rate, checkpoint_interval,
+                    compact, stream=False, runaway_rate=0.0, char_latency=0.0, cascade=False, small_error_rate=0.0):
+    from extract_career_graph import CASCADE_MODELS
+    from mock_llm import MOCK_MODEL_TYPE, MockLLMClient
+    from rdf_pipeline import run_pipeline
+
+    client = MockLLMClient(latency=latency, error_rate=error_rate, runaway_rate=runaway_rate,
+                           char_latency=char_latency, small_error_rate=small_error_rate,
+                           small_model=CASCADE_MODELS[MOCK_MODEL_TYPE])
+    stats = run_pipeline(json_path, career_path, rdf_path, model_type=MOCK_MODEL_TYPE, format=rdf_format,
+                         client=client,
+                         limit=None, checkpoint_interval=checkpoint_interval, show_progress=False,
+                         compact=compact, stream=stream, cascade=cascade)
+    return {
+        'inscriptions': stats['inscriptions'],
+        'triples': stats['triples'],
+        'first_triple_s': round(stats['first_triple_s'], 4) if stats['first_triple_s'] is not None else None,
+    }
+
+
+STAGES = {
+    'convert': _stage_convert,
+    'extract': _stage_extract,
+    'rdf': _stage_rdf,
+    'pipeline': _stage_pipeline,
+}
+
+# 計測前に読み込んでおくモジュール（import時間をステージの時間に含めないため）
+STAGE_MODULES = {
+    'convert': ['convert_tsv_to_json'],
+    'extract': ['extract_career_graph', 'mock_llm', 'tqdm'],
+    'rdf': ['create_rdf'],
+    'pipeline': ['rdf_pipeline', 'mock_llm', 'tqdm'],
+}
+
+
+def _child(stage, kwargs, queue):
+    """
+    子プロセスで1ステージを実行し、時間とピークメモリを返す
+    """
+    try:
+        for module in STAGE_MODULES[stage]:
+            importlib.import_module(module)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            metrics = STAGES[stage](**kwargs)
+            metrics['wall_s'] = round(time.perf_counter() - wall_start, 4)
+            metrics['cpu_s'] = round(time.process_time() - cpu_start, 4)
+        # Linuxでは ru_maxrss はKB単位
+        metrics['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        queue.put(metrics)
+    except Exception as e:
+        queue.put({'error': repr(e)})
+        raise
+
+
+def run_stage(stage, **kwargs):
+    """
+    ステージを別プロセスで実行する（ピークメモリをステージごとに計測するため）
+    """
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_child, args=(stage, kwargs, queue))
+    process.start()
+    metrics = queue.get()
+    process.join()
+    if 'error' in metrics:
+        raise RuntimeError(f"{stage} ステージが失敗しました: {metrics['error']}")
+    return metrics
+
+
+def run_pipeline_benchmark(rows, work_dir, latency=0.0, error_rate=0.0, checkpoint_interval=10,
+                           output_format='jsonl', compact=True, rdf_format='nt', seed=0,
+                           stream=False, runaway_rate=0.0, char_latency=0.0, cascade=False, small_error_rate=0.0,
+                           pipelined=False):
+    """
+    合成コーパスで convert → extract → rdf の各ステージを計測する
+
+    pipelined=True の場合は、抽出とRDF生成を並行して行う場合（rdf_pipeline）も計測する
+
+    Returns:
+    --------
+    dict
+        ステージごとの計測結果とスループット
+    """
+    tsv_path = os.path.join(work_dir, f'synthetic-{rows}.tsv')
+    json_path = os.path.join(work_dir, f'synthetic-{rows}.json')
+    career_path = os.path.join(work_dir, f'synthetic-{rows}_career.{output_format}')
+    rdf_path = os.path.join(work_dir, f'synthetic-{rows}.{rdf_format}')
+
+    generate_synthetic_tsv(tsv_path, rows, seed=seed)
+    # 前回の抽出結果が残っていると再開扱いになるため削除しておく
+    for stale in (career_path, career_path + '.idx.sqlite'):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    convert = run_stage('convert', tsv_path=tsv_path, json_path=json_path)
+    extract = run_stage('extract', json_path=json_path, career_path=career_path, latency=latency,
+                        error_rate=error_rate, checkpoint_interval=checkpoint_interval, compact=compact,
+                        stream=stream, runaway_rate=runaway_rate, char_latency=char_latency,
+                        cascade=cascade, small_error_rate=small_error_rate)
+    rdf = run_stage('rdf', career_path=career_path, rdf_path=rdf_path, rdf_format=rdf_format,
+                    source_path=json_path if compact else None)
+
+    convert['rows_per_s'] = round(convert['rows'] / convert['wall_s'], 1)
+    extract['inscriptions_per_s'] = round(extract['inscriptions'] / extract['wall_s'], 1)
+    extract['checkpoint_share'] = round(extract['checkpoint_s'] / extract['wall_s'], 4)
+    rdf['triples_per_s'] = round(rdf['triples'] / rdf['wall_s'], 1)
+    stages = {'convert': convert, 'extract': extract, 'rdf': rdf}
+
+    if pipelined:
+        from rdf_pipeline import PIPELINE_FORMATS
+        pipeline_career_path = os.path.join(work_dir, f'synthetic-{rows}_pipeline_career.{output_format}')
+        pipeline_format = rdf_format if rdf_format in PIPELINE_FORMATS else 'nt'
+        for stale in (pipeline_career_path, pipeline_career_path + '.idx.sqlite'):
+            if os.path.exists(stale):
+                os.remove(stale)
+        pipeline = run_stage('pipeline', json_path=json_path, career_path=pipeline_career_path,
+                             rdf_path=os.path.join(work_dir, f'synthetic-{rows}_pipeline.{pipeline_format}'),
+                             rdf_format=pipeline_format, latency=latency, error_rate=error_rate,
+                             checkpoint_interval=checkpoint_interval, compact=compact, stream=stream,
+                             runaway_rate=runaway_rate, char_latency=char_latency, cascade=cascade,
+                             small_error_rate=small_error_rate)
+        pipeline['inscriptions_per_s'] = round(pipeline['inscriptions'] / pipeline['wall_s'], 1)
+        # 逐次実行では最初のトリプルは抽出が全件終わった後に出る
+        pipeline['sequential_wall_s'] = round(extract['wall_s'] + rdf['wall_s'], 4)
+        pipeline['sequential_first_triple_s'] = extract['wall_s']
+        stages['pipeline'] = pipeline
+
+    return {
+        'rows': rows,
+        'file_sizes_bytes': {
+            'tsv': os.path.getsize(tsv_path),
+            'filtered_json': os.path.getsize(json_path),
+            'career': os.path.getsize(career_path),
+            'rdf': os.path.getsize(rdf_path),
+        },
+        'stages': stages
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='合成EDCSコーパスとモックLLMによるパイプライン全体のベンチマーク')
+    parser.add_argument('--sizes', '-n', type=int, nargs='+', default=[1000, 10000],
+                        help='合成コーパスの行数（例: 1000 10000 100000、デフォルト: 1000 10000）')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='モックLLMの1回あたりの応答時間（秒、デフォルト: 0）')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='モックLLMのエラー率（デフォルト: 0）')
+    parser.add_argument('--stream', action='store_true',
+                        help='モックLLMをストリーミングで呼び出し、JSONが閉じた時点で打ち切る')
+    parser.add_argument('--runaway-rate', type=float, default=0.0,
+                        help='モックLLMがJSONの後に上限まで文章を書き続ける確率（デフォルト: 0）')
+    parser.add_argument('--char-latency', type=float, default=0.0,
+                        help='モックLLMの出力1文字あたりの生成時間（秒、デフォルト: 0）')
+    parser.add_argument('--cascade', action='store_true',
+                        help='小さなモデル（CASCADE_MODELS）で抽出し、検査で問題のある碑文のみ上位モデルで抽出し直す')
+    parser.add_argument('--small-error-rate', type=float, default=0.0,
+                        help='小さなモデルの結果に誤りを混ぜる確率（デフォルト: 0）')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='抽出とRDF生成を並行して行う場合（rdf_pipeline）も計測する')
+    parser.add_argument('--checkpoint-interval', type=int, default=10,
+                        help='抽出結果のチェックポイント間隔（デフォルト: 10）')
+    parser.add_argument('--output-format', choices=['json', 'jsonl'], default='jsonl',
+                        help='抽出結果の形式（デフォルト: jsonl）')
+    parser.add_argument('--legacy', action='store_true',
+                        help='コンパクト形式ではなく旧形式（original_data付き）で抽出結果を出力する')
+    parser.add_argument('--rdf-format', type=str, default='nt',
+                        choices=['turtle', 'xml', 'n3', 'nt', 'json-ld'],
+                        help='RDFのシリアライゼーション形式（デフォルト: nt）')
+    parser.add_argument('--work-dir', type=str, default=None,
+                        help='中間ファイルの置き場所（指定しない場合は一時ディレクトリ）')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='計測結果を保存するJSONファイルのパス')
+
+    args = parser.parse_args()
+
+    config = {
+        'latency': args.latency,
+        'error_rate': args.error_rate,
+        'checkpoint_interval': args.checkpoint_interval,
+        'output_format': args.output_format,
+        'compact': not args.legacy,
+        'rdf_format': args.rdf_format,
+        'stream': args.stream,
+        'runaway_rate': args.runaway_rate,
+        'char_latency': args.char_latency,
+        'cascade': args.cascade,
+        'small_error_rate': args.small_error_rate,
+        'pipelined': args.pipelined,
+    }
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir or tmp_dir
+        for rows in args.sizes:
+            print(f"計測中: {rows}行")
+            run = run_pipeline_benchmark(rows, work_dir, **config)
+            runs.append(run)
+            for stage, metrics in run['stages'].items():
+                rate = {k: v for k, v in metrics.items() if k.endswith('_per_s')}
+                print(f"  {stage:8s} wall={metrics['wall_s']:.2f}s cpu={metrics['cpu_s']:.2f}s "
+                      f"peak={metrics['peak_rss_mb']}MB {rate}")
+            print(f"  チェックポイントの割合: {run['stages']['extract']['checkpoint_share']:.1%}")
+            if 'pipeline' in run['stages']:
+                pipeline = run['stages']['pipeline']
+                print(f"  並行実行: wall={pipeline['wall_s']:.2f}s（逐次 {pipeline['sequential_wall_s']:.2f}s）"
+                      f" 最初のトリプル={pipeline['first_triple_s']}s（逐次 {pipeline['sequential_first_triple_s']:.2f}s）")
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': config,
+        'runs': runs,
+    }
+    output_path = args.output or os.path.join(BENCH_DIR, 'results',
+                                              f"pipeline_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n計測結果を保存: {output_path}")
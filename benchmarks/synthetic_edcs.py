@@ -0,0 +1,146 @@
+import argparse
+import csv
+import os
+import random
+
+
+# data/*.tsv と同じ列構成
+EDCS_COLUMNS = [
+    'EDCS-ID', 'publication', 'province', 'place', 'dating_from', 'dating_to',
+    'date_not_before', 'date_not_after', 'status', 'inscription',
+    'inscription_conservative_cleaning', 'inscription_interpretive_cleaning',
+    'material', 'comment', 'latitude', 'longitude', 'language', 'photo',
+    'partner_link', 'extra_text', 'extra_html', 'raw_dating'
+]
+
+PLACES = [
+    ('Africa proconsularis', 'Oudna, Hr. / Udhnah / Uthina', 36.60005, 10.1820304),
+    ('Africa proconsularis', 'Carthago', 36.8528, 10.3233),
+    ('Africa proconsularis', 'Lepcis Magna', 32.6383, 14.2907),
+    ('Numidia', 'Lambaesis', 35.4883, 6.2564),
+    ('Hispania citerior', 'Tarraco', 41.1189, 1.2445),
+    ('Roma', 'Roma', 41.8933, 12.4829),
+]
+
+PRAENOMINA = ['C(aius)', 'M(arcus)', 'L(ucius)', 'P(ublius)', 'T(itus)', 'Q(uintus)', 'Cn(aeus)', 'Sex(tus)']
+NOMINA = ['Iulius', 'Cornelius', 'Flavius', 'Valerius', 'Aurelius', 'Claudius', 'Sempronius', 'Caecilius']
+COGNOMINA = ['Felix', 'Maximus', 'Saturninus', 'Rogatus', 'Victor', 'Fortunatus', 'Secundus', 'Honoratus']
+OFFICES = ['aed(ilis)', 'IIvir', 'flamen perpetuus', 'decurio', 'quaestor', 'pontifex',
+           'trib(unus) mil(itum) leg(ionis) III Aug(ustae)', 'praef(ectus) coh(ortis)']
+FORMULAE = ['D(is) M(anibus) s(acrum)', 'pius vixit annis {age}', 'h(ic) s(itus) e(st)',
+            'de sua pecunia fecit', 'ob merita', 'patrono coloniae', 'd(ecreto) d(ecurionum) p(ecunia) p(ublica)']
+STATUS_LABELS = ['tituli sepulcrales', 'tituli honorarii', 'ordo decurionum', 'viri', 'mulieres',
+                 'milites', 'tituli operum', 'sacerdotes pagani']
+ROMAN_NUMERALS = ['XX', 'XXV', 'XXX', 'XXXV', 'XL', 'XLV', 'L', 'LX', 'LXX']
+
+
+def _person(rng):
+    return f"{rng.choice(PRAENOMINA)} {rng.choice(NOMINA)} {rng.choice(COGNOMINA)}"
+
+
+def _damage(text, rng):
+    """
+    Leiden記法の欠損・補読をランダムに加える
+    """
+    words = text.split(' ')
+    for idx in range(len(words)):
+        roll = rng.random()
+        if roll < 0.08:
+            words[idx] = '[3]'
+        elif roll < 0.16 and len(words[idx]) > 3:
+            cut = rng.randint(1, len(words[idx]) - 2)
+            words[idx] = f"{words[idx][:cut]}[{words[idx][cut:]}]"
+    return ' '.join(words)
+
+
+def synthetic_inscription(rng):
+    """
+    それらしい碑文テキストを1件生成する
+    """
+    parts = []
+    for _ in range(rng.randint(1, 3)):
+        parts.append(_person(rng))
+        parts.extend(rng.sample(OFFICES, rng.randint(0, 3)))
+    parts.extend(f.format(age=rng.choice(ROMAN_NUMERALS)) for f in rng.sample(FORMULAE, rng.randint(1, 3)))
+    return _damage(' / '.join(parts), rng)
+
+
+def generate_synthetic_tsv(output_path, rows, seed=0, duplicate_rate=0.05):
+    """
+    EDCS形式の合成TSVを生成する
+
+    Parameters:
+    -----------
+    output_path : str
+        出力TSVファイルのパス
+    rows : int
+        生成する行数
+    seed : int
+        乱数シード（同じシードなら同じ内容になる）
+    duplicate_rate : float
+        他の行と同じ碑文テキストを持つ行の割合
+    """
+    rng = random.Random(seed)
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    texts = []
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter='\t', lineterminator='\r\n')
+        writer.writerow(EDCS_COLUMNS)
+        for idx in range(rows):
+            province, place, lat, lon = rng.choice(PLACES)
+            if texts and rng.random() < duplicate_rate:
+                text = rng.choice(texts)
+            else:
+                text = synthetic_inscription(rng)
+                texts.append(text)
+            cleaned = text.replace('[3]', '').replace('[', '').replace(']', '').replace(' / ', ' ')
+            if rng.random() < 0.1:
+                dating_from = dating_to = ''
+                raw_dating = ''
+            else:
+                dating_from = rng.randint(-50, 400)
+                dating_to = dating_from + rng.choice([0, 25, 50, 100, 150])
+                raw_dating = f"{dating_from} to {dating_to}"
+            writer.writerow([
+                f"EDCS-{90000000 + idx}",
+                f"SYN {2000 + idx // 1000}, {idx % 1000:05d}",
+                province,
+                place,
+                dating_from,
+                dating_to,
+                dating_from,
+                dating_to,
+                ';  '.join(rng.sample(STATUS_LABELS, rng.randint(0, 3))),
+                text,
+                cleaned,
+                cleaned,
+                rng.choice(['lapis', 'marmor', '']),
+                '',
+                round(lat + rng.uniform(-0.01, 0.01), 6),
+                round(lon + rng.uniform(-0.01, 0.01), 6),
+                '',
+                '',
+                f"http://db.edcs.eu/epigr/partner.php?s_language=en&param=SYN{idx:06d}",
+                '',
+                '',
+                raw_dating
+            ])
+
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='EDCS形式の合成TSVを生成')
+    parser.add_argument('--rows', '-n', type=int, default=1000,
+                        help='生成する行数（デフォルト: 1000）')
+    parser.add_argument('--output', '-o', type=str, required=True,
+                        help='出力TSVファイルのパス')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='乱数シード（デフォルト: 0）')
+
+    args = parser.parse_args()
+    generate_synthetic_tsv(args.output, args.rows, seed=args.seed)
+    print(f"生成完了: {args.rows}行 → {args.output}")
@@ -0,0 +1,439 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from record_io import iter_json_records
+from edcs_index import EdcsIndex
+from edcs_fields import as_int, dating_century
+
+
+# 経歴の役職として使うキー（空の場合は順に次のキーを使う）
+POSITION_KEYS = ['position_normalized', 'position_abstract', 'position']
+
+_SKIP_NAMES = {'Parse Error', 'Error', 'No Text'}
+
+
+class _Vocabulary:
+    """
+    文字列と整数コードの対応表
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class CareerPaths:
+    """
+    全人物の経歴を整数コードの配列で保持するクラス
+
+    役職・役職の種類・属州は文字列を整数に置き換え（intern）、人物ごとの経歴は
+    CSR形式（offsets[i]:offsets[i + 1] が i 番目の人物の経歴）で1本の配列に並べる。
+
+    Attributes:
+    -----------
+    positions : numpy.ndarray
+        経歴の各段階の役職コード（int32）
+    position_types : numpy.ndarray
+        経歴の各段階の役職の種類のコード（int32）
+    offsets : numpy.ndarray
+        人物ごとの経歴の開始位置（int64、長さは人物数 + 1）
+    provinces : numpy.ndarray
+        人物の碑文の属州コード（int32、不明は -1）
+    centuries : numpy.ndarray
+        人物の碑文の世紀（int32、不明は 0）
+    person_keys : list
+        人物の (EDCS-ID, person_id)
+    position_vocab, type_vocab, province_vocab : list
+        コードに対応する文字列
+    """
+
+    def __init__(self, positions, position_types, offsets, provinces, centuries, person_keys,
+                 position_vocab, type_vocab, province_vocab):
+        self.positions = positions
+        self.position_types = position_types
+        self.offsets = offsets
+        self.provinces = provinces
+        self.centuries = centuries
+        self.person_keys = person_keys
+        self.position_vocab = position_vocab
+        self.type_vocab = type_vocab
+        self.province_vocab = province_vocab
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    @property
+    def person_of_step(self):
+        """
+        経歴の各段階が属する人物のインデックス
+        """
+        return np.repeat(np.arange(len(self), dtype=np.int64), self.lengths)
+
+    @property
+    def rank_of_step(self):
+        """
+        経歴の各段階の人物内での順位（0始まり）
+        """
+        return np.arange(len(self.positions), dtype=np.int64) - np.repeat(self.offsets[:-1], self.lengths)
+
+
+def _position_label(step, position_key):
+    for key in [position_key] + [k for k in POSITION_KEYS if k != position_key]:
+        value = step.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return None
+
+
+def load_career_paths(json_paths, source_path=None, position_key='position_normalized'):
+    """
+    抽出結果から経歴を読み込み、整数コードの配列にまとめる
+
+    Parameters:
+    -----------
+    json_paths : list
+        抽出結果ファイルのパスのリスト（JSON配列または .jsonl）
+    source_path : str, optional
+        元データのファイルパス（コンパクト形式の抽出結果で属州・年代を参照するため）
+    position_key : str
+        役職として使うキー（'position_normalized' または 'position_abstract'）
+
+    Returns:
+    --------
+    CareerPaths
+        経歴の配列
+    """
+    position_vocab = _Vocabulary()
+    type_vocab = _Vocabulary()
+    province_vocab = _Vocabulary()
+    positions = []
+    position_types = []
+    offsets = [0]
+    provinces = []
+    centuries = []
+    person_keys = []
+
+    source_index = EdcsIndex(source_path) if source_path else None
+    try:
+        for json_path in json_paths:
+            for item in iter_json_records(json_path):
+                edcs_id = item.get('edcs_id')
+                persons = [person for person in item.get('persons', []) if person.get('career_path')]
+                if not edcs_id or not persons:
+                    continue
+                row = item.get('original_data')
+                if not row and source_index is not None:
+                    row = source_index.get(edcs_id)
+                row = row or {}
+                province = row.get('province') or ''
+                province_code = province_vocab.code(province) if province else -1
+                century = dating_century(row) or 0
+
+                for person in persons:
+                    if person.get('person_name') in _SKIP_NAMES:
+                        continue
+                    # order の順に並べる（order がない段階は記載順のまま末尾に置く）
+                    steps = sorted(enumerate(person['career_path']),
+                                   key=lambda pair: (as_int(pair[1].get('order')) is None,
+                                                     as_int(pair[1].get('order')) or 0, pair[0]))
+                    count = 0
+                    for _, step in steps:
+                        label = _position_label(step, position_key)
+                        if label is None:
+                            continue
+                        positions.append(position_vocab.code(label))
+                        position_types.append(type_vocab.code(step.get('position_type') or 'other'))
+                        count += 1
+                    if count == 0:
+                        continue
+                    offsets.append(offsets[-1] + count)
+                    provinces.append(province_code)
+                    centuries.append(century)
+                    person_keys.append((edcs_id, person.get('person_id', 0)))
+    finally:
+        if source_index is not None:
+            source_index.close()
+
+    return CareerPaths(
+        positions=np.asarray(positions, dtype=np.int32),
+        position_types=np.asarray(position_types, dtype=np.int32),
+        offsets=np.asarray(offsets, dtype=np.int64),
+        provinces=np.asarray(provinces, dtype=np.int32),
+        centuries=np.asarray(centuries, dtype=np.int32),
+        person_keys=person_keys,
+        position_vocab=position_vocab.values,
+        type_vocab=type_vocab.values,
+        province_vocab=province_vocab.values,
+    )
+
+
+def _ngram_codes(paths, n):
+    """
+    同じ人物の経歴内で連続する n 個の役職コードを (件数, n) の配列で返す
+    """
+    total = len(paths.positions)
+    if total < n:
+        return np.empty((0, n), dtype=np.int32), np.empty(0, dtype=np.int64)
+    start = np.arange(total - n + 1, dtype=np.int64)
+    person = paths.person_of_step
+    valid = person[start] == person[start + n - 1]
+    start = start[valid]
+    grams = np.stack([paths.positions[start + k] for k in range(n)], axis=1)
+    return grams, person[start]
+
+
+def transition_table(paths):
+    """
+    役職の遷移（経歴で連続する2つの役職）の件数と遷移確率
+
+    Returns:
+    --------
+    pandas.DataFrame
+        from_position, to_position, count, probability（from_position からの遷移に占める割合）
+    """
+    grams, _ = _ngram_codes(paths, 2)
+    vocab_size = max(len(paths.position_vocab), 1)
+    keys, counts = np.unique(grams[:, 0].astype(np.int64) * vocab_size + grams[:, 1], return_counts=True)
+    from_codes = keys // vocab_size
+    to_codes = keys % vocab_size
+    outgoing = np.bincount(from_codes, weights=counts, minlength=vocab_size)
+    vocab = np.asarray(paths.position_vocab, dtype=object)
+    table = pd.DataFrame({
+        'from_position': vocab[from_codes],
+        'to_position': vocab[to_codes],
+        'count': counts,
+        'probability': counts / outgoing[from_codes],
+    })
+    return table.sort_values(['count', 'from_position', 'to_position'],
+                             ascending=[False, True, True], ignore_index=True)
+
+
+def transition_matrix(paths):
+    """
+    役職の遷移件数の行列（行: 遷移元、列: 遷移先）を scipy.sparse の CSR 行列で返す
+    """
+    from scipy.sparse import csr_matrix
+
+    grams, _ = _ngram_codes(paths, 2)
+    vocab_size = len(paths.position_vocab)
+    return csr_matrix((np.ones(len(grams), dtype=np.int64), (grams[:, 0], grams[:, 1])),
+                      shape=(vocab_size, vocab_size))
+
+
+def ngram_table(paths, max_n=4, min_support=2):
+    """
+    経歴に頻出する連続部分列（2〜max_n 個の役職の並び）
+
+    Parameters:
+    -----------
+    max_n : int
+        部分列の最大の長さ
+    min_support : int
+        出力する部分列の最小の人物数
+
+    Returns:
+    --------
+    pandas.DataFrame
+        n, sequence（' > ' 区切り）, count（出現回数）, persons（含む人物数）
+    """
+    vocab = np.asarray(paths.position_vocab, dtype=object)
+    frames = []
+    for n in range(2, max_n + 1):
+        grams, person = _ngram_codes(paths, n)
+        if len(grams) == 0:
+            continue
+        unique, inverse, counts = np.unique(grams, axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        # 同じ人物の中で繰り返される部分列は1人として数える
+        pairs = np.unique(np.stack([inverse, person]), axis=1)
+        persons = np.bincount(pairs[0], minlength=len(unique))
+        keep = persons >= min_support
+        if not keep.any():
+            continue
+        frames.append(pd.DataFrame({
+            'n': n,
+            'sequence': [' > '.join(vocab[codes]) for codes in unique[keep]],
+            'count': counts[keep],
+            'persons': persons[keep],
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['n', 'sequence', 'count', 'persons'])
+    return pd.concat(frames, ignore_index=True).sort_values(
+        ['persons', 'n', 'sequence'], ascending=[False, False, True], ignore_index=True)
+
+
+def ordering_table(paths):
+    """
+    役職が経歴のどの段階に現れやすいか（典型的な順序）
+
+    relative_position は経歴の最初を0、最後を1とした位置の平均（1段階だけの経歴は除く）。
+    値の小さい順に並べると、典型的な昇進順になる。
+
+    Returns:
+    --------
+    pandas.DataFrame
+        position, count, mean_rank, relative_position, first_share（経歴の最初に現れる割合）
+    """
+    vocab_size = len(paths.position_vocab)
+    rank = paths.rank_of_step
+    length = np.repeat(paths.lengths, paths.lengths)
+    codes = paths.positions
+
+    count = np.bincount(codes, minlength=vocab_size)
+    mean_rank = np.bincount(codes, weights=rank, minlength=vocab_size) / np.maximum(count, 1)
+    multi = length > 1
+    relative = rank[multi] / (length[multi] - 1)
+    multi_count = np.bincount(codes[multi], minlength=vocab_size)
+    relative_position = np.full(vocab_size, np.nan)
+    np.divide(np.bincount(codes[multi], weights=relative, minlength=vocab_size), multi_count,
+              out=relative_position, where=multi_count > 0)
+    first_share = np.bincount(codes[rank == 0], minlength=vocab_size) / np.maximum(count, 1)
+
+    table = pd.DataFrame({
+        'position': paths.position_vocab,
+        'count': count,
+        'mean_rank': mean_rank,
+        'relative_position': relative_position,
+        'first_share': first_share,
+    })
+    return table.sort_values(['relative_position', 'count'], ascending=[True, False],
+                             na_position='last', ignore_index=True)
+
+
+def breakdown_table(paths, by='province', level='position_type'):
+    """
+    属州別・世紀別の役職（または役職の種類）の件数
+
+    Parameters:
+    -----------
+    by : str
+        'province' または 'century'
+    level : str
+        'position_type' または 'position'
+
+    Returns:
+    --------
+    pandas.DataFrame
+        by の列, level の列, count（経歴の段階数）, persons（人物数）
+    """
+    if by == 'province':
+        group_of_person = paths.provinces
+        group_labels = np.asarray(paths.province_vocab + [''], dtype=object)
+        group_of_person = np.where(group_of_person < 0, len(paths.province_vocab), group_of_person)
+    elif by == 'century':
+        group_of_person = paths.centuries
+        group_labels = None
+    else:
+        raise ValueError(f"未対応の集計単位です: {by}")
+
+    if level == 'position_type':
+        codes, vocab = paths.position_types, paths.type_vocab
+    elif level == 'position':
+        codes, vocab = paths.positions, paths.position_vocab
+    else:
+        raise ValueError(f"未対応の集計対象です: {level}")
+
+    person = paths.person_of_step
+    groups = group_of_person[person].astype(np.int64)
+    vocab_size = max(len(vocab), 1)
+    keys = groups * vocab_size + codes
+    unique, counts = np.unique(keys, return_counts=True)
+    person_pairs = np.unique(np.stack([keys, person]), axis=1)
+    persons = np.unique(person_pairs[0], return_counts=True)[1]
+
+    group_values = unique // vocab_size
+    code_values = unique % vocab_size
+    table = pd.DataFrame({
+        # 世紀が不明（0）の場合は欠損値にする
+        by: group_labels[group_values] if group_labels is not None
+        else pd.array(np.where(group_values == 0, None, group_values), dtype='Int64'),
+        level: np.asarray(vocab, dtype=object)[code_values],
+        'count': counts,
+        'persons': persons,
+    })
+    return table.sort_values([by, 'count'], ascending=[True, False], ignore_index=True)
+
+
+def export_table(table, path):
+    """
+    集計結果を拡張子に応じてCSVまたはParquetで保存する（Parquetは pyarrow が必要）
+    """
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    if path.endswith('.parquet'):
+        table.to_parquet(path, index=False)
+    else:
+        table.to_csv(path, index=False, encoding='utf-8')
+
+
+def run_analytics(paths, output_dir, output_format='csv', max_n=4, min_support=2):
+    """
+    全ての集計を行い、output_dir に保存する
+
+    Returns:
+    --------
+    dict
+        集計名と保存したファイルパス
+    """
+    tables = {
+        'transitions': transition_table(paths),
+        'ngrams': ngram_table(paths, max_n=max_n, min_support=min_support),
+        'ordering': ordering_table(paths),
+        'by_province': breakdown_table(paths, by='province'),
+        'by_century': breakdown_table(paths, by='century'),
+    }
+    saved = {}
+    for name, table in tables.items():
+        path = os.path.join(output_dir, f'{name}.{output_format}')
+        export_table(table, path)
+        saved[name] = path
+    return saved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='抽出した経歴（cursus honorum）の集計')
+    parser.add_argument('inputs', nargs='+',
+                        help='抽出結果ファイルのパス（JSON配列または .jsonl、複数指定可）')
+    parser.add_argument('--source', '-s', type=str, default=None,
+                        help='元データ（filtered_data）のファイルパス（コンパクト形式の入力で属州・年代を参照）')
+    parser.add_argument('--output-dir', '-o', type=str, required=True,
+                        help='集計結果を保存するディレクトリ')
+    parser.add_argument('--format', '-f', type=str, default='csv', choices=['csv', 'parquet'],
+                        help='保存形式（デフォルト: csv）')
+    parser.add_argument('--position-key', type=str, default='position_normalized',
+                        choices=['position_normalized', 'position_abstract'],
+                        help='役職として使うキー（デフォルト: position_normalized）')
+    parser.add_argument('--max-n', type=int, default=4,
+                        help='頻出部分列の最大の長さ（デフォルト: 4）')
+    parser.add_argument('--min-support', type=int, default=2,
+                        help='頻出部分列として出力する最小の人物数（デフォルト: 2）')
+
+    args = parser.parse_args()
+
+    print(f"経歴を読み込み中: {', '.join(args.inputs)}")
+    paths = load_career_paths(args.inputs, source_path=args.source, position_key=args.position_key)
+    print(f"読み込み完了: {len(paths)}人、{len(paths.positions)}段階、役職{len(paths.position_vocab)}種類")
+
+    saved = run_analytics(paths, args.output_dir, output_format=args.format,
+                          max_n=args.max_n, min_support=args.min_support)
+    for name, path in saved.items():
+        print(f"  {name}: {path}")
@@ -0,0 +1,347 @@
+import dataclasses
+import json
+import sys
+from typing import Any
+
+from career_schema import LEGACY_ALIAS_FIELDS, LEGACY_PERSON_FIELDS
+from record_io import COMPACT_SEPARATORS, iter_json_records
+
+
+class _Missing:
+    """
+    元のJSONにキーがなかったことを表す値（to_dict() では出力しない）
+    """
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'MISSING'
+
+    def __bool__(self):
+        return False
+
+
+MISSING = _Missing()
+
+# 元データ（original_data）のうち値の種類が少なく、共有して保持する列
+INTERNED_COLUMNS = {'province', 'place', 'status', 'material', 'language', 'publication'}
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _load_list(values, record_class):
+    if not isinstance(values, list):
+        return values
+    return [record_class.from_dict(value) if isinstance(value, dict) else value for value in values]
+
+
+def _dump_list(values):
+    if not isinstance(values, list):
+        return values
+    return [value.to_dict() if isinstance(value, _Record) else value for value in values]
+
+
+class _Record:
+    """
+    抽出結果の要素の共通処理（辞書との相互変換）
+
+    既知のキーはスロットに、それ以外のキーは extra に保持するので、
+    to_dict(from_dict(d)) は d と同じ内容になる。
+    """
+
+    __slots__ = ()
+
+    # スロットに保持するキー（_record() で設定する）
+    _FIELD_NAMES = ()
+    _FIELD_SET = frozenset()
+    # 値を sys.intern() で共有する統制語彙などのキー
+    _INTERNED = frozenset()
+    # 要素をレコードに変換するリストのキー（キー → クラス）
+    _NESTED = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        values = {}
+        extra = None
+        for key, value in data.items():
+            if key in cls._FIELD_SET:
+                nested = cls._NESTED.get(key)
+                if nested is not None:
+                    value = _load_list(value, nested)
+                elif key in cls._INTERNED:
+                    value = _intern(value)
+                values[key] = value
+            else:
+                if extra is None:
+                    extra = {}
+                extra[_intern(key)] = value
+        return cls(extra=extra, **values)
+
+    def to_dict(self):
+        data = {}
+        for name in self._FIELD_NAMES:
+            value = getattr(self, name)
+            if value is MISSING:
+                continue
+            if name in self._NESTED:
+                value = _dump_list(value)
+            data[name] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+def _record(cls):
+    """
+    __slots__ を持つ dataclass にして、スロットに保持するキーを設定する
+    """
+    cls = dataclasses.dataclass(slots=True)(cls)
+    cls._FIELD_NAMES = tuple(field.name for field in dataclasses.fields(cls) if field.name != 'extra')
+    cls._FIELD_SET = frozenset(cls._FIELD_NAMES)
+    return cls
+
+
+@_record
+class CareerPosition(_Record):
+    """
+    経歴（career_path の要素）
+    """
+    position: Any = MISSING
+    position_normalized: Any = MISSING
+    position_abstract: Any = MISSING
+    position_type: Any = MISSING
+    position_description: Any = MISSING
+    order: Any = MISSING
+    extra: dict = None
+
+    _INTERNED = frozenset({'position_normalized', 'position_abstract', 'position_type'})
+
+
+@_record
+class Benefaction(_Record):
+    """
+    恵与行為（benefactions の要素）
+    """
+    benefaction_type: Any = MISSING
+    object: Any = MISSING
+    object_type: Any = MISSING
+    object_description: Any = MISSING
+    benefaction_text: Any = MISSING
+    cost: Any = MISSING
+    notes: Any = MISSING
+    extra: dict = None
+
+    _INTERNED = frozenset({'benefaction_type', 'object', 'object_type'})
+
+
+@_record
+class Person(_Record):
+    """
+    人物（persons の要素）
+    """
+    person_id: Any = MISSING
+    person_name: Any = MISSING
+    person_name_readable: Any = MISSING
+    praenomen: Any = MISSING
+    nomen: Any = MISSING
+    cognomen: Any = MISSING
+    person_name_normalized: Any = MISSING
+    person_name_link: Any = MISSING
+    social_status: Any = MISSING
+    social_status_evidence: Any = MISSING
+    gender: Any = MISSING
+    gender_evidence: Any = MISSING
+    ethnicity: Any = MISSING
+    ethnicity_evidence: Any = MISSING
+    age_at_death: Any = MISSING
+    age_at_death_evidence: Any = MISSING
+    has_career: Any = MISSING
+    career_path: Any = MISSING
+    benefactions: Any = MISSING
+    extra: dict = None
+
+    _INTERNED = frozenset({'praenomen', 'nomen', 'cognomen', 'social_status', 'gender', 'ethnicity'})
+    _NESTED = {'career_path': CareerPosition, 'benefactions': Benefaction}
+
+
+@_record
+class Community(_Record):
+    """
+    コミュニティ（communities の要素）
+    """
+    community_id: Any = MISSING
+    community_name: Any = MISSING
+    community_name_normalized: Any = MISSING
+    community_type: Any = MISSING
+    community_description: Any = MISSING
+    evidence: Any = MISSING
+    extra: dict = None
+
+    _INTERNED = frozenset({'community_name_normalized', 'community_type'})
+
+
+@_record
+class Relationship(_Record):
+    """
+    人物の関係（person_relationships の要素）
+    """
+    source_person_id: Any = MISSING
+    target_person_id: Any = MISSING
+    target_community_id: Any = MISSING
+    type: Any = MISSING
+    property: Any = MISSING
+    property_text: Any = MISSING
+    notes: Any = MISSING
+    extra: dict = None
+
+    _INTERNED = frozenset({'type', 'property'})
+
+
+class SourceRow:
+    """
+    元データ（original_data）の1行
+
+    列名のタプルと位置の辞書は同じ列構成の行で共有し、各行は値のタプルのみを持つ。
+    """
+
+    __slots__ = ('layout', 'values')
+
+    # 列名のタプル → (列名のタプル, 列名 → 位置)
+    _LAYOUTS = {}
+
+    def __init__(self, layout, values):
+        self.layout = layout
+        self.values = values
+
+    @classmethod
+    def from_dict(cls, row):
+        keys = tuple(row)
+        layout = cls._LAYOUTS.get(keys)
+        if layout is None:
+            keys = tuple(sys.intern(key) for key in keys)
+            layout = (keys, {key: i for i, key in enumerate(keys)})
+            cls._LAYOUTS[keys] = layout
+        values = tuple(_intern(value) if key in INTERNED_COLUMNS else value
+                       for key, value in zip(layout[0], row.values()))
+        return cls(layout, values)
+
+    def get(self, key, default=None):
+        position = self.layout[1].get(key)
+        return default if position is None else self.values[position]
+
+    def to_dict(self):
+        return dict(zip(self.layout[0], self.values))
+
+
+@dataclasses.dataclass(slots=True)
+class Inscription:
+    """
+    1件の碑文の抽出結果
+
+    旧形式のフィールド（最初の人物の複製、main_persons / relationships）が
+    career_schema.add_legacy_fields() で作り直せる内容であれば保持せず、legacy=True と
+    して to_dict() の際に作り直す。元データは SourceRow として保持する。
+
+    結果を多数メモリに保持する処理（ResultWriter の record_type）で使う。create_rdf.py や
+    集計（career_analytics.py、export_tables.py など）は結果を1件ずつ読んで捨てるため、
+    変換の分だけ遅くなるので辞書のまま扱う。
+    """
+    persons: Any = MISSING
+    communities: Any = MISSING
+    person_relationships: Any = MISSING
+    notes: Any = MISSING
+    edcs_id: Any = MISSING
+    original_data: Any = MISSING
+    legacy: bool = False
+    extra: dict = None
+
+    @classmethod
+    def from_dict(cls, data):
+        legacy = _has_derived_legacy_fields(data)
+        extra = None
+        for key, value in data.items():
+            if key in _INSCRIPTION_FIELDS or (legacy and key in _LEGACY_FIELDS):
+                continue
+            if extra is None:
+                extra = {}
+            extra[_intern(key)] = value
+        original_data = data.get('original_data', MISSING)
+        if isinstance(original_data, dict):
+            original_data = SourceRow.from_dict(original_data)
+        return cls(
+            persons=_load_list(data.get('persons', MISSING), Person),
+            communities=_load_list(data.get('communities', MISSING), Community),
+            person_relationships=_load_list(data.get('person_relationships', MISSING), Relationship),
+            notes=data.get('notes', MISSING),
+            edcs_id=data.get('edcs_id', MISSING),
+            original_data=original_data,
+            legacy=legacy,
+            extra=extra,
+        )
+
+    def to_dict(self):
+        data = {}
+        for name in ('persons', 'communities', 'person_relationships'):
+            value = getattr(self, name)
+            if value is not MISSING:
+                data[name] = _dump_list(value)
+        if self.notes is not MISSING:
+            data['notes'] = self.notes
+        if self.edcs_id is not MISSING:
+            data['edcs_id'] = self.edcs_id
+        if self.extra:
+            data.update(self.extra)
+        if self.legacy:
+            first_person = data['persons'][0]
+            for field, default in LEGACY_PERSON_FIELDS.items():
+                data[field] = first_person.get(field, default)
+            data['main_persons'] = data['persons']
+            data['relationships'] = data.get('person_relationships', [])
+        if self.original_data is not MISSING:
+            original_data = self.original_data
+            data['original_data'] = original_data.to_dict() if isinstance(original_data, SourceRow) else original_data
+        return data
+
+
+_INSCRIPTION_FIELDS = frozenset(
+    field.name for field in dataclasses.fields(Inscription) if field.name not in ('legacy', 'extra'))
+_LEGACY_FIELDS = frozenset(LEGACY_PERSON_FIELDS) | frozenset(LEGACY_ALIAS_FIELDS)
+
+
+def _has_derived_legacy_fields(data):
+    """
+    旧形式のフィールドがすべてあり、add_legacy_fields() で作り直した内容と一致するかどうか
+    """
+    persons = data.get('persons')
+    if not isinstance(persons, list) or not persons or not isinstance(persons[0], dict):
+        return False
+    if any(field not in data for field in _LEGACY_FIELDS):
+        return False
+    first_person = persons[0]
+    if any(data[field] != first_person.get(field, default) for field, default in LEGACY_PERSON_FIELDS.items()):
+        return False
+    return data['main_persons'] == persons and data['relationships'] == data.get('person_relationships', [])
+
+
+def loads(text):
+    """
+    JSON文字列（JSON Linesの1行など）から Inscription を作る
+    """
+    return Inscription.from_dict(json.loads(text))
+
+
+def dumps(inscription):
+    """
+    Inscription を空白なしのJSON文字列にする
+    """
+    return json.dumps(inscription.to_dict(), ensure_ascii=False, separators=COMPACT_SEPARATORS)
+
+
+def iter_inscriptions(path):
+    """
+    抽出結果ファイル（JSON配列または .jsonl、圧縮も可）から Inscription を1件ずつ返す
+    """
+    for record in iter_json_records(path):
+        yield Inscription.from_dict(record)
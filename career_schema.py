@@ -0,0 +1,203 @@
+import argparse
+import re
+
+from edcs_index import EdcsIndex
+from extraction_prompt import SOCIAL_STATUS_LABELS
+from record_io import iter_json_records, write_json_records
+
+
+# 旧形式との互換性のため、最初の人物からトップレベルに複製していたフィールド
+LEGACY_PERSON_FIELDS = {
+    'person_name': 'Unknown',
+    'person_name_readable': '',
+    'person_name_normalized': '',
+    'person_name_link': '',
+    'social_status': '',
+    'social_status_evidence': '',
+    'has_career': False,
+    'career_path': [],
+    'benefactions': [],
+}
+
+# 旧形式の別名（persons / person_relationships の複製）
+LEGACY_ALIAS_FIELDS = {
+    'main_persons': 'persons',
+    'relationships': 'person_relationships',
+}
+
+
+# 抽出プロンプトで「この値を正確に使う」と指定している統制語彙
+POSITION_TYPES = {
+    'military', 'imperial-administration', 'provincial-administration', 'local-administration',
+    'imperial-priesthood', 'provincial-priesthood', 'local-priesthood', 'occupation', 'other',
+}
+RELATIONSHIP_TYPES = {'family', 'colleague', 'patronage', 'dedication', 'economic', 'affiliation'}
+BENEFACTION_TYPES = {'construction', 'repair', 'donation', 'games', 'feast', 'statue', 'other'}
+COMMUNITY_TYPES = {
+    'legion', 'cohort', 'ala', 'turma', 'centuria', 'vexillatio', 'classis',
+    'city', 'municipium', 'colonia', 'vicus', 'pagus', 'provincia', 'regio', 'tribus',
+    'collegium', 'sodalitas', 'corpus', 'ordo', 'familia', 'templum',
+    'populus', 'other',
+}
+GENDERS = {'male', 'female', 'unknown'}
+# social_status の標準ラベル（validate_result では検査しない。validate_career_graph.py で検査する）
+SOCIAL_STATUSES = {label for _, labels in SOCIAL_STATUS_LABELS for label, _ in labels}
+
+# 人物が抽出されていなければ不自然とみなす碑文テキストの文字数
+# （補読 [...] と略語の展開 (...) を除いた英字のみを数える。既存の抽出結果で人物が
+# 抽出されていない碑文は、断片的なものばかりで最大33字）
+NONTRIVIAL_TEXT_LETTERS = 40
+
+_RESTORED_TEXT_RE = re.compile(r'\[[^\]]*\]?|\([^)]*\)')
+
+
+def _label_issue(value, vocabulary, field):
+    if value and value not in vocabulary:
+        return f"語彙外の{field}: {value}"
+    return None
+
+
+def is_nontrivial_text(inscription_text):
+    """
+    碑文テキストに人物が抽出されるだけの確かな文字が残っているかどうか
+    """
+    text = _RESTORED_TEXT_RE.sub('', inscription_text or '')
+    return sum(char.isalpha() for char in text) >= NONTRIVIAL_TEXT_LETTERS
+
+
+def validate_result(result, inscription_text=''):
+    """
+    抽出結果の形式と内容を検査し、問題点のリストを返す（問題がなければ空のリスト）
+
+    出力形式（persons などが配列か）、統制語彙（position_type、関係の type、
+    benefaction_type、community_type、gender）、person_id / community_id の参照、
+    十分な長さの碑文から人物が1人も抽出されていないことを検査する。
+    social_status と関係の property は大きなモデルでも語彙外の値を使うことがあるため検査しない。
+    """
+    issues = []
+    persons = result.get('persons')
+    if not persons:
+        if is_nontrivial_text(inscription_text):
+            return ["碑文テキストがあるのに人物が抽出されていません"]
+        return []
+    if not isinstance(persons, list):
+        return ["persons が配列ではありません"]
+    for key in ('communities', 'person_relationships'):
+        if not isinstance(result.get(key, []), list):
+            issues.append(f"{key} が配列ではありません")
+    if issues:
+        return issues
+
+    person_ids = set()
+    for person in persons:
+        if not isinstance(person, dict):
+            return ["persons の要素がオブジェクトではありません"]
+        person_ids.add(person.get('person_id'))
+        issues.append(_label_issue(person.get('gender'), GENDERS, 'gender'))
+        for position in person.get('career_path') or []:
+            issues.append(_label_issue(position.get('position_type'), POSITION_TYPES, 'position_type'))
+        for benefaction in person.get('benefactions') or []:
+            issues.append(_label_issue(benefaction.get('benefaction_type'), BENEFACTION_TYPES,
+                                       'benefaction_type'))
+    if len(person_ids) < len(persons):
+        issues.append("person_id が重複しています")
+
+    community_ids = set()
+    for community in result.get('communities') or []:
+        community_ids.add(community.get('community_id'))
+        issues.append(_label_issue(community.get('community_type'), COMMUNITY_TYPES, 'community_type'))
+
+    for relationship in result.get('person_relationships') or []:
+        issues.append(_label_issue(relationship.get('type'), RELATIONSHIP_TYPES, '関係の type'))
+        if relationship.get('source_person_id') not in person_ids:
+            issues.append(f"存在しない source_person_id: {relationship.get('source_person_id')}")
+        target_person = relationship.get('target_person_id')
+        target_community = relationship.get('target_community_id')
+        if target_person is not None and target_person not in person_ids:
+            issues.append(f"存在しない target_person_id: {target_person}")
+        if target_community is not None and target_community not in community_ids:
+            issues.append(f"存在しない target_community_id: {target_community}")
+
+    # 十分な長さの碑文から人物が抽出されていない
+    if is_nontrivial_text(inscription_text) and all(
+            person.get('person_name') in ('', 'Unknown', None) for person in persons):
+        issues.append("碑文テキストがあるのに人物が抽出されていません")
+
+    return [issue for issue in issues if issue]
+
+
+def add_legacy_fields(result):
+    """
+    抽出結果に旧形式のフィールドを追加する
+
+    personsの最初の人物をトップレベルに複製し、main_persons / relationships を
+    persons / person_relationships の別名として設定する
+    """
+    if result.get('persons') and len(result['persons']) > 0:
+        first_person = result['persons'][0]
+        for field, default in LEGACY_PERSON_FIELDS.items():
+            result[field] = first_person.get(field, default)
+
+        # main_persons形式も生成（RDF生成スクリプトの後方互換性のため）
+        result['main_persons'] = result['persons']
+
+        # person_relationshipsをrelationships形式に変換
+        result['relationships'] = result.get('person_relationships', [])
+
+    return result
+
+
+def compact_result(result):
+    """
+    抽出結果から元データと旧形式の重複フィールドを取り除く
+
+    元データはEDCS-IDでfiltered_dataから参照するため保持しない。
+    personsを持たない結果（No Textなど）は旧形式のフィールドのみで表現されているため、
+    original_data以外はそのまま残す
+    """
+    compact = {k: v for k, v in result.items() if k != 'original_data'}
+    if compact.get('persons'):
+        for field in LEGACY_PERSON_FIELDS:
+            compact.pop(field, None)
+        for field in LEGACY_ALIAS_FIELDS:
+            compact.pop(field, None)
+    return compact
+
+
+def expand_result(result, source_row=None):
+    """
+    コンパクト形式の抽出結果を旧形式（元データ付き）に戻す
+    """
+    expanded = add_legacy_fields(dict(result))
+    if source_row is not None and 'original_data' not in expanded:
+        expanded['original_data'] = source_row
+    return expanded
+
+
+def has_career(result):
+    """
+    抽出結果のいずれかの人物に経歴情報があるかどうか
+    """
+    persons = result.get('persons')
+    if persons:
+        return any(person.get('has_career') for person in persons)
+    return bool(result.get('has_career'))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='コンパクト形式のキャリアJSONを旧形式に変換')
+    parser.add_argument('--input', '-i', type=str, required=True,
+                        help='コンパクト形式のキャリアJSON/JSONLのパス')
+    parser.add_argument('--source', '-s', type=str, required=True,
+                        help='元データ（filtered_data）のJSONファイルのパス')
+    parser.add_argument('--output', '-o', type=str, required=True,
+                        help='旧形式で出力するファイルのパス')
+
+    args = parser.parse_args()
+
+    # 旧形式では元データの全フィールドを埋め込む
+    with EdcsIndex(args.source) as source_index:
+        expanded = [expand_result(record, source_index.get(record.get('edcs_id')))
+                    for record in iter_json_records(args.input)]
+    write_json_records(args.output, expanded)
+    print(f"変換完了: {len(expanded)}件 → {args.output}")
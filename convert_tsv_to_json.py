@@ -1,18 +1,93 @@
 import pandas as pd
-import json
+import numpy as np
+import argparse
 import os
 
+import profiling
+from record_io import write_json_records
+from edcs_fields import DATING_COLUMNS, COORDINATE_COLUMNS
 
-def convert_tsv_to_json(tsv_path, output_path=None):
+
+# statusの区切り（;）で分けた各要素（前後の空白を除く、空要素は含めない）
+_STATUS_ITEM_PATTERN = r'[^;\s](?:[^;]*[^;\s])?'
+
+
+def _nullable(series):
+    """
+    欠損値をNoneにしたobject型の列に変換する（JSONではnullになる）
+    """
+    return series.astype(object).where(series.notna(), None)
+
+
+def normalize_columns(df):
+    """
+    年代・座標・statusの列を型付きの値に正規化し、年代の派生列を追加する
+
+    行ごとのループではなく列単位（pandas/NumPy）で処理する。
+    年代は整数、座標は浮動小数点数、欠損はNone（JSONではnull）になり、
+    それ以外の文字列の列は従来どおり欠損を空文字列にする。
+
+    追加する列:
+        dating_mid : 年代範囲の中央の年（整数）
+        dating_span : 年代範囲の長さ（年）
+        dating_century : 中央の年の世紀（紀元前は負の値、例: -1 は前1世紀）
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        read_csv で読み込んだEDCSのデータ
+
+    Returns:
+    --------
+    pandas.DataFrame
+        JSONにそのまま書き出せる列からなるデータ
+    """
+    typed = {}
+    for column in DATING_COLUMNS:
+        if column in df.columns:
+            typed[column] = pd.to_numeric(df[column], errors='coerce').round().astype('Int64')
+    for column in COORDINATE_COLUMNS:
+        if column in df.columns:
+            typed[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+
+    if 'dating_from' in typed and 'dating_to' in typed:
+        dating_from = typed['dating_from']
+        dating_to = typed['dating_to']
+        mid = (dating_from + dating_to) // 2
+        mid_values = mid.to_numpy(dtype='float64', na_value=np.nan)
+        # 紀元0年はないため、0以下は紀元前の世紀として扱う
+        century = np.where(mid_values > 0,
+                           (mid_values - 1) // 100 + 1,
+                           -(np.maximum(-mid_values - 1, 0) // 100 + 1))
+        typed['dating_mid'] = mid
+        typed['dating_span'] = dating_to - dating_from
+        typed['dating_century'] = pd.Series(century, index=df.index).round().astype('Int64')
+
+    df_clean = df.drop(columns=[column for column in typed if column in df.columns]).fillna('')
+    if 'status' in df_clean.columns:
+        df_clean['status'] = df_clean['status'].astype(str).str.findall(_STATUS_ITEM_PATTERN)
+    for column, series in typed.items():
+        df_clean[column] = _nullable(series)
+
+    # 元の列順を保ち、派生列は末尾に置く
+    ordered = list(df.columns) + [column for column in typed if column not in df.columns]
+    return df_clean[ordered]
+
+
+def convert_tsv_to_json(tsv_path, output_path=None, spatial_index=False, pretty=False):
     """
     TSVファイルをフィルタリングせずにJSON形式に変換する
 
     Parameters:
     -----------
     tsv_path : str
-        TSVファイルのパス
+        TSVファイルのパス（.tsv.gz / .tsv.zst の場合は読みながら展開する）
     output_path : str, optional
-        出力JSONファイルのパス（指定しない場合は自動生成）
+        出力JSONファイルのパス（指定しない場合は自動生成。.gz / .zst で終わる場合は圧縮して保存）
+    spatial_index : bool
+        座標・年代範囲のインデックス（spatial_index.py）を同時に作成するかどうか
+    pretty : bool
+        インデント付きで出力するかどうか（デフォルトは空白なしの区切り文字）
 
     Returns:
     --------
@@ -23,21 +98,14 @@ def convert_tsv_to_json(tsv_path, output_path=None):
     """
     # TSVファイルを読み込む
     print(f"TSVファイルを読み込み中: {tsv_path}")
-    df = pd.read_csv(tsv_path, sep='\t')
+    with profiling.span('read_csv'):
+        df = pd.read_csv(tsv_path, sep='\t')
     print(f"読み込み完了: {len(df)}件")
 
-    # NaN値を空文字列に変換してから辞書のリストとして取得
-    df_clean = df.fillna('')
-    inscriptions = df_clean.to_dict('records')
-
-    # statusフィールドを;で分割してリストに変換
-    for item in inscriptions:
-        if item.get('status'):
-            # ;で分割し、各要素の前後の空白を削除
-            status_list = [s.strip() for s in item['status'].split(';') if s.strip()]
-            item['status'] = status_list
-        else:
-            item['status'] = []
+    with profiling.span('normalize'):
+        # 年代・座標を型付きの値に、statusを;で分割したリストに変換してから辞書のリストとして取得
+        inscriptions = normalize_columns(df).to_dict('records')
+    profiling.count('rows', len(inscriptions))
 
     # 出力ファイルパスを生成
     if output_path is None:
@@ -51,21 +119,48 @@ def convert_tsv_to_json(tsv_path, output_path=None):
 
     # JSONファイルとして保存
     print(f"\nJSONファイルに保存中: {output_path}")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(inscriptions, f, ensure_ascii=False, indent=2)
+    with profiling.span('write_json'):
+        write_json_records(output_path, inscriptions, pretty=pretty)
 
     print(f"変換完了: {len(inscriptions)}件の碑文をJSONに変換しました")
 
+    if spatial_index:
+        from spatial_index import SpatialIndex
+        # 変換済みのデータから作成する（ファイルは読み直さない）
+        with profiling.span('spatial_index'), SpatialIndex(output_path, records=inscriptions) as index:
+            print(f"座標・年代インデックスを作成: {index.index_path}")
+
     return inscriptions, output_path
 
 
 if __name__ == "__main__":
-    # スクリプト内でパスを指定
+    # スクリプト内でパスを指定（コマンドライン引数で上書き可能）
     input_file = 'data/2025-12-26-EDCS_via_Lat_Epig-place_Al-KhumsKhomsHomsLebdahLebidaLabdahWadiZennadWadiazZannadLeptisMagnaLepcisMagnaNeapolis-922.tsv'
     output_file = None  # Noneの場合は自動生成: filtered_data/[basename].json
 
+    parser = argparse.ArgumentParser(description='TSVファイルをJSON形式に変換')
+    parser.add_argument('--input', '-i', type=str, default=input_file,
+                        help='入力TSVファイルのパス')
+    parser.add_argument('--output', '-o', type=str, default=output_file,
+                        help='出力JSONファイルのパス（指定しない場合は自動生成。.gz / .zst で終わる場合は圧縮して保存）')
+    parser.add_argument('--pretty', action='store_true',
+                        help='インデント付きで出力する（デフォルトは空白なしの区切り文字）')
+    parser.add_argument('--spatial-index', action='store_true',
+                        help='座標・年代範囲のインデックスを同時に作成する（spatial_index.py で検索）')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='区間ごとの計測を有効にし、トレース（Chrome Trace形式のJSON）を保存するパス')
+    parser.add_argument('--profiler', type=str, default=None, choices=['cprofile', 'pyinstrument'],
+                        help='--profile と併用し、変換処理全体を詳細にプロファイルする')
+
+    args = parser.parse_args()
+
+    if args.profile:
+        profiling.enable(capture_mode=args.profiler, capture_dir=os.path.dirname(args.profile) or '.')
+
     # 変換実行
-    inscriptions, output_path = convert_tsv_to_json(input_file, output_file)
+    with profiling.capture('convert_tsv_to_json'):
+        inscriptions, output_path = convert_tsv_to_json(args.input, args.output, spatial_index=args.spatial_index,
+                                                         pretty=args.pretty)
 
     # 統計情報を表示
     print("\n" + "=" * 80)
@@ -87,3 +182,6 @@ if __name__ == "__main__":
         print(first_item.get('inscription_interpretive_cleaning', 'N/A')[:200])
         if len(first_item.get('inscription_interpretive_cleaning', '')) > 200:
             print("...")
+
+    if args.profile:
+        profiling.finish(args.profile)
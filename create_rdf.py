@@ -1,529 +1,706 @@
-import json
 import os
 from rdflib import Graph, Namespace, Literal, URIRef, RDF, RDFS, XSD
 from rdflib.namespace import DCTERMS, FOAF, SKOS
 import argparse
 from urllib.parse import quote
 
-def create_rdf_graph(json_path, output_path, format='turtle', pleiades_mapping_path=None):
+import profiling
+from record_io import compression_suffix, iter_json_records, load_json, open_output, strip_compression_suffix
+from rdf_writer import STREAM_FORMATS, StreamingRDFWriter, TripleBlock
+from edcs_index import EdcsIndex
+from edcs_fields import as_float, as_int
+from spatial_index import add_query_arguments, iter_selected_records, query_from_args
+
+# 名前空間の定義
+BASE = Namespace("http://example.org/inscription/")
+EPIG = Namespace("http://example.org/epigraphy/")
+PERSON = Namespace("http://example.org/person/")
+CAREER = Namespace("http://example.org/career/")
+REL = Namespace("http://example.org/relationship/")
+STATUS = Namespace("http://example.org/status/")
+BENEF = Namespace("http://example.org/benefaction/")
+PLACE = Namespace("http://example.org/place/")
+PROVINCE = Namespace("http://example.org/province/")
+RELTYPE = Namespace("http://example.org/relationship-type/")
+COMMUNITY = Namespace("http://example.org/community/")
+COMMTYPE = Namespace("http://example.org/community-type/")
+PRAENOMEN = Namespace("http://example.org/praenomen/")
+NOMEN = Namespace("http://example.org/nomen/")
+COGNOMEN = Namespace("http://example.org/cognomen/")
+
+
+# 出力に使う名前空間の接頭辞
+NAMESPACE_PREFIXES = [
+    ("base", BASE),
+    ("epig", EPIG),
+    ("person", PERSON),
+    ("career", CAREER),
+    ("rel", REL),
+    ("status", STATUS),
+    ("benef", BENEF),
+    ("place", PLACE),
+    ("province", PROVINCE),
+    ("reltype", RELTYPE),
+    ("community", COMMUNITY),
+    ("commtype", COMMTYPE),
+    ("praenomen", PRAENOMEN),
+    ("nomen", NOMEN),
+    ("cognomen", COGNOMEN),
+    ("dcterms", DCTERMS),
+    ("foaf", FOAF),
+    ("skos", SKOS),
+]
+
+# ストリーミング出力で宣言する接頭辞（rdflib が既定で登録する rdf / rdfs / xsd を含む）
+STREAM_PREFIXES = [("rdf", RDF), ("rdfs", RDFS), ("xsd", XSD)] + NAMESPACE_PREFIXES
+
+# 統計情報として種類ごとの件数を表示するクラス
+STATS_TYPES = [
+    ('人物数', FOAF.Person),
+    ('コミュニティ数', EPIG.Community),
+    ('碑文数', EPIG.Inscription),
+    ('経歴位置数', EPIG.CareerPosition),
+    ('恵与行為数', EPIG.Benefaction),
+    ('関係性数', EPIG.Relationship),
+]
+
+
+def bind_namespaces(g):
     """
-    JSONファイルから碑文のRDFグラフを作成する
+    グラフに名前空間の接頭辞を登録する
+    """
+    for prefix, namespace in NAMESPACE_PREFIXES:
+        g.bind(prefix, namespace)
+
+
+def add_inscription_to_graph(g, item, pleiades_mapping=None, source_row=None):
+    """
+    1件分の碑文データ（抽出結果）のトリプルをグラフに追加する
 
     Parameters:
     -----------
-    json_path : str
-        入力JSONファイルのパス
-    output_path : str
-        出力RDFファイルのパス
-    format : str
-        RDFのシリアライゼーション形式 ('turtle', 'xml', 'n3', 'nt', 'json-ld')
-    pleiades_mapping_path : str, optional
-        地名とPleiades IDの対応表ファイルパス（JSON形式）
+    g : rdflib.Graph
+        追加先のグラフ
+    item : dict
+        extract_career_graph.py が出力した1件分の抽出結果
+    pleiades_mapping : dict or PleiadesMatcher, optional
+        地名とPleiades IDの対応表
+    source_row : dict, optional
+        元データ（コンパクト形式の抽出結果でoriginal_dataを持たない場合に使用）
+
+    Returns:
+    --------
+    bool
+        Pleiades IDを追加した場合はTrue
     """
-    # 名前空間の定義
-    BASE = Namespace("http://example.org/inscription/")
-    EPIG = Namespace("http://example.org/epigraphy/")
-    PERSON = Namespace("http://example.org/person/")
-    CAREER = Namespace("http://example.org/career/")
-    REL = Namespace("http://example.org/relationship/")
-    STATUS = Namespace("http://example.org/status/")
-    BENEF = Namespace("http://example.org/benefaction/")
-    PLACE = Namespace("http://example.org/place/")
-    PROVINCE = Namespace("http://example.org/province/")
-    RELTYPE = Namespace("http://example.org/relationship-type/")
-    COMMUNITY = Namespace("http://example.org/community/")
-    COMMTYPE = Namespace("http://example.org/community-type/")
-    PRAENOMEN = Namespace("http://example.org/praenomen/")
-    NOMEN = Namespace("http://example.org/nomen/")
-    COGNOMEN = Namespace("http://example.org/cognomen/")
-
-    # グラフの作成
-    g = Graph()
-    g.bind("base", BASE)
-    g.bind("epig", EPIG)
-    g.bind("person", PERSON)
-    g.bind("career", CAREER)
-    g.bind("rel", REL)
-    g.bind("status", STATUS)
-    g.bind("benef", BENEF)
-    g.bind("place", PLACE)
-    g.bind("province", PROVINCE)
-    g.bind("reltype", RELTYPE)
-    g.bind("community", COMMUNITY)
-    g.bind("commtype", COMMTYPE)
-    g.bind("praenomen", PRAENOMEN)
-    g.bind("nomen", NOMEN)
-    g.bind("cognomen", COGNOMEN)
-    g.bind("dcterms", DCTERMS)
-    g.bind("foaf", FOAF)
-    g.bind("skos", SKOS)
+    pleiades_mapping = pleiades_mapping or {}
+    pleiades_added = False
+    edcs_id = item.get('edcs_id', 'Unknown')
+
+    # 碑文のURIを作成
+    inscription_uri = BASE[edcs_id]
+
+    # 碑文の基本情報
+    g.add((inscription_uri, RDF.type, EPIG.Inscription))
+    g.add((inscription_uri, DCTERMS.identifier, Literal(edcs_id)))
+
+    # 元データから追加情報を取得
+    original_data = item.get('original_data') or source_row or {}
+
+    if original_data.get('province'):
+        province_name = original_data['province']
+        province_uri = PROVINCE[quote(province_name)]
+        g.add((inscription_uri, EPIG.province, province_uri))
+        g.add((province_uri, RDF.type, EPIG.Province))
+        g.add((province_uri, RDFS.label, Literal(province_name)))
+
+    if original_data.get('place'):
+        place_name = original_data['place']
+        place_uri = PLACE[quote(place_name)]
+        g.add((inscription_uri, EPIG.place, place_uri))
+        g.add((place_uri, RDF.type, EPIG.Place))
+        g.add((place_uri, RDFS.label, Literal(place_name)))
+
+        # Pleiades IDの追加（対応表にある場合、または地名索引で照合できた場合）
+        if isinstance(pleiades_mapping, dict):
+            pleiades_id = pleiades_mapping.get(place_name)
+        else:
+            pleiades_id = pleiades_mapping.lookup(place_name, as_float(original_data.get('latitude')),
+                                                  as_float(original_data.get('longitude')))
+        if pleiades_id:
+            g.add((inscription_uri, EPIG.pleiadesId, Literal(pleiades_id)))
+            pleiades_added = True
+
+    dating_from = as_int(original_data.get('dating_from'))
+    if dating_from is not None:
+        g.add((inscription_uri, EPIG.datingFrom, Literal(dating_from, datatype=XSD.integer)))
+
+    dating_to = as_int(original_data.get('dating_to'))
+    if dating_to is not None:
+        g.add((inscription_uri, EPIG.datingTo, Literal(dating_to, datatype=XSD.integer)))
+
+    if original_data.get('inscription'):
+        g.add((inscription_uri, EPIG.text, Literal(original_data['inscription'])))
+
+    if original_data.get('publication'):
+        g.add((inscription_uri, DCTERMS.bibliographicCitation, Literal(original_data['publication'])))
+
+    # 人物情報の取得（新形式を優先）
+    persons = item.get('persons', [])
+
+    # 後方互換性：persons配列がない場合はmain_personsから取得
+    if not persons:
+        main_persons = item.get('main_persons', [])
+        if not main_persons:
+            # さらに後方互換性：旧形式のデータの場合
+            person_name = item.get('person_name', 'Unknown')
+            if person_name not in ['Unknown', 'Parse Error', 'Error', 'No Text']:
+                main_persons = [{
+                    'person_name': person_name,
+                    'person_name_readable': item.get('person_name_readable', ''),
+                    'person_name_normalized': item.get('person_name_normalized', ''),
+                    'person_name_link': item.get('person_name_link', ''),
+                    'social_status': item.get('social_status', ''),
+                    'social_status_evidence': item.get('social_status_evidence', ''),
+                    'has_career': item.get('has_career', False),
+                    'career_path': item.get('career_path', []),
+                    'benefactions': item.get('benefactions', [])
+                }]
+        # main_personsをpersons形式に変換（person_idを追加）
+        persons = []
+        for idx, person in enumerate(main_persons):
+            person_copy = person.copy()
+            person_copy['person_id'] = idx
+            persons.append(person_copy)
+
+    # 各人物を処理
+    for person_data in persons:
+        person_name = person_data.get('person_name', 'Unknown')
+        person_id = person_data.get('person_id', 0)
+
+        # Parse Error, Error, No Textの場合のみスキップ（Unknownは処理する）
+        if person_name in ['Parse Error', 'Error', 'No Text']:
+            continue
+
+        # 人物のURIを作成（person_idベース）
+        person_uri = PERSON[f"{edcs_id}_person_{person_id}"]
+
+        # 人物の基本情報
+        g.add((person_uri, RDF.type, FOAF.Person))
+        g.add((person_uri, FOAF.name, Literal(person_name)))
+
+        person_name_readable = person_data.get('person_name_readable')
+        if person_name_readable:
+            g.add((person_uri, RDFS.label, Literal(person_name_readable)))
+
+        # Tria nomina (Roman name structure)
+        praenomen = person_data.get('praenomen')
+        if praenomen:
+            praenomen_uri = PRAENOMEN[quote(praenomen)]
+            g.add((person_uri, EPIG.praenomen, praenomen_uri))
+            g.add((praenomen_uri, RDF.type, EPIG.Praenomen))
+            g.add((praenomen_uri, RDFS.label, Literal(praenomen)))
+
+        nomen = person_data.get('nomen')
+        if nomen:
+            nomen_uri = NOMEN[quote(nomen)]
+            g.add((person_uri, EPIG.nomen, nomen_uri))
+            g.add((nomen_uri, RDF.type, EPIG.Nomen))
+            g.add((nomen_uri, RDFS.label, Literal(nomen)))
+
+        cognomen = person_data.get('cognomen')
+        if cognomen:
+            cognomen_uri = COGNOMEN[quote(cognomen)]
+            g.add((person_uri, EPIG.cognomen, cognomen_uri))
+            g.add((cognomen_uri, RDF.type, EPIG.Cognomen))
+            g.add((cognomen_uri, RDFS.label, Literal(cognomen)))
+
+        # 皇帝の場合、正規化名とWikidata リンクを追加
+        person_name_normalized = person_data.get('person_name_normalized')
+        if person_name_normalized:
+            g.add((person_uri, EPIG.normalizedName, Literal(person_name_normalized)))
+
+        person_name_link = person_data.get('person_name_link')
+        if person_name_link:
+            wikidata_uri = URIRef(f"http://www.wikidata.org/entity/{person_name_link}")
+            g.add((person_uri, EPIG.wikidataEntity, wikidata_uri))
+            g.add((person_uri, SKOS.exactMatch, wikidata_uri))
+
+        # 碑文と人物の関係
+        g.add((inscription_uri, EPIG.mentions, person_uri))
+        g.add((inscription_uri, EPIG.mainSubject, person_uri))
+
+        # 社会的身分
+        social_status = person_data.get('social_status', '')
+        if social_status:
+            status_uri = STATUS[quote(social_status)]
+            g.add((person_uri, EPIG.socialStatus, status_uri))
+            g.add((status_uri, RDF.type, EPIG.SocialStatus))
+            g.add((status_uri, RDFS.label, Literal(social_status)))
+
+            social_status_evidence = person_data.get('social_status_evidence', '')
+            if social_status_evidence:
+                g.add((status_uri, EPIG.evidence, Literal(social_status_evidence)))
+
+        # 性別
+        gender = person_data.get('gender', '')
+        if gender and gender != 'unknown':
+            g.add((person_uri, FOAF.gender, Literal(gender)))
+            gender_evidence = person_data.get('gender_evidence', '')
+            if gender_evidence:
+                g.add((person_uri, EPIG.genderEvidence, Literal(gender_evidence)))
+
+        # 民族性
+        ethnicity = person_data.get('ethnicity', '')
+        if ethnicity:
+            g.add((person_uri, EPIG.ethnicity, Literal(ethnicity)))
+            ethnicity_evidence = person_data.get('ethnicity_evidence', '')
+            if ethnicity_evidence:
+                g.add((person_uri, EPIG.ethnicityEvidence, Literal(ethnicity_evidence)))
+
+        # 享年
+        age_at_death = person_data.get('age_at_death', '')
+        if age_at_death:
+            try:
+                age_int = int(age_at_death)
+                g.add((person_uri, EPIG.ageAtDeath, Literal(age_int, datatype=XSD.integer)))
+            except (ValueError, TypeError):
+                # 数値に変換できない場合は文字列として保存
+                g.add((person_uri, EPIG.ageAtDeath, Literal(age_at_death)))
+
+            age_at_death_evidence = person_data.get('age_at_death_evidence', '')
+            if age_at_death_evidence:
+                g.add((person_uri, EPIG.ageAtDeathEvidence, Literal(age_at_death_evidence)))
+
+        # 経歴情報
+        if person_data.get('has_career', False):
+            career_path = person_data.get('career_path', [])
+
+            # orderでソート
+            career_path_sorted = sorted(career_path, key=lambda x: x.get('order', 0))
+
+            previous_career_uri = None
+
+            for career_item in career_path_sorted:
+                position = career_item.get('position', '')
+                order = career_item.get('order', 0)
+
+                # 経歴アイテムのURIを作成（person_idベース）
+                career_uri = CAREER[f"{edcs_id}_person_{person_id}_career_{order}"]
+
+                g.add((career_uri, RDF.type, EPIG.CareerPosition))
+                g.add((person_uri, EPIG.hasCareerPosition, career_uri))
+
+                if position:
+                    g.add((career_uri, EPIG.position, Literal(position)))
+
+                position_normalized = career_item.get('position_normalized', '')
+                if position_normalized:
+                    g.add((career_uri, EPIG.positionNormalized, Literal(position_normalized)))
+
+                position_abstract = career_item.get('position_abstract', '')
+                if position_abstract:
+                    g.add((career_uri, EPIG.positionAbstract, Literal(position_abstract)))
+
+                position_type = career_item.get('position_type', '')
+                if position_type:
+                    g.add((career_uri, EPIG.positionType, Literal(position_type)))
+
+                position_description = career_item.get('position_description', '')
+                if position_description:
+                    g.add((career_uri, DCTERMS.description, Literal(position_description, lang='en')))
+
+                g.add((career_uri, EPIG.order, Literal(order, datatype=XSD.integer)))
+
+                # 前の経歴と接続（order順）
+                if previous_career_uri is not None:
+                    g.add((previous_career_uri, EPIG.nextPosition, career_uri))
+                    g.add((career_uri, EPIG.previousPosition, previous_career_uri))
+
+                previous_career_uri = career_uri
+
+        # 恵与行為（エヴェルジェティズム）情報
+        benefactions = person_data.get('benefactions', [])
+
+        for idx, benef_item in enumerate(benefactions, 1):
+            # 恵与行為のURIを作成（person_idベース）
+            benefaction_uri = BENEF[f"{edcs_id}_person_{person_id}_benef_{idx}"]
+
+            g.add((benefaction_uri, RDF.type, EPIG.Benefaction))
+            g.add((person_uri, EPIG.hasBenefaction, benefaction_uri))
+            g.add((inscription_uri, EPIG.mentions, benefaction_uri))
+
+            benefaction_type = benef_item.get('benefaction_type', '')
+            if benefaction_type:
+                g.add((benefaction_uri, EPIG.benefactionType, Literal(benefaction_type)))
+
+            obj = benef_item.get('object', '')
+            if obj:
+                g.add((benefaction_uri, EPIG.object, Literal(obj)))
+
+            obj = benef_item.get('object_type', '')
+            if obj:
+                g.add((benefaction_uri, EPIG.objectType, Literal(obj)))
+
+            obj_description = benef_item.get('object_description', '')
+            if obj_description:
+                g.add((benefaction_uri, DCTERMS.description, Literal(obj_description, lang='en')))
+
+            benefaction_text = benef_item.get('benefaction_text', '')
+            if benefaction_text:
+                g.add((benefaction_uri, EPIG.evidence, Literal(benefaction_text)))
+
+            cost = benef_item.get('cost', '')
+            if cost:
+                g.add((benefaction_uri, EPIG.cost, Literal(cost)))
+
+            benef_notes = benef_item.get('notes', '')
+            if benef_notes:
+                g.add((benefaction_uri, RDFS.comment, Literal(benef_notes)))
+
+    # コミュニティ情報
+    communities = item.get('communities', [])
+
+    for community_data in communities:
+        community_id = community_data.get('community_id', 0)
+        community_name = community_data.get('community_name', '')
 
-    # Pleiades対応表の読み込み（オプション）
-    pleiades_mapping = {}
-    if pleiades_mapping_path and os.path.exists(pleiades_mapping_path):
-        print(f"Pleiades対応表を読み込み中: {pleiades_mapping_path}")
-        with open(pleiades_mapping_path, 'r', encoding='utf-8') as f:
-            pleiades_mapping = json.load(f)
-        print(f"Pleiades対応表読み込み完了: {len(pleiades_mapping)}件")
+        if not community_name:
+            continue
 
-    # JSONデータの読み込み
-    print(f"JSONデータを読み込み中: {json_path}")
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    print(f"読み込み完了: {len(data)}件")
-
-    # 各碑文データを処理
-    for item in data:
-        edcs_id = item.get('edcs_id', 'Unknown')
-
-        # 碑文のURIを作成
-        inscription_uri = BASE[edcs_id]
-
-        # 碑文の基本情報
-        g.add((inscription_uri, RDF.type, EPIG.Inscription))
-        g.add((inscription_uri, DCTERMS.identifier, Literal(edcs_id)))
-
-        # 元データから追加情報を取得
-        original_data = item.get('original_data', {})
-
-        if original_data.get('province'):
-            province_name = original_data['province']
-            province_uri = PROVINCE[quote(province_name)]
-            g.add((inscription_uri, EPIG.province, province_uri))
-            g.add((province_uri, RDF.type, EPIG.Province))
-            g.add((province_uri, RDFS.label, Literal(province_name)))
-
-        if original_data.get('place'):
-            place_name = original_data['place']
-            place_uri = PLACE[quote(place_name)]
-            g.add((inscription_uri, EPIG.place, place_uri))
-            g.add((place_uri, RDF.type, EPIG.Place))
-            g.add((place_uri, RDFS.label, Literal(place_name)))
-
-            # Pleiades IDの追加（対応表にある場合）
-            if place_name in pleiades_mapping:
-                pleiades_id = pleiades_mapping[place_name]
-                g.add((inscription_uri, EPIG.pleiadesId, Literal(pleiades_id)))
-                print(f"  {edcs_id}: Pleiades ID {pleiades_id} を追加 (place: {place_name})")
-
-        if original_data.get('dating_from'):
-            g.add((inscription_uri, EPIG.datingFrom, Literal(int(original_data['dating_from']), datatype=XSD.integer)))
-
-        if original_data.get('dating_to'):
-            g.add((inscription_uri, EPIG.datingTo, Literal(int(original_data['dating_to']), datatype=XSD.integer)))
-
-        if original_data.get('inscription'):
-            g.add((inscription_uri, EPIG.text, Literal(original_data['inscription'])))
-
-        if original_data.get('publication'):
-            g.add((inscription_uri, DCTERMS.bibliographicCitation, Literal(original_data['publication'])))
-
-        # 人物情報の取得（新形式を優先）
-        persons = item.get('persons', [])
-
-        # 後方互換性：persons配列がない場合はmain_personsから取得
-        if not persons:
-            main_persons = item.get('main_persons', [])
-            if not main_persons:
-                # さらに後方互換性：旧形式のデータの場合
-                person_name = item.get('person_name', 'Unknown')
-                if person_name not in ['Unknown', 'Parse Error', 'Error', 'No Text']:
-                    main_persons = [{
-                        'person_name': person_name,
-                        'person_name_readable': item.get('person_name_readable', ''),
-                        'person_name_normalized': item.get('person_name_normalized', ''),
-                        'person_name_link': item.get('person_name_link', ''),
-                        'social_status': item.get('social_status', ''),
-                        'social_status_evidence': item.get('social_status_evidence', ''),
-                        'has_career': item.get('has_career', False),
-                        'career_path': item.get('career_path', []),
-                        'benefactions': item.get('benefactions', [])
-                    }]
-            # main_personsをpersons形式に変換（person_idを追加）
-            persons = []
-            for idx, person in enumerate(main_persons):
-                person_copy = person.copy()
-                person_copy['person_id'] = idx
-                persons.append(person_copy)
-
-        # 各人物を処理
-        for person_data in persons:
-            person_name = person_data.get('person_name', 'Unknown')
-            person_id = person_data.get('person_id', 0)
-
-            # Parse Error, Error, No Textの場合のみスキップ（Unknownは処理する）
-            if person_name in ['Parse Error', 'Error', 'No Text']:
+        # コミュニティのURIを作成（community_idベース）
+        community_uri = COMMUNITY[f"{edcs_id}_community_{community_id}"]
+
+        # コミュニティの基本情報
+        g.add((community_uri, RDF.type, EPIG.Community))
+        g.add((community_uri, RDFS.label, Literal(community_name)))
+        g.add((inscription_uri, EPIG.mentions, community_uri))
+
+        # 正規化名
+        community_name_normalized = community_data.get('community_name_normalized', '')
+        if community_name_normalized:
+            g.add((community_uri, EPIG.normalizedName, Literal(community_name_normalized)))
+
+        # コミュニティタイプ
+        community_type = community_data.get('community_type', '')
+        if community_type:
+            comm_type_uri = COMMTYPE[quote(community_type)]
+            g.add((community_uri, EPIG.communityType, comm_type_uri))
+            g.add((comm_type_uri, RDF.type, EPIG.CommunityType))
+            g.add((comm_type_uri, RDFS.label, Literal(community_type)))
+
+        # 説明
+        community_description = community_data.get('community_description', '')
+        if community_description:
+            g.add((community_uri, DCTERMS.description, Literal(community_description, lang='en')))
+
+        # エビデンス
+        evidence = community_data.get('evidence', '')
+        if evidence:
+            g.add((community_uri, EPIG.evidence, Literal(evidence)))
+
+    # 関係性情報（新形式を優先、後方互換性あり）
+    person_relationships = item.get('person_relationships', item.get('relationships', []))
+
+    for idx, rel_item in enumerate(person_relationships, 1):
+        rel_type = rel_item.get('type', '')
+        rel_property = rel_item.get('property', '')
+
+        # 新形式: source_person_id、target_person_id、target_community_idを使用
+        source_person_id = rel_item.get('source_person_id')
+        target_person_id = rel_item.get('target_person_id')
+        target_community_id = rel_item.get('target_community_id')
+
+        # 後方互換性: 古い形式のsource_person_indexとtarget_person_indexもサポート
+        if source_person_id is None:
+            source_person_id = rel_item.get('source_person_index', 0)
+        if target_person_id is None:
+            target_person_id = rel_item.get('target_person_index')
+
+        # person_idからperson URIを取得
+        source_person_uri = PERSON[f"{edcs_id}_person_{source_person_id}"]
+
+        # target_uriを決定（person、community、または旧形式）
+        target_uri = None
+
+        # target_community_idが指定されている場合（affiliation）
+        if target_community_id is not None:
+            target_uri = COMMUNITY[f"{edcs_id}_community_{target_community_id}"]
+        # target_person_idが指定されている場合（person-to-person）
+        elif target_person_id is not None:
+            target_uri = PERSON[f"{edcs_id}_person_{target_person_id}"]
+        else:
+            # 旧形式：target_person_nameから新しいリソースを作成
+            target_person_name = rel_item.get('target_person_name', rel_item.get('person_name', ''))
+            if not target_person_name:
                 continue
 
-            # 人物のURIを作成（person_idベース）
-            person_uri = PERSON[f"{edcs_id}_person_{person_id}"]
-
-            # 人物の基本情報
-            g.add((person_uri, RDF.type, FOAF.Person))
-            g.add((person_uri, FOAF.name, Literal(person_name)))
-
-            person_name_readable = person_data.get('person_name_readable')
-            if person_name_readable:
-                g.add((person_uri, RDFS.label, Literal(person_name_readable)))
-
-            # Tria nomina (Roman name structure)
-            praenomen = person_data.get('praenomen')
-            if praenomen:
-                praenomen_uri = PRAENOMEN[quote(praenomen)]
-                g.add((person_uri, EPIG.praenomen, praenomen_uri))
-                g.add((praenomen_uri, RDF.type, EPIG.Praenomen))
-                g.add((praenomen_uri, RDFS.label, Literal(praenomen)))
-
-            nomen = person_data.get('nomen')
-            if nomen:
-                nomen_uri = NOMEN[quote(nomen)]
-                g.add((person_uri, EPIG.nomen, nomen_uri))
-                g.add((nomen_uri, RDF.type, EPIG.Nomen))
-                g.add((nomen_uri, RDFS.label, Literal(nomen)))
-
-            cognomen = person_data.get('cognomen')
-            if cognomen:
-                cognomen_uri = COGNOMEN[quote(cognomen)]
-                g.add((person_uri, EPIG.cognomen, cognomen_uri))
-                g.add((cognomen_uri, RDF.type, EPIG.Cognomen))
-                g.add((cognomen_uri, RDFS.label, Literal(cognomen)))
-
-            # 皇帝の場合、正規化名とWikidata リンクを追加
-            person_name_normalized = person_data.get('person_name_normalized')
-            if person_name_normalized:
-                g.add((person_uri, EPIG.normalizedName, Literal(person_name_normalized)))
-
-            person_name_link = person_data.get('person_name_link')
-            if person_name_link:
-                wikidata_uri = URIRef(f"http://www.wikidata.org/entity/{person_name_link}")
-                g.add((person_uri, EPIG.wikidataEntity, wikidata_uri))
-                g.add((person_uri, SKOS.exactMatch, wikidata_uri))
-
-            # 碑文と人物の関係
-            g.add((inscription_uri, EPIG.mentions, person_uri))
-            g.add((inscription_uri, EPIG.mainSubject, person_uri))
-
-            # 社会的身分
-            social_status = person_data.get('social_status', '')
-            if social_status:
-                status_uri = STATUS[quote(social_status)]
-                g.add((person_uri, EPIG.socialStatus, status_uri))
-                g.add((status_uri, RDF.type, EPIG.SocialStatus))
-                g.add((status_uri, RDFS.label, Literal(social_status)))
-
-                social_status_evidence = person_data.get('social_status_evidence', '')
-                if social_status_evidence:
-                    g.add((status_uri, EPIG.evidence, Literal(social_status_evidence)))
-
-            # 性別
-            gender = person_data.get('gender', '')
-            if gender and gender != 'unknown':
-                g.add((person_uri, FOAF.gender, Literal(gender)))
-                gender_evidence = person_data.get('gender_evidence', '')
-                if gender_evidence:
-                    g.add((person_uri, EPIG.genderEvidence, Literal(gender_evidence)))
-
-            # 民族性
-            ethnicity = person_data.get('ethnicity', '')
-            if ethnicity:
-                g.add((person_uri, EPIG.ethnicity, Literal(ethnicity)))
-                ethnicity_evidence = person_data.get('ethnicity_evidence', '')
-                if ethnicity_evidence:
-                    g.add((person_uri, EPIG.ethnicityEvidence, Literal(ethnicity_evidence)))
-
-            # 享年
-            age_at_death = person_data.get('age_at_death', '')
-            if age_at_death:
-                try:
-                    age_int = int(age_at_death)
-                    g.add((person_uri, EPIG.ageAtDeath, Literal(age_int, datatype=XSD.integer)))
-                except (ValueError, TypeError):
-                    # 数値に変換できない場合は文字列として保存
-                    g.add((person_uri, EPIG.ageAtDeath, Literal(age_at_death)))
-
-                age_at_death_evidence = person_data.get('age_at_death_evidence', '')
-                if age_at_death_evidence:
-                    g.add((person_uri, EPIG.ageAtDeathEvidence, Literal(age_at_death_evidence)))
-
-            # 経歴情報
-            if person_data.get('has_career', False):
-                career_path = person_data.get('career_path', [])
-
-                # orderでソート
-                career_path_sorted = sorted(career_path, key=lambda x: x.get('order', 0))
-
-                previous_career_uri = None
-
-                for career_item in career_path_sorted:
-                    position = career_item.get('position', '')
-                    order = career_item.get('order', 0)
-
-                    # 経歴アイテムのURIを作成（person_idベース）
-                    career_uri = CAREER[f"{edcs_id}_person_{person_id}_career_{order}"]
-
-                    g.add((career_uri, RDF.type, EPIG.CareerPosition))
-                    g.add((person_uri, EPIG.hasCareerPosition, career_uri))
-
-                    if position:
-                        g.add((career_uri, EPIG.position, Literal(position)))
-
-                    position_normalized = career_item.get('position_normalized', '')
-                    if position_normalized:
-                        g.add((career_uri, EPIG.positionNormalized, Literal(position_normalized)))
-
-                    position_abstract = career_item.get('position_abstract', '')
-                    if position_abstract:
-                        g.add((career_uri, EPIG.positionAbstract, Literal(position_abstract)))
-
-                    position_type = career_item.get('position_type', '')
-                    if position_type:
-                        g.add((career_uri, EPIG.positionType, Literal(position_type)))
-
-                    position_description = career_item.get('position_description', '')
-                    if position_description:
-                        g.add((career_uri, DCTERMS.description, Literal(position_description, lang='en')))
-
-                    g.add((career_uri, EPIG.order, Literal(order, datatype=XSD.integer)))
-
-                    # 前の経歴と接続（order順）
-                    if previous_career_uri is not None:
-                        g.add((previous_career_uri, EPIG.nextPosition, career_uri))
-                        g.add((career_uri, EPIG.previousPosition, previous_career_uri))
-
-                    previous_career_uri = career_uri
-
-            # 恵与行為（エヴェルジェティズム）情報
-            benefactions = person_data.get('benefactions', [])
-
-            for idx, benef_item in enumerate(benefactions, 1):
-                # 恵与行為のURIを作成（person_idベース）
-                benefaction_uri = BENEF[f"{edcs_id}_person_{person_id}_benef_{idx}"]
-
-                g.add((benefaction_uri, RDF.type, EPIG.Benefaction))
-                g.add((person_uri, EPIG.hasBenefaction, benefaction_uri))
-                g.add((inscription_uri, EPIG.mentions, benefaction_uri))
-
-                benefaction_type = benef_item.get('benefaction_type', '')
-                if benefaction_type:
-                    g.add((benefaction_uri, EPIG.benefactionType, Literal(benefaction_type)))
-
-                obj = benef_item.get('object', '')
-                if obj:
-                    g.add((benefaction_uri, EPIG.object, Literal(obj)))
+            target_uri = PERSON[f"{edcs_id}_rel_{idx}"]
+            g.add((target_uri, RDF.type, FOAF.Person))
+            g.add((target_uri, FOAF.name, Literal(target_person_name)))
+
+            # 旧形式の追加情報を処理
+            target_person_readable = rel_item.get('target_person_name_readable', rel_item.get('person_name_readable', ''))
+            if target_person_readable:
+                g.add((target_uri, RDFS.label, Literal(target_person_readable)))
+
+            target_person_normalized = rel_item.get('target_person_name_normalized', rel_item.get('person_name_normalized'))
+            if target_person_normalized:
+                g.add((target_uri, EPIG.normalizedName, Literal(target_person_normalized)))
+
+            target_person_link = rel_item.get('target_person_name_link', rel_item.get('person_name_link'))
+            if target_person_link:
+                wikidata_uri = URIRef(f"http://www.wikidata.org/entity/{target_person_link}")
+                g.add((target_uri, EPIG.wikidataEntity, wikidata_uri))
+                g.add((target_uri, SKOS.exactMatch, wikidata_uri))
+
+            target_status = rel_item.get('social_status', '')
+            if target_status:
+                target_status_uri = STATUS[quote(target_status)]
+                g.add((target_uri, EPIG.socialStatus, target_status_uri))
+                g.add((target_status_uri, RDF.type, EPIG.SocialStatus))
+                g.add((target_status_uri, RDFS.label, Literal(target_status)))
+
+                target_status_evidence = rel_item.get('social_status_evidence', '')
+                if target_status_evidence:
+                    g.add((target_status_uri, EPIG.evidence, Literal(target_status_evidence)))
+
+            g.add((inscription_uri, EPIG.mentions, target_uri))
+
+        # 関係のURIを作成
+        relationship_uri = REL[f"{edcs_id}_rel_{idx}"]
+
+        g.add((relationship_uri, RDF.type, EPIG.Relationship))
+
+        # relationshipTypeをURIとして扱う
+        if rel_type:
+            rel_type_uri = RELTYPE[quote(rel_type)]
+            g.add((relationship_uri, EPIG.relationshipType, rel_type_uri))
+            g.add((rel_type_uri, RDF.type, EPIG.RelationshipType))
+            g.add((rel_type_uri, RDFS.label, Literal(rel_type)))
+
+        g.add((relationship_uri, EPIG.relationshipProperty, Literal(rel_property)))
+
+        # 碑文とrelationshipの関係
+        g.add((inscription_uri, EPIG.mentions, relationship_uri))
+
+        # 関係の方向性
+        g.add((relationship_uri, EPIG.source, source_person_uri))
+        g.add((relationship_uri, EPIG.target, target_uri))
+
+        # プロパティに基づいた直接的な関係も追加
+        if rel_type == 'family':
+            # 家族関係の直接リンク（person-to-personの場合のみ）
+            if target_person_id is not None and rel_property in ['father', 'mother', 'son', 'daughter', 'brother', 'sister']:
+                relation_property = EPIG[f"has{rel_property.capitalize()}"]
+                g.add((source_person_uri, relation_property, target_uri))
+        elif rel_type == 'affiliation':
+            # affiliation関係の直接リンク（person-to-communityの場合）
+            if target_community_id is not None:
+                g.add((source_person_uri, EPIG.affiliatedWith, target_uri))
 
-                obj = benef_item.get('object_type', '')
-                if obj:
-                    g.add((benefaction_uri, EPIG.objectType, Literal(obj)))
+        property_text = rel_item.get('property_text', '')
+        if property_text:
+            g.add((relationship_uri, EPIG.evidence, Literal(property_text)))
 
-                obj_description = benef_item.get('object_description', '')
-                if obj_description:
-                    g.add((benefaction_uri, DCTERMS.description, Literal(obj_description, lang='en')))
+        notes = rel_item.get('notes', '')
+        if notes:
+            g.add((relationship_uri, RDFS.comment, Literal(notes)))
 
-                benefaction_text = benef_item.get('benefaction_text', '')
-                if benefaction_text:
-                    g.add((benefaction_uri, EPIG.evidence, Literal(benefaction_text)))
+    # 全体のノート
+    notes = item.get('notes', '')
+    if notes:
+        g.add((inscription_uri, RDFS.comment, Literal(notes)))
 
-                cost = benef_item.get('cost', '')
-                if cost:
-                    g.add((benefaction_uri, EPIG.cost, Literal(cost)))
+    return pleiades_added
 
-                benef_notes = benef_item.get('notes', '')
-                if benef_notes:
-                    g.add((benefaction_uri, RDFS.comment, Literal(benef_notes)))
 
-        # コミュニティ情報
-        communities = item.get('communities', [])
+def load_pleiades_mapping(pleiades_mapping_path, pleiades_gazetteer_paths=None):
+    """
+    地名とPleiades IDの対応表を読み込む（ファイルがなければ空の辞書）
 
-        for community_data in communities:
-            community_id = community_data.get('community_id', 0)
-            community_name = community_data.get('community_name', '')
+    Pleiadesのダンプを指定した場合は、対応表を優先しつつ地名ごとに地名索引で照合する
+    PleiadesMatcher を返す
+    """
+    pleiades_mapping = {}
+    if pleiades_mapping_path and os.path.exists(pleiades_mapping_path):
+        print(f"Pleiades対応表を読み込み中: {pleiades_mapping_path}")
+        pleiades_mapping = load_json(pleiades_mapping_path)
+        print(f"Pleiades対応表読み込み完了: {len(pleiades_mapping)}件")
+    if pleiades_gazetteer_paths:
+        from pleiades_gazetteer import PleiadesGazetteer, PleiadesMatcher
+        print(f"Pleiadesの地名索引を作成中: {', '.join(pleiades_gazetteer_paths)}")
+        gazetteer = PleiadesGazetteer(pleiades_gazetteer_paths)
+        print(f"地名索引の作成完了: {len(gazetteer.locations)}地点")
+        return PleiadesMatcher(gazetteer, pleiades_mapping)
+    return pleiades_mapping
 
-            if not community_name:
-                continue
 
-            # コミュニティのURIを作成（community_idベース）
-            community_uri = COMMUNITY[f"{edcs_id}_community_{community_id}"]
-
-            # コミュニティの基本情報
-            g.add((community_uri, RDF.type, EPIG.Community))
-            g.add((community_uri, RDFS.label, Literal(community_name)))
-            g.add((inscription_uri, EPIG.mentions, community_uri))
-
-            # 正規化名
-            community_name_normalized = community_data.get('community_name_normalized', '')
-            if community_name_normalized:
-                g.add((community_uri, EPIG.normalizedName, Literal(community_name_normalized)))
-
-            # コミュニティタイプ
-            community_type = community_data.get('community_type', '')
-            if community_type:
-                comm_type_uri = COMMTYPE[quote(community_type)]
-                g.add((community_uri, EPIG.communityType, comm_type_uri))
-                g.add((comm_type_uri, RDF.type, EPIG.CommunityType))
-                g.add((comm_type_uri, RDFS.label, Literal(community_type)))
-
-            # 説明
-            community_description = community_data.get('community_description', '')
-            if community_description:
-                g.add((community_uri, DCTERMS.description, Literal(community_description, lang='en')))
-
-            # エビデンス
-            evidence = community_data.get('evidence', '')
-            if evidence:
-                g.add((community_uri, EPIG.evidence, Literal(evidence)))
-
-        # 関係性情報（新形式を優先、後方互換性あり）
-        person_relationships = item.get('person_relationships', item.get('relationships', []))
-
-        for idx, rel_item in enumerate(person_relationships, 1):
-            rel_type = rel_item.get('type', '')
-            rel_property = rel_item.get('property', '')
-
-            # 新形式: source_person_id、target_person_id、target_community_idを使用
-            source_person_id = rel_item.get('source_person_id')
-            target_person_id = rel_item.get('target_person_id')
-            target_community_id = rel_item.get('target_community_id')
-
-            # 後方互換性: 古い形式のsource_person_indexとtarget_person_indexもサポート
-            if source_person_id is None:
-                source_person_id = rel_item.get('source_person_index', 0)
-            if target_person_id is None:
-                target_person_id = rel_item.get('target_person_index')
-
-            # person_idからperson URIを取得
-            source_person_uri = PERSON[f"{edcs_id}_person_{source_person_id}"]
-
-            # target_uriを決定（person、community、または旧形式）
-            target_uri = None
-
-            # target_community_idが指定されている場合（affiliation）
-            if target_community_id is not None:
-                target_uri = COMMUNITY[f"{edcs_id}_community_{target_community_id}"]
-            # target_person_idが指定されている場合（person-to-person）
-            elif target_person_id is not None:
-                target_uri = PERSON[f"{edcs_id}_person_{target_person_id}"]
-            else:
-                # 旧形式：target_person_nameから新しいリソースを作成
-                target_person_name = rel_item.get('target_person_name', rel_item.get('person_name', ''))
-                if not target_person_name:
-                    continue
-
-                target_uri = PERSON[f"{edcs_id}_rel_{idx}"]
-                g.add((target_uri, RDF.type, FOAF.Person))
-                g.add((target_uri, FOAF.name, Literal(target_person_name)))
-
-                # 旧形式の追加情報を処理
-                target_person_readable = rel_item.get('target_person_name_readable', rel_item.get('person_name_readable', ''))
-                if target_person_readable:
-                    g.add((target_uri, RDFS.label, Literal(target_person_readable)))
-
-                target_person_normalized = rel_item.get('target_person_name_normalized', rel_item.get('person_name_normalized'))
-                if target_person_normalized:
-                    g.add((target_uri, EPIG.normalizedName, Literal(target_person_normalized)))
-
-                target_person_link = rel_item.get('target_person_name_link', rel_item.get('person_name_link'))
-                if target_person_link:
-                    wikidata_uri = URIRef(f"http://www.wikidata.org/entity/{target_person_link}")
-                    g.add((target_uri, EPIG.wikidataEntity, wikidata_uri))
-                    g.add((target_uri, SKOS.exactMatch, wikidata_uri))
-
-                target_status = rel_item.get('social_status', '')
-                if target_status:
-                    target_status_uri = STATUS[quote(target_status)]
-                    g.add((target_uri, EPIG.socialStatus, target_status_uri))
-                    g.add((target_status_uri, RDF.type, EPIG.SocialStatus))
-                    g.add((target_status_uri, RDFS.label, Literal(target_status)))
-
-                    target_status_evidence = rel_item.get('social_status_evidence', '')
-                    if target_status_evidence:
-                        g.add((target_status_uri, EPIG.evidence, Literal(target_status_evidence)))
-
-                g.add((inscription_uri, EPIG.mentions, target_uri))
-
-            # 関係のURIを作成
-            relationship_uri = REL[f"{edcs_id}_rel_{idx}"]
-
-            g.add((relationship_uri, RDF.type, EPIG.Relationship))
-
-            # relationshipTypeをURIとして扱う
-            if rel_type:
-                rel_type_uri = RELTYPE[quote(rel_type)]
-                g.add((relationship_uri, EPIG.relationshipType, rel_type_uri))
-                g.add((rel_type_uri, RDF.type, EPIG.RelationshipType))
-                g.add((rel_type_uri, RDFS.label, Literal(rel_type)))
-
-            g.add((relationship_uri, EPIG.relationshipProperty, Literal(rel_property)))
-
-            # 碑文とrelationshipの関係
-            g.add((inscription_uri, EPIG.mentions, relationship_uri))
-
-            # 関係の方向性
-            g.add((relationship_uri, EPIG.source, source_person_uri))
-            g.add((relationship_uri, EPIG.target, target_uri))
-
-            # プロパティに基づいた直接的な関係も追加
-            if rel_type == 'family':
-                # 家族関係の直接リンク（person-to-personの場合のみ）
-                if target_person_id is not None and rel_property in ['father', 'mother', 'son', 'daughter', 'brother', 'sister']:
-                    relation_property = EPIG[f"has{rel_property.capitalize()}"]
-                    g.add((source_person_uri, relation_property, target_uri))
-            elif rel_type == 'affiliation':
-                # affiliation関係の直接リンク（person-to-communityの場合）
-                if target_community_id is not None:
-                    g.add((source_person_uri, EPIG.affiliatedWith, target_uri))
-
-            property_text = rel_item.get('property_text', '')
-            if property_text:
-                g.add((relationship_uri, EPIG.evidence, Literal(property_text)))
-
-            notes = rel_item.get('notes', '')
-            if notes:
-                g.add((relationship_uri, RDFS.comment, Literal(notes)))
-
-        # 全体のノート
-        notes = item.get('notes', '')
-        if notes:
-            g.add((inscription_uri, RDFS.comment, Literal(notes)))
+def write_inscription(writer, item, pleiades_mapping=None, source_row=None):
+    """
+    碑文1件のトリプルを StreamingRDFWriter に書き出し、Pleiades IDを追加した件数を返す
 
-    # RDFファイルとして保存
-    print(f"\nRDFデータを保存中: {output_path}")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    N-Quads の場合は碑文ごとのトリプルを碑文のIRIを名前とするグラフに入れる
+    （複数の碑文から参照される属性のトリプルはデフォルトグラフに入る）
+    """
+    edcs_id = str(item.get('edcs_id', ''))
+    block = TripleBlock()
+    with profiling.span('add_triples'):
+        pleiades_count = add_inscription_to_graph(block, item, pleiades_mapping, source_row)
+    with profiling.span('serialize', format=writer.format):
+        writer.write_block(block.triples, edcs_id, graph=BASE[edcs_id] if writer.format == 'nquads' else None)
+    return pleiades_count
 
-    g.serialize(destination=output_path, format=format)
 
-    # 統計情報
+def _print_stats(triple_count, type_counts, format, output_path):
+    """
+    RDF生成の統計情報を表示する
+    """
     print("\n" + "=" * 80)
     print("RDF生成完了")
-    print(f"総トリプル数: {len(g)}")
-    print(f"人物数: {len(list(g.subjects(RDF.type, FOAF.Person)))}")
-    print(f"コミュニティ数: {len(list(g.subjects(RDF.type, EPIG.Community)))}")
-    print(f"碑文数: {len(list(g.subjects(RDF.type, EPIG.Inscription)))}")
-    print(f"経歴位置数: {len(list(g.subjects(RDF.type, EPIG.CareerPosition)))}")
-    print(f"恵与行為数: {len(list(g.subjects(RDF.type, EPIG.Benefaction)))}")
-    print(f"関係性数: {len(list(g.subjects(RDF.type, EPIG.Relationship)))}")
+    print(f"総トリプル数: {triple_count}")
+    for label, rdf_class in STATS_TYPES:
+        print(f"{label}: {type_counts.get(rdf_class, 0)}")
     print(f"出力形式: {format}")
     print(f"出力ファイル: {output_path}")
 
 
+def create_rdf_graph(json_path, output_path, format='turtle', pleiades_mapping_path=None, source_path=None,
+                     edcs_ids=None, serializer='stream', pleiades_gazetteer_paths=None):
+    """
+    JSONファイルから碑文のRDFグラフを作成する
+
+    Parameters:
+    -----------
+    json_path : str
+        入力ファイルのパス（JSON配列または .jsonl）
+    output_path : str
+        出力RDFファイルのパス（.gz / .zst で終わる場合は圧縮して保存する）
+    format : str
+        RDFのシリアライゼーション形式 ('turtle', 'xml', 'n3', 'nt', 'nquads', 'json-ld')。
+        nquads は碑文ごとに名前付きグラフに入れる（serializer によらず逐次書き出す）
+    pleiades_mapping_path : str, optional
+        地名とPleiades IDの対応表ファイルパス（JSON形式）
+    source_path : str, optional
+        元データ（filtered_data）のファイルパス。コンパクト形式の抽出結果の場合に
+        EDCS-IDで元データを参照する
+    edcs_ids : list, optional
+        RDFに含めるEDCS-IDのリスト（指定した場合はインデックスで該当する碑文のみを読み込む）
+    pleiades_gazetteer_paths : list, optional
+        Pleiadesのダンプのパス（指定した場合は対応表にない地名を地名索引で照合する）
+    serializer : str
+        'stream' の場合、turtle / nt / json-ld は碑文ごとに逐次書き出す（グラフ全体をメモリに載せない）。
+        'rdflib' の場合、または他の形式では rdflib のグラフを作ってから serialize() する
+
+    Returns:
+    --------
+    dict
+        処理した碑文数とトリプル数
+    """
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    # ストリーミング出力の場合は碑文ごとにトリプルを書き出し、それ以外はグラフに蓄積する
+    writer = None
+    g = None
+    if format == 'nquads' or (serializer == 'stream' and format in STREAM_FORMATS):
+        writer = StreamingRDFWriter(output_path, format, STREAM_PREFIXES)
+    else:
+        g = Graph()
+        bind_namespaces(g)
+
+    # Pleiades対応表の読み込み（オプション）
+    pleiades_mapping = load_pleiades_mapping(pleiades_mapping_path, pleiades_gazetteer_paths)
+
+    # 元データのインデックス（コンパクト形式用、EDCS-IDで1件ずつ参照）
+    source_index = None
+    if source_path:
+        source_index = EdcsIndex(source_path)
+        print(f"元データのインデックス: {source_index.index_path}（{len(source_index)}件）")
+
+    # JSONデータを1件ずつ読み込んで処理（ファイル全体はメモリに載せない）
+    print(f"JSONデータを読み込み中: {json_path}")
+    if writer is not None:
+        print(f"RDFデータを逐次保存中: {output_path}")
+    count = 0
+    pleiades_count = 0
+    records = iter_json_records(json_path) if edcs_ids is None else iter_selected_records(json_path, edcs_ids)
+    for item in records:
+        source_row = None
+        if source_index is not None and not item.get('original_data'):
+            with profiling.span('source_lookup'):
+                source_row = source_index.get(item.get('edcs_id'))
+        if writer is None:
+            with profiling.span('add_triples'):
+                pleiades_count += add_inscription_to_graph(g, item, pleiades_mapping, source_row)
+        else:
+            pleiades_count += write_inscription(writer, item, pleiades_mapping, source_row)
+        count += 1
+
+    print(f"読み込み完了: {count}件")
+    if source_index is not None:
+        source_index.close()
+    if pleiades_mapping:
+        print(f"Pleiades IDを追加: {pleiades_count}件")
+    if not isinstance(pleiades_mapping, dict):
+        print(f"地名索引で照合した地名: {len(pleiades_mapping.matched)}件"
+              f"（見つからなかった地名: {len(pleiades_mapping.unresolved)}件）")
+
+    if writer is not None:
+        writer.close()
+        triple_count = writer.triple_count
+        type_counts = writer.type_counts
+    else:
+        # RDFファイルとして保存
+        print(f"\nRDFデータを保存中: {output_path}")
+        with profiling.span('serialize', format=format):
+            if output_path.endswith(('.gz', '.zst')):
+                with open_output(output_path) as f:
+                    f.write(g.serialize(format=format, encoding='utf-8'))
+            else:
+                g.serialize(destination=output_path, format=format)
+        triple_count = len(g)
+        type_counts = {rdf_class: len(set(g.subjects(RDF.type, rdf_class))) for _, rdf_class in STATS_TYPES}
+    profiling.count('triples', triple_count)
+
+    _print_stats(triple_count, type_counts, format, output_path)
+
+    return {'inscriptions': count, 'triples': triple_count}
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='JSONからRDFデータを生成')
     parser.add_argument('--input', '-i', type=str, required=True,
-                        help='入力JSONファイルのパス')
+                        help='入力ファイルのパス（JSON配列または .jsonl。.gz / .zst も可）')
     parser.add_argument('--output', '-o', type=str, default=None,
-                        help='出力RDFファイルのパス（指定しない場合は自動生成）')
+                        help='出力RDFファイルのパス（指定しない場合は自動生成。.gz / .zst で終わる場合は圧縮して保存）')
     parser.add_argument('--format', '-f', type=str, default='turtle',
-                        choices=['turtle', 'xml', 'n3', 'nt', 'json-ld'],
-                        help='RDFのシリアライゼーション形式（デフォルト: turtle）')
+                        choices=['turtle', 'xml', 'n3', 'nt', 'nquads', 'json-ld'],
+                        help='RDFのシリアライゼーション形式（デフォルト: turtle。nquads は碑文ごとの名前付きグラフ）')
     parser.add_argument('--pleiades-mapping', '-p', type=str, default=None,
                         help='地名とPleiades IDの対応表ファイルパス（JSON形式）')
+    parser.add_argument('--pleiades-gazetteer', '-g', type=str, nargs='+', default=None,
+                        help='Pleiadesのダンプ（pleiades-places-latest.csv.gz など）。対応表にない地名を'
+                             '地名と座標で照合して Pleiades ID を付ける')
+    parser.add_argument('--source', '-s', type=str, default=None,
+                        help='元データ（filtered_data）のファイルパス（コンパクト形式の入力で使用）')
+    add_query_arguments(parser)
+    parser.add_argument('--profile', type=str, default=None,
+                        help='区間ごとの計測を有効にし、トレース（Chrome Trace形式のJSON）を保存するパス')
+    parser.add_argument('--profiler', type=str, default=None, choices=['cprofile', 'pyinstrument'],
+                        help='--profile と併用し、RDF生成全体を詳細にプロファイルする')
+    parser.add_argument('--serializer', type=str, default='stream', choices=['stream', 'rdflib'],
+                        help='turtle / nt / json-ld の書き出し方法（stream: 碑文ごとに逐次書き出す、'
+                             'rdflib: グラフ全体を作ってから serialize する。デフォルト: stream）')
 
     args = parser.parse_args()
 
     # 出力ファイルパスを生成
     if args.output is None:
-        input_basename = os.path.basename(args.input)
-        base_name = input_basename.replace('_career.json', '').replace('.json', '')
+        # 圧縮形式の拡張子は出力にも引き継ぐ（xxx_career.jsonl.zst → xxx.ttl.zst）
+        input_basename = os.path.basename(strip_compression_suffix(args.input))
+        base_name = input_basename.replace('.jsonl', '.json').replace('_career.json', '').replace('.json', '')
 
         # フォーマットに応じた拡張子
         extension_map = {
@@ -531,6 +708,7 @@ if __name__ == "__main__":
             'xml': '.rdf',
             'n3': '.n3',
             'nt': '.nt',
+            'nquads': '.nq',
             'json-ld': '.jsonld'
         }
         extension = extension_map.get(args.format, '.ttl')
@@ -559,7 +737,7 @@ if __name__ == "__main__":
         else:
             output_dir = 'rdf_graphs'
 
-        output_path = f'{output_dir}/{base_name}{extension}'
+        output_path = f'{output_dir}/{base_name}{extension}{compression_suffix(args.input)}'
     else:
         output_path = args.output
 
@@ -570,5 +748,17 @@ if __name__ == "__main__":
         print(f"Pleiades対応表: {args.pleiades_mapping}")
     print()
 
-    create_rdf_graph(args.input, output_path, format=args.format,
-                     pleiades_mapping_path=args.pleiades_mapping)
+    if args.profile:
+        profiling.enable(capture_mode=args.profiler, capture_dir=os.path.dirname(args.profile) or '.')
+
+    # 座標・年代範囲で対象を絞り込む（コンパクト形式の場合は元データの座標を使う）
+    edcs_ids = query_from_args(args, args.source or args.input)
+
+    with profiling.capture('create_rdf'):
+        create_rdf_graph(args.input, output_path, format=args.format,
+                         pleiades_mapping_path=args.pleiades_mapping,
+                         source_path=args.source, edcs_ids=edcs_ids, serializer=args.serializer,
+                         pleiades_gazetteer_paths=args.pleiades_gazetteer)
+
+    if args.profile:
+        profiling.finish(args.profile)
@@ -0,0 +1,225 @@
+import argparse
+import copy
+import hashlib
+import json
+import zlib
+
+import numpy as np
+
+from leiden import normalize_inscription_text
+
+
+# MinHashのハッシュ関数族に使う素数（2^61 - 1）
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _shingles(text, shingle_size):
+    """
+    正規化テキストを文字n-gramの集合に分割する
+    """
+    if len(text) <= shingle_size:
+        return {text}
+    return {text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1)}
+
+
+def _minhash_signature(shingles, a, b):
+    """
+    シングル集合のMinHash署名を計算する（NumPyでベクトル化）
+    """
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                         dtype=np.uint64, count=len(shingles))
+    # 各ハッシュ関数について (a * x + b) mod p を計算し、最小値を取る
+    permuted = (np.outer(a, hashes) + b[:, None]) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=1)
+
+
+def _find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def group_duplicate_inscriptions(inscriptions, threshold=0.9, num_perm=64, bands=16,
+                                 shingle_size=5, text_key='inscription', id_key='EDCS-ID'):
+    """
+    同一・準同一の碑文テキストをグループ化する
+
+    正規化テキストのハッシュが一致する碑文（同一テキスト）は代表碑文のみを抽出対象にし、
+    結果を他の碑文に複製する。ユニークなテキストはMinHash/LSHで準重複の候補を探して
+    Jaccard類似度で確認するが、準重複は人名や数字だけが異なる別の碑文であることが
+    あるため、結果は複製せず報告のみを行う（それぞれ抽出対象に残す）。
+    計算量は行数ではなくユニークなテキスト数に比例する。
+
+    Parameters:
+    -----------
+    inscriptions : list
+        碑文データのリスト
+    threshold : float
+        準重複とみなすJaccard類似度の下限（デフォルト: 0.9）
+    num_perm : int
+        MinHashのハッシュ関数の数
+    bands : int
+        LSHのバンド数（num_permを割り切れる値）
+    shingle_size : int
+        文字n-gramの長さ
+    text_key : str
+        碑文テキストのキー
+    id_key : str
+        EDCS-IDのキー
+
+    Returns:
+    --------
+    list
+        抽出対象の碑文のリスト（同一テキストの代表碑文と、それ以外の全碑文）
+    dict
+        代表碑文のEDCS-ID → [(同一テキストの碑文, 1.0), ...] の辞書（結果を複製する対象）
+    dict
+        準重複グループの代表碑文のEDCS-ID → [(EDCS-ID, 代表碑文との類似度), ...] の辞書（報告用）
+    """
+    if num_perm % bands != 0:
+        raise ValueError(f"num_perm ({num_perm}) はbands ({bands}) で割り切れる必要があります")
+
+    # 1. 正規化テキストのハッシュで完全一致をまとめる
+    exact_groups = {}
+    singletons = []
+    for item in inscriptions:
+        normalized = normalize_inscription_text(item.get(text_key, ''))
+        if not normalized:
+            # テキストが空のものは重複判定の対象外
+            singletons.append(item)
+            continue
+        digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+        exact_groups.setdefault(digest, (normalized, []))[1].append(item)
+
+    digests = list(exact_groups)
+    texts = [exact_groups[d][0] for d in digests]
+
+    # 同一テキストは最初の碑文を代表にして結果を複製する
+    representatives = []
+    duplicates = {}
+    for digest in digests:
+        items = exact_groups[digest][1]
+        representatives.append(items[0])
+        if len(items) > 1:
+            duplicates[items[0].get(id_key)] = [(item, 1.0) for item in items[1:]]
+
+    # 2. ユニークなテキストのみMinHash/LSHで準重複の候補を探す（報告のみ）
+    near_duplicates = {}
+    if threshold < 1.0 and len(digests) > 1:
+        rng = np.random.default_rng(1)
+        a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64) & _MAX_HASH
+        b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64) & _MAX_HASH
+        shingle_sets = [_shingles(t, shingle_size) for t in texts]
+        rows = num_perm // bands
+
+        buckets = {}
+        for idx, shingles in enumerate(shingle_sets):
+            signature = _minhash_signature(shingles, a, b)
+            for band in range(bands):
+                key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+                buckets.setdefault(key, []).append(idx)
+
+        def jaccard(i, j):
+            s1, s2 = shingle_sets[i], shingle_sets[j]
+            return len(s1 & s2) / len(s1 | s2)
+
+        # バケット内の全ての組を比較する
+        parent = list(range(len(digests)))
+        checked = set()
+        for candidates in buckets.values():
+            for pos, i in enumerate(candidates):
+                for j in candidates[pos + 1:]:
+                    if (i, j) in checked:
+                        continue
+                    checked.add((i, j))
+                    if jaccard(i, j) >= threshold:
+                        root_i, root_j = _find(parent, i), _find(parent, j)
+                        if root_i != root_j:
+                            parent[root_j] = root_i
+
+        clusters = {}
+        for idx in range(len(digests)):
+            clusters.setdefault(_find(parent, idx), []).append(idx)
+
+        # 3. グループごとに代表碑文（最も長いテキスト）を選び、代表碑文との類似度を記録する
+        for members in clusters.values():
+            if len(members) < 2:
+                continue
+            rep_idx = max(members, key=lambda m: (len(texts[m]), -m))
+            rep_id = exact_groups[digests[rep_idx]][1][0].get(id_key)
+            near_duplicates[rep_id] = [
+                (exact_groups[digests[m]][1][0].get(id_key), round(jaccard(rep_idx, m), 4))
+                for m in members if m != rep_idx]
+
+    # 元の並び順を保つ
+    order = {id(item): i for i, item in enumerate(inscriptions)}
+    representatives.extend(singletons)
+    representatives.sort(key=lambda item: order[id(item)])
+
+    return representatives, duplicates, near_duplicates
+
+
+def fan_out_result(result, member_item, representative_id, similarity):
+    """
+    代表碑文の抽出結果を同一テキストの碑文用に複製する
+
+    Parameters:
+    -----------
+    result : dict
+        代表碑文の抽出結果
+    member_item : dict
+        重複碑文の元データ
+    representative_id : str
+        代表碑文のEDCS-ID
+    similarity : float
+        代表碑文との類似度（同一テキストのため常に1.0）
+
+    Returns:
+    --------
+    dict
+        重複碑文のEDCS-IDに書き換えた抽出結果
+    """
+    member_result = copy.deepcopy({k: v for k, v in result.items() if k != 'original_data'})
+    member_result['edcs_id'] = member_item.get('EDCS-ID', 'Unknown')
+    member_result['dedup_of'] = representative_id
+    member_result['dedup_similarity'] = similarity
+    if 'original_data' in result:
+        member_result['original_data'] = member_item
+    return member_result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='同一・準同一の碑文テキストを検出')
+    parser.add_argument('--input', '-i', type=str, required=True,
+                        help='入力JSONファイルのパス（filtered_data）')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='重複グループを書き出すJSONファイルのパス')
+    parser.add_argument('--threshold', '-t', type=float, default=0.9,
+                        help='準重複とみなすJaccard類似度の下限（デフォルト: 0.9）')
+
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        inscriptions = json.load(f)
+
+    representatives, duplicates, near_duplicates = group_duplicate_inscriptions(
+        inscriptions, threshold=args.threshold)
+
+    print(f"総件数: {len(inscriptions)}件")
+    print(f"抽出対象: {len(representatives)}件")
+    print(f"同一テキストとして省略: {len(inscriptions) - len(representatives)}件 ({len(duplicates)}グループ)")
+    print(f"準重複（個別に抽出）: {sum(len(m) for m in near_duplicates.values())}件 "
+          f"({len(near_duplicates)}グループ)")
+
+    if args.output:
+        groups = {
+            'duplicates': {rep_id: [{'edcs_id': item.get('EDCS-ID'), 'similarity': sim} for item, sim in members]
+                           for rep_id, members in duplicates.items()},
+            'near_duplicates': {rep_id: [{'edcs_id': edcs_id, 'similarity': sim} for edcs_id, sim in members]
+                                for rep_id, members in near_duplicates.items()},
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(groups, f, ensure_ascii=False, indent=2)
+        print(f"重複グループを保存: {args.output}")
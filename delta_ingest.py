@@ -0,0 +1,405 @@
+import argparse
+import hashlib
+import json
+import os
+
+import profiling
+from create_rdf import STREAM_PREFIXES, add_inscription_to_graph, load_pleiades_mapping, write_inscription
+from edcs_fields import COORDINATE_COLUMNS, DATING_COLUMNS, DERIVED_DATING_COLUMNS, as_float, as_int
+from edcs_index import EdcsIndex
+from rdf_writer import LINE_FORMATS, StreamingRDFWriter, TripleBlock
+from record_io import (compression_suffix, dump_json, iter_json_records, open_input, open_output, open_text,
+                       strip_compression_suffix, write_json_records)
+
+
+# 抽出プロンプトに渡す列（これらが変わった碑文のみLLMで抽出し直す）
+EXTRACTION_COLUMNS = ('inscription', 'dating_from', 'dating_to')
+
+
+def _digest(value):
+    text = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def row_hashes(record):
+    """
+    行全体と抽出に使う列（EXTRACTION_COLUMNS）のハッシュを返す
+
+    年代の派生列（dating_mid など）は年代から計算でき、古い変換結果には無いため含めない。
+    年代・座標は型をそろえてから比較する（古い変換結果では年代が 151.0 などになっている）
+    """
+    row = {}
+    for column, value in record.items():
+        if column in DERIVED_DATING_COLUMNS:
+            continue
+        if column in DATING_COLUMNS:
+            value = as_int(value)
+        elif column in COORDINATE_COLUMNS:
+            value = as_float(value)
+        row[column] = value
+    extraction = [row.get(column) for column in EXTRACTION_COLUMNS]
+    return _digest(row), _digest(extraction)
+
+
+def is_tsv_path(path):
+    return strip_compression_suffix(path).endswith('.tsv')
+
+
+def iter_snapshot_records(path):
+    """
+    EDCSのスナップショット（TSV、または変換済みの JSON / JSONL）の行を1件ずつ返す
+
+    TSVは convert_tsv_to_json.py と同じ正規化をしてから返すため、同じ内容の
+    TSVと変換済みのJSONは同じハッシュになる。
+    """
+    if not is_tsv_path(path):
+        yield from iter_json_records(path)
+        return
+    import pandas as pd
+    from convert_tsv_to_json import normalize_columns
+    with open_input(path) as f:
+        df = pd.read_csv(f, sep='\t')
+    yield from normalize_columns(df).to_dict('records')
+
+
+def snapshot_hashes(path):
+    """
+    スナップショットの EDCS-ID → (行のハッシュ, 抽出に使う列のハッシュ) を返す（ファイル順）
+    """
+    hashes = {}
+    with profiling.span('hash_rows', path=path):
+        for record in iter_snapshot_records(path):
+            hashes[record.get('EDCS-ID')] = row_hashes(record)
+    return hashes
+
+
+def compute_delta(old_path, new_path):
+    """
+    2つのスナップショットを行のハッシュで比較する
+
+    Parameters:
+    -----------
+    old_path : str
+        前回のスナップショット（TSV、または filtered_data の JSON / JSONL）
+    new_path : str
+        新しいスナップショット
+
+    Returns:
+    --------
+    dict
+        added（追加）、changed（内容が変わった）、reextract（changed のうち抽出に使う列が
+        変わった）、removed（削除）のEDCS-IDのリストと、unchanged（変わらなかった件数）
+    """
+    old_hashes = snapshot_hashes(old_path)
+    new_hashes = snapshot_hashes(new_path)
+
+    added = []
+    changed = []
+    reextract = []
+    unchanged = 0
+    for edcs_id, (row_hash, extraction_hash) in new_hashes.items():
+        previous = old_hashes.get(edcs_id)
+        if previous is None:
+            added.append(edcs_id)
+        elif previous[0] != row_hash:
+            changed.append(edcs_id)
+            if previous[1] != extraction_hash:
+                reextract.append(edcs_id)
+        else:
+            unchanged += 1
+    removed = [edcs_id for edcs_id in old_hashes if edcs_id not in new_hashes]
+
+    return {
+        'old': old_path,
+        'new': new_path,
+        'added': added,
+        'changed': changed,
+        'reextract': reextract,
+        'removed': removed,
+        'unchanged': unchanged,
+    }
+
+
+def update_results(results_path, delta, source_path):
+    """
+    抽出結果ファイルを新しいスナップショットに合わせて更新する
+
+    削除された碑文と、抽出に使う列が変わった碑文の結果を取り除く（後者は
+    process_inscriptions で抽出し直す）。それ以外の列だけが変わった碑文は、
+    元データ（original_data）を持つ旧形式の結果のみ新しい行に置き換える
+    （コンパクト形式はRDF生成時に元データを参照するため変更不要）。
+
+    Returns:
+    --------
+    dict
+        取り除いた件数（dropped）と元データを置き換えた件数（refreshed）
+    """
+    drop_ids = set(delta['removed']) | set(delta['reextract'])
+    refresh_ids = set(delta['changed']) - drop_ids
+    kept = []
+    dropped = 0
+    refreshed = 0
+    with EdcsIndex(source_path) as source_index:
+        for result in iter_json_records(results_path):
+            edcs_id = result.get('edcs_id')
+            if edcs_id in drop_ids:
+                dropped += 1
+                continue
+            if edcs_id in refresh_ids and 'original_data' in result:
+                result['original_data'] = source_index.get(edcs_id, result['original_data'])
+                refreshed += 1
+            kept.append(result)
+    if dropped or refreshed:
+        write_json_records(results_path, kept)
+    return {'dropped': dropped, 'refreshed': refreshed}
+
+
+def _iri_owner(iri):
+    """
+    IRIのローカル名の先頭（碑文ごとのリソースは EDCS-ID または EDCS-ID_... というローカル名を持つ）
+    """
+    return iri.rsplit('/', 1)[-1].split('_', 1)[0]
+
+
+def _line_terms(line):
+    """
+    N-Triples / N-Quads の1行の主語のIRIと目的語のIRI（目的語がリテラルの場合は None）
+    """
+    if not line.startswith('<'):
+        return '', None
+    subject = line[1:line.index('>')]
+    rest = line.split(' ', 2)[2]
+    obj = rest[1:rest.index('>')] if rest.startswith('<') else None
+    return subject, obj
+
+
+def rebuild_rdf(rdf_path, results_path, source_path, edcs_ids, pleiades_mapping_path=None, format='nt',
+                pleiades_gazetteer_paths=None):
+    """
+    指定した碑文のトリプルのみを作り直す（N-Triples / N-Quads）
+
+    既存のファイルから碑文ごとの行を取り除き、抽出結果ファイルにある碑文の
+    トリプルを末尾に追記する（削除された碑文は取り除くだけ）。複数の碑文から
+    参照される属性（身分・地名など）のうち、取り除いた碑文が参照していたものは
+    行をすべて取り除き、それを参照している残りの碑文から作り直すので、
+    create_rdf.py で全件から作り直した場合と同じトリプルになる。
+
+    Returns:
+    --------
+    dict
+        取り除いた行数（removed_lines）、書き出した碑文数（inscriptions）とトリプル数（triples）
+    """
+    if format not in LINE_FORMATS:
+        raise ValueError(f"差分の反映に対応していない形式です: {format}（create_rdf.py で作り直してください）")
+    from rdflib import Graph
+
+    edcs_ids = set(edcs_ids)
+    owners = {result.get('edcs_id') for result in iter_json_records(results_path)} | edcs_ids
+
+    # 取り除く碑文が参照している共有の主語（この主語の行は残りの碑文から作り直す）
+    referenced = set()
+    shared_subjects = set()
+    with profiling.span('scan_rdf'):
+        with open_input(rdf_path) as src:
+            for raw in src:
+                subject, obj = _line_terms(raw.decode('utf-8'))
+                owner = _iri_owner(subject)
+                if owner in edcs_ids:
+                    if obj is not None:
+                        referenced.add(obj)
+                elif owner not in owners:
+                    shared_subjects.add(subject)
+    stale = referenced & shared_subjects
+
+    # 碑文ごとの行と作り直す共有の主語の行を取り除いたファイルを作り、残す共有の行を集める
+    tmp_path = strip_compression_suffix(rdf_path) + '.tmp' + compression_suffix(rdf_path)
+    removed_lines = 0
+    shared_lines = []
+    referencing = set()
+    with profiling.span('filter_rdf'):
+        with open_input(rdf_path) as src, open_output(tmp_path) as dst:
+            for raw in src:
+                line = raw.decode('utf-8')
+                subject, obj = _line_terms(line)
+                owner = _iri_owner(subject)
+                if owner in edcs_ids or subject in stale:
+                    removed_lines += 1
+                    continue
+                if owner not in owners:
+                    shared_lines.append(line)
+                elif obj in stale:
+                    referencing.add(owner)
+                dst.write(raw)
+    os.replace(tmp_path, rdf_path)
+
+    shared = Graph()
+    if shared_lines:
+        # N-Quads の共有の行はデフォルトグラフにあるため、N-Triples として読める
+        shared.parse(data=''.join(shared_lines), format='nt')
+
+    pleiades_mapping = load_pleiades_mapping(pleiades_mapping_path, pleiades_gazetteer_paths)
+    changed = []
+    with EdcsIndex(source_path) as source_index, \
+            StreamingRDFWriter(rdf_path, format, STREAM_PREFIXES, append=True) as writer:
+        writer.mark_written(shared)
+        with profiling.span('rebuild_shared'):
+            for result in iter_json_records(results_path):
+                edcs_id = result.get('edcs_id')
+                if edcs_id in edcs_ids:
+                    changed.append(result)
+                if edcs_id not in referencing:
+                    continue
+                source_row = None if result.get('original_data') else source_index.get(edcs_id)
+                block = TripleBlock()
+                add_inscription_to_graph(block, result, pleiades_mapping, source_row)
+                writer.write_block([triple for triple in block.triples if str(triple[0]) in stale], str(edcs_id))
+        for result in changed:
+            source_row = None if result.get('original_data') else source_index.get(result.get('edcs_id'))
+            write_inscription(writer, result, pleiades_mapping, source_row)
+        triples = writer.triple_count
+
+    return {'removed_lines': removed_lines, 'inscriptions': len(changed), 'triples': triples}
+
+
+def delta_path_for(new_json_path):
+    """
+    差分を保存するファイルのパス（新しいスナップショットの隣）
+    """
+    base = strip_compression_suffix(new_json_path)
+    for suffix in ('.jsonl', '.json'):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    return base + '_delta.json'
+
+
+def ingest(old_path, new_path, results_path=None, rdf_path=None, rdf_format='nt', extract=False,
+           model_type='claude', new_json_path=None, pleiades_mapping_path=None, pleiades_gazetteer_paths=None,
+           **extract_kwargs):
+    """
+    新しいEDCSスナップショットとの差分を求め、抽出結果とRDFに反映する
+
+    Parameters:
+    -----------
+    old_path : str
+        前回のスナップショット（TSV、または filtered_data の JSON / JSONL）
+    new_path : str
+        新しいスナップショット（TSVの場合は convert_tsv_to_json で変換する）
+    results_path : str, optional
+        更新する抽出結果ファイル
+    rdf_path : str, optional
+        更新するRDFファイル（N-Triples / N-Quads）
+    rdf_format : str
+        RDFファイルの形式（'nt' または 'nquads'）
+    extract : bool
+        追加された碑文と抽出に使う列が変わった碑文をLLMで抽出するかどうか
+    model_type : str
+        使用するモデル ('claude', 'gemini', 'gpt')
+    new_json_path : str, optional
+        新しいTSVの変換先（指定しない場合は convert_tsv_to_json の既定のパス）
+    pleiades_mapping_path : str, optional
+        地名とPleiades IDの対応表ファイルパス（JSON形式）
+    pleiades_gazetteer_paths : list, optional
+        Pleiadesのダンプのパス（対応表にない地名を地名索引で照合する）
+    **extract_kwargs
+        process_inscriptions に渡す引数（compact、client、stream など）
+
+    Returns:
+    --------
+    dict
+        差分（compute_delta の結果）と各段階の件数
+    """
+    if is_tsv_path(new_path):
+        from convert_tsv_to_json import convert_tsv_to_json
+        _, new_path = convert_tsv_to_json(new_path, new_json_path)
+
+    print(f"差分を計算中: {old_path} → {new_path}")
+    delta = compute_delta(old_path, new_path)
+    delta_path = delta_path_for(new_path)
+    with open_text(delta_path, 'w') as f:
+        dump_json(delta, f, pretty=True)
+    print(f"追加: {len(delta['added'])}件、変更: {len(delta['changed'])}件"
+          f"（うち抽出し直す: {len(delta['reextract'])}件）、削除: {len(delta['removed'])}件、"
+          f"変更なし: {delta['unchanged']}件")
+    print(f"差分を保存: {delta_path}")
+
+    summary = {'delta': delta}
+    if results_path and os.path.exists(results_path):
+        summary['results'] = update_results(results_path, delta, new_path)
+        print(f"抽出結果を更新: {summary['results']['dropped']}件を削除、"
+              f"{summary['results']['refreshed']}件の元データを置き換え")
+
+    if results_path and extract:
+        from extract_career_graph import process_inscriptions
+        edcs_ids = delta['added'] + delta['reextract']
+        if edcs_ids:
+            summary['extract'] = process_inscriptions(new_path, results_path, model_type=model_type,
+                                                      edcs_ids=edcs_ids, **extract_kwargs)
+
+    if results_path and rdf_path:
+        affected = delta['added'] + delta['changed'] + delta['removed']
+        if os.path.exists(rdf_path):
+            summary['rdf'] = rebuild_rdf(rdf_path, results_path, new_path, affected,
+                                         pleiades_mapping_path=pleiades_mapping_path, format=rdf_format,
+                                         pleiades_gazetteer_paths=pleiades_gazetteer_paths)
+            print(f"RDFを更新: {summary['rdf']['removed_lines']}行を削除、"
+                  f"{summary['rdf']['inscriptions']}件の碑文（{summary['rdf']['triples']}トリプル）を追記")
+        else:
+            from create_rdf import create_rdf_graph
+            summary['rdf'] = create_rdf_graph(results_path, rdf_path, format=rdf_format,
+                                              pleiades_mapping_path=pleiades_mapping_path, source_path=new_path,
+                                              pleiades_gazetteer_paths=pleiades_gazetteer_paths)
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='EDCSの再ダウンロード分を前回のスナップショットと比較し、変わった碑文のみ抽出結果とRDFに反映')
+    parser.add_argument('--old', type=str, required=True,
+                        help='前回のスナップショット（TSV、または filtered_data の JSON / JSONL）')
+    parser.add_argument('--new', type=str, required=True,
+                        help='新しいスナップショット（TSVの場合はJSONに変換する）')
+    parser.add_argument('--new-json', type=str, default=None,
+                        help='新しいTSVの変換先（指定しない場合は filtered_data/ 以下に自動生成）')
+    parser.add_argument('--results', type=str, default=None,
+                        help='更新する抽出結果ファイル（削除・変更された碑文の結果を取り除く）')
+    parser.add_argument('--extract', action='store_true',
+                        help='追加された碑文と、テキスト・年代が変わった碑文をLLMで抽出する（--results が必要）')
+    parser.add_argument('--model', '-m', type=str, default='claude', choices=['claude', 'gemini', 'gpt'],
+                        help='使用するLLMモデル（デフォルト: claude）')
+    parser.add_argument('--api-key', '-k', type=str, default=None,
+                        help='APIキー（指定しない場合は環境変数から取得）')
+    parser.add_argument('--compact', action='store_true',
+                        help='元データと旧形式の重複フィールドを抽出結果に出力しない')
+    parser.add_argument('--rdf', type=str, default=None,
+                        help='更新するRDFファイル（N-Triples / N-Quads。存在しない場合は全件から作成）')
+    parser.add_argument('--rdf-format', type=str, default='nt', choices=list(LINE_FORMATS),
+                        help='RDFファイルの形式（デフォルト: nt）')
+    parser.add_argument('--pleiades-mapping', '-p', type=str, default=None,
+                        help='地名とPleiades IDの対応表ファイルパス（JSON形式）')
+    parser.add_argument('--pleiades-gazetteer', '-g', type=str, nargs='+', default=None,
+                        help='Pleiadesのダンプ（対応表にない地名を地名と座標で照合する）')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='区間ごとの計測を有効にし、トレース（Chrome Trace形式のJSON）を保存するパス')
+
+    args = parser.parse_args()
+
+    if args.extract and not args.results:
+        parser.error('--extract には --results が必要です')
+    extract_kwargs = {}
+    if args.extract:
+        from extract_career_graph import load_env
+        load_env()
+        extract_kwargs = {'api_key': args.api_key, 'compact': args.compact}
+
+    if args.profile:
+        profiling.enable(capture_dir=os.path.dirname(args.profile) or '.')
+
+    ingest(args.old, args.new, results_path=args.results, rdf_path=args.rdf, rdf_format=args.rdf_format,
+           extract=args.extract, model_type=args.model, new_json_path=args.new_json,
+           pleiades_mapping_path=args.pleiades_mapping, pleiades_gazetteer_paths=args.pleiades_gazetteer,
+           **extract_kwargs)
+
+    if args.profile:
+        profiling.finish(args.profile)
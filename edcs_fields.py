@@ -0,0 +1,79 @@
+# convert_tsv_to_json.py が型を揃えて出力する列
+# （変換済みのデータでは整数・浮動小数点数・null のいずれかになる）
+DATING_COLUMNS = ['dating_from', 'dating_to', 'date_not_before', 'date_not_after']
+COORDINATE_COLUMNS = ['latitude', 'longitude']
+
+# 変換時に追加する派生列（dating_from / dating_to から計算）
+DERIVED_DATING_COLUMNS = ['dating_mid', 'dating_span', 'dating_century']
+
+
+def as_int(value):
+    """
+    年代などの値を整数に変換する（空・不正な値は None）
+
+    変換済みのデータでは値がそのまま返る。旧形式のデータ（151.0 や '151'、
+    欠損を表す空文字列）にも対応する。
+    """
+    if value is None or value == '':
+        return None
+    if type(value) is int:
+        return value
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def as_float(value):
+    """
+    座標などの値を浮動小数点数に変換する（空・不正な値は None）
+    """
+    if value is None or value == '':
+        return None
+    if type(value) is float:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def dating_range(row):
+    """
+    元データの年代範囲を (dating_from, dating_to) の整数で返す（不明な場合は None）
+    """
+    if not row:
+        return None
+    dating_from = as_int(row.get('dating_from'))
+    dating_to = as_int(row.get('dating_to'))
+    if dating_from is None or dating_to is None:
+        return None
+    if dating_from > dating_to:
+        dating_from, dating_to = dating_to, dating_from
+    return dating_from, dating_to
+
+
+def century_of(year):
+    """
+    年の世紀を返す（紀元前は負の値、例: -1 は前1世紀。紀元0年はないため0以下は紀元前）
+    """
+    if year is None:
+        return None
+    if year > 0:
+        return (year - 1) // 100 + 1
+    return -(max(-year - 1, 0) // 100 + 1)
+
+
+def dating_century(row):
+    """
+    元データの年代範囲の中央の年の世紀を返す（変換済みのデータでは dating_century をそのまま使う）
+    """
+    if not row:
+        return None
+    century = as_int(row.get('dating_century'))
+    if century is not None:
+        return century
+    dating = dating_range(row)
+    if dating is None:
+        return None
+    return century_of((dating[0] + dating[1]) // 2)
@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import sqlite3
+import zlib
+
+from record_io import COMPACT_SEPARATORS, is_compressed_path, is_jsonl_path, iter_json_record_spans
+
+
+INDEX_SUFFIX = '.idx.sqlite'
+
+# 圧縮ファイルのレコードをまとめて保存するブロックの件数
+PAYLOAD_BLOCK_SIZE = 64
+
+
+def index_path_for(path):
+    """
+    データファイルに対応するインデックスファイルのパスを返す
+    """
+    return path + INDEX_SUFFIX
+
+
+def record_key(record):
+    """
+    レコードのEDCS-IDを返す（抽出結果は edcs_id、filtered_data は EDCS-ID）
+    """
+    return record.get('edcs_id') or record.get('EDCS-ID')
+
+
+class EdcsIndex:
+    """
+    JSON/JSONLファイルに対する EDCS-ID → バイト位置 のオンディスクインデックス
+
+    インデックスはデータファイルの隣に SQLite ファイルとして保存し、データファイルの
+    サイズと更新時刻が変わっていれば開くときに作り直す。JSON Linesに追記された
+    場合は追記部分のみを索引に加える。
+
+    圧縮ファイル（.gz / .zst）はバイト位置で読み出せないため、レコード自体を
+    PAYLOAD_BLOCK_SIZE 件ずつ zlib で圧縮してインデックスに保存し、records には
+    バイト位置の代わりに (ブロック番号, ブロック内の位置) を記録する（変更時は常に作り直す）。
+
+    使用例:
+        with EdcsIndex('filtered_data/Uthina/xxx.json') as index:
+            row = index.get('EDCS-21000577')
+    """
+
+    def __init__(self, path, rebuild=False):
+        self.path = path
+        self.index_path = index_path_for(path)
+        self._data_file = None
+        self._cached_block = (None, None)
+        self.compressed = is_compressed_path(path)
+        self._conn = sqlite3.connect(self.index_path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records (edcs_id TEXT PRIMARY KEY, offset INTEGER, length INTEGER)")
+        if self.compressed:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS blocks (block INTEGER PRIMARY KEY, data BLOB)")
+        self.refresh(rebuild=rebuild)
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def refresh(self, rebuild=False):
+        """
+        データファイルの変更を検出してインデックスを更新する
+        """
+        if not os.path.exists(self.path):
+            size, mtime = 0, 0
+        else:
+            stat = os.stat(self.path)
+            size, mtime = stat.st_size, stat.st_mtime_ns
+
+        indexed_size = int(self._meta('size') or -1)
+        indexed_mtime = int(self._meta('mtime_ns') or -1)
+        if not rebuild and indexed_size == size and indexed_mtime == mtime:
+            return
+
+        start = 0
+        if (not rebuild and not self.compressed and is_jsonl_path(self.path)
+                and 0 < indexed_size < size and self._ends_line_at(indexed_size)):
+            # JSON Linesへの追記分のみを索引に加える
+            start = indexed_size
+        else:
+            self._conn.execute("DELETE FROM records")
+            if self.compressed:
+                self._conn.execute("DELETE FROM blocks")
+
+        if self._data_file is not None:
+            self._data_file.close()
+            self._data_file = None
+
+        if size and self.compressed:
+            self._index_payloads()
+        elif size:
+            rows = ((record_key(record), offset, length)
+                    for record, offset, length in self._iter_spans(start))
+            # 同じEDCS-IDが複数ある場合は後のレコードを優先
+            self._conn.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?)", rows)
+
+        self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                               [('size', str(size)), ('mtime_ns', str(mtime))])
+        self._conn.commit()
+
+    def _index_payloads(self):
+        """
+        圧縮ファイルのレコードをブロック単位でインデックスに保存する
+        """
+        self._cached_block = (None, None)
+        rows = []
+        lines = []
+        block = 0
+        for record, _, _ in self._iter_spans(0):
+            rows.append((record_key(record), block, len(lines)))
+            lines.append(json.dumps(record, ensure_ascii=False, separators=COMPACT_SEPARATORS))
+            if len(lines) == PAYLOAD_BLOCK_SIZE:
+                self._conn.execute("INSERT INTO blocks VALUES (?, ?)",
+                                   (block, zlib.compress('\n'.join(lines).encode('utf-8'))))
+                block += 1
+                lines = []
+        if lines:
+            self._conn.execute("INSERT INTO blocks VALUES (?, ?)",
+                               (block, zlib.compress('\n'.join(lines).encode('utf-8'))))
+        # 同じEDCS-IDが複数ある場合は後のレコードを優先
+        self._conn.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?)", rows)
+
+    def _read_payload(self, block, position):
+        if self._cached_block[0] != block:
+            data = self._conn.execute("SELECT data FROM blocks WHERE block = ?", (block,)).fetchone()[0]
+            self._cached_block = (block, zlib.decompress(data).split(b'\n'))
+        return json.loads(self._cached_block[1][position])
+
+    def _ends_line_at(self, offset):
+        with open(self.path, 'rb') as f:
+            f.seek(offset - 1)
+            return f.read(1) == b'\n'
+
+    def _iter_spans(self, start):
+        if start == 0:
+            yield from iter_json_record_spans(self.path)
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if line.strip():
+                    yield json.loads(line), offset, len(line.rstrip(b'\r\n'))
+                offset += len(line)
+
+    def get(self, edcs_id, default=None):
+        """
+        EDCS-IDに対応するレコードを返す（ファイル全体は読み込まない）
+        """
+        row = self._conn.execute("SELECT offset, length FROM records WHERE edcs_id = ?", (edcs_id,)).fetchone()
+        if row is None:
+            return default
+        if self.compressed:
+            return self._read_payload(row[0], row[1])
+        if self._data_file is None:
+            self._data_file = open(self.path, 'rb')
+        self._data_file.seek(row[0])
+        return json.loads(self._data_file.read(row[1]))
+
+    def __contains__(self, edcs_id):
+        return self._conn.execute("SELECT 1 FROM records WHERE edcs_id = ?", (edcs_id,)).fetchone() is not None
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def ids(self):
+        """
+        索引済みの全EDCS-IDを返す
+        """
+        return (row[0] for row in self._conn.execute("SELECT edcs_id FROM records"))
+
+    def close(self):
+        if self._data_file is not None:
+            self._data_file.close()
+            self._data_file = None
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='EDCS-IDによるJSON/JSONLファイルのインデックス')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='インデックスを作成（または更新）する')
+    build_parser.add_argument('paths', nargs='+', help='データファイルのパス')
+    build_parser.add_argument('--rebuild', action='store_true', help='既存のインデックスを作り直す')
+
+    get_parser = subparsers.add_parser('get', help='EDCS-IDでレコードを取得する')
+    get_parser.add_argument('path', help='データファイルのパス')
+    get_parser.add_argument('edcs_ids', nargs='+', help='EDCS-ID')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        for path in args.paths:
+            with EdcsIndex(path, rebuild=args.rebuild) as index:
+                print(f"{path}: {len(index)}件 → {index.index_path}")
+    else:
+        with EdcsIndex(args.path) as index:
+            for edcs_id in args.edcs_ids:
+                record = index.get(edcs_id)
+                if record is None:
+                    print(f"見つかりません: {edcs_id}")
+                else:
+                    print(json.dumps(record, ensure_ascii=False, indent=2))
@@ -0,0 +1,309 @@
+import argparse
+import os
+
+from career_schema import LEGACY_PERSON_FIELDS
+from record_io import iter_json_records
+from edcs_index import EdcsIndex
+from edcs_fields import as_float, as_int, dating_century, dating_range
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# 1つの行グループ（Parquetへの書き出し単位）の行数
+BATCH_ROWS = 65536
+
+_SKIP_NAMES = {'Parse Error', 'Error', 'No Text'}
+# 最も古い形式でトップレベルのフィールドを人物とみなさない person_name
+_LEGACY_SKIP_NAMES = _SKIP_NAMES | {'Unknown'}
+
+
+def _string():
+    return pa.string()
+
+
+def _category():
+    # 値の種類が少ない列は辞書エンコードで保持する
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def table_schemas():
+    """
+    出力する表とその列の型
+
+    キーの列（*_key）は create_rdf.py のURIのローカル名と同じ形式で、RDFや
+    social_network.py の節点キーとそのまま突き合わせられる。
+    """
+    return {
+        'inscriptions': pa.schema([
+            ('edcs_id', _string()), ('province', _category()), ('place', _category()),
+            ('dating_from', pa.int32()), ('dating_to', pa.int32()), ('century', pa.int32()),
+            ('latitude', pa.float64()), ('longitude', pa.float64()),
+            ('person_count', pa.int32()), ('notes', _string()),
+        ]),
+        'persons': pa.schema([
+            ('person_key', _string()), ('edcs_id', _string()), ('person_id', pa.int32()),
+            ('person_name', _string()), ('person_name_readable', _string()),
+            ('person_name_normalized', _string()), ('person_name_link', _string()),
+            ('praenomen', _category()), ('nomen', _string()), ('cognomen', _string()),
+            ('social_status', _category()), ('social_status_evidence', _string()),
+            ('gender', _category()), ('ethnicity', _category()), ('age_at_death', _string()),
+            ('has_career', pa.bool_()),
+        ]),
+        'career_path': pa.schema([
+            ('career_key', _string()), ('person_key', _string()), ('edcs_id', _string()),
+            ('person_id', pa.int32()), ('order', pa.int32()), ('position', _string()),
+            ('position_normalized', _category()), ('position_abstract', _category()),
+            ('position_type', _category()), ('position_description', _string()),
+        ]),
+        'benefactions': pa.schema([
+            ('benefaction_key', _string()), ('person_key', _string()), ('edcs_id', _string()),
+            ('person_id', pa.int32()), ('benefaction_type', _category()), ('object', _string()),
+            ('object_type', _category()), ('object_description', _string()),
+            ('benefaction_text', _string()), ('cost', _string()), ('notes', _string()),
+        ]),
+        'communities': pa.schema([
+            ('community_key', _string()), ('edcs_id', _string()), ('community_id', pa.int32()),
+            ('community_name', _string()), ('community_name_normalized', _category()),
+            ('community_type', _category()), ('community_description', _string()),
+            ('evidence', _string()),
+        ]),
+        'person_relationships': pa.schema([
+            ('relationship_key', _string()), ('edcs_id', _string()), ('source_person_key', _string()),
+            ('target_person_key', _string()), ('target_community_key', _string()),
+            ('type', _category()), ('property', _category()), ('property_text', _string()),
+            ('notes', _string()),
+        ]),
+    }
+
+
+def _text(value):
+    if value is None:
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+class _TableBuilder:
+    """
+    列ごとのリストに行を溜め、BATCH_ROWS 行ごとにArrowの配列へ変換してParquetに書き出す
+    """
+
+    def __init__(self, path, schema, batch_rows=BATCH_ROWS):
+        self.path = path
+        self.schema = schema
+        self.batch_rows = batch_rows
+        self.columns = {name: [] for name in schema.names}
+        self.row_count = 0
+        self._pending = 0
+        self._writer = pq.ParquetWriter(path, schema, compression='zstd')
+
+    def append(self, **values):
+        for name, column in self.columns.items():
+            column.append(values.get(name))
+        self._pending += 1
+        if self._pending >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        arrays = []
+        for field in self.schema:
+            values = self.columns[field.name]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=field.type.value_type).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+            values.clear()
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.row_count += self._pending
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+
+def _add_result(builders, item, row):
+    """
+    1件の抽出結果を各表の行に展開する
+    """
+    edcs_id = item['edcs_id']
+    dating = dating_range(row)
+    persons = item.get('persons') or []
+    if not persons:
+        # 旧形式: main_persons の並び順を person_id とみなす
+        main_persons = item.get('main_persons') or []
+        if not main_persons and item.get('person_name', 'Unknown') not in _LEGACY_SKIP_NAMES:
+            # さらに古い形式: トップレベルのフィールドを1人目の人物とみなす（create_rdf.py と同じ）
+            main_persons = [{field: item.get(field, default) for field, default in LEGACY_PERSON_FIELDS.items()}]
+        persons = [dict(person, person_id=idx) for idx, person in enumerate(main_persons)]
+    persons = [person for person in persons if person.get('person_name') not in _SKIP_NAMES]
+
+    builders['inscriptions'].append(
+        edcs_id=edcs_id, province=row.get('province') or None, place=row.get('place') or None,
+        dating_from=dating[0] if dating else None, dating_to=dating[1] if dating else None,
+        century=dating_century(row), latitude=as_float(row.get('latitude')),
+        longitude=as_float(row.get('longitude')), person_count=len(persons), notes=item.get('notes') or None)
+
+    for person in persons:
+        person_id = as_int(person.get('person_id')) or 0
+        person_key = f"{edcs_id}_person_{person_id}"
+        builders['persons'].append(
+            person_key=person_key, edcs_id=edcs_id, person_id=person_id,
+            has_career=bool(person.get('has_career', False)),
+            **{name: _text(person.get(name)) or None for name in (
+                'person_name', 'person_name_readable', 'person_name_normalized', 'person_name_link',
+                'praenomen', 'nomen', 'cognomen', 'social_status', 'social_status_evidence',
+                'gender', 'ethnicity', 'age_at_death')})
+
+        for step in person.get('career_path') or []:
+            order = as_int(step.get('order'))
+            builders['career_path'].append(
+                career_key=f"{person_key}_career_{order or 0}", person_key=person_key, edcs_id=edcs_id,
+                person_id=person_id, order=order,
+                **{name: _text(step.get(name)) or None for name in (
+                    'position', 'position_normalized', 'position_abstract', 'position_type',
+                    'position_description')})
+
+        for idx, benefaction in enumerate(person.get('benefactions') or [], 1):
+            builders['benefactions'].append(
+                benefaction_key=f"{person_key}_benef_{idx}", person_key=person_key, edcs_id=edcs_id,
+                person_id=person_id,
+                **{name: _text(benefaction.get(name)) or None for name in (
+                    'benefaction_type', 'object', 'object_type', 'object_description',
+                    'benefaction_text', 'cost', 'notes')})
+
+    for community in item.get('communities') or []:
+        community_id = as_int(community.get('community_id')) or 0
+        builders['communities'].append(
+            community_key=f"{edcs_id}_community_{community_id}", edcs_id=edcs_id, community_id=community_id,
+            **{name: _text(community.get(name)) or None for name in (
+                'community_name', 'community_name_normalized', 'community_type',
+                'community_description', 'evidence')})
+
+    relationships = item.get('person_relationships', item.get('relationships')) or []
+    for idx, relationship in enumerate(relationships, 1):
+        source_person_id = relationship.get('source_person_id')
+        target_person_id = relationship.get('target_person_id')
+        target_community_id = relationship.get('target_community_id')
+        # 後方互換性: 古い形式の source_person_index / target_person_index
+        if source_person_id is None:
+            source_person_id = relationship.get('source_person_index', 0)
+        if target_person_id is None:
+            target_person_id = relationship.get('target_person_index')
+
+        if target_community_id is not None:
+            target_person_key = None
+            target_community_key = f"{edcs_id}_community_{target_community_id}"
+        elif target_person_id is not None:
+            target_person_key = f"{edcs_id}_person_{target_person_id}"
+            target_community_key = None
+        else:
+            # 旧形式：関係の相手が人物リストにない場合は create_rdf.py と同じキー
+            target_person_key = f"{edcs_id}_rel_{idx}"
+            target_community_key = None
+        builders['person_relationships'].append(
+            relationship_key=f"{edcs_id}_rel_{idx}", edcs_id=edcs_id,
+            source_person_key=f"{edcs_id}_person_{source_person_id}",
+            target_person_key=target_person_key, target_community_key=target_community_key,
+            **{name: _text(relationship.get(name)) or None for name in (
+                'type', 'property', 'property_text', 'notes')})
+
+
+def export_tables(json_paths, output_dir, source_path=None, batch_rows=BATCH_ROWS):
+    """
+    抽出結果の入れ子の配列を正規化した表に展開し、表ごとにParquetファイルとして保存する
+
+    persons・career_path・benefactions・communities・person_relationships と碑文ごとの
+    属性（inscriptions）の6つの表を作る。抽出結果は1件ずつ読み、列ごとに溜めた値を
+    batch_rows 行ごとにArrowの配列に変換して書き出すので、コーパス全体でもメモリに
+    載せる必要はない。保存した表は pyarrow / pandas / DuckDB から直接集計できる。
+
+    使用例（DuckDB）:
+        SELECT i.century, b.object_type, count(*)
+        FROM 'out/benefactions.parquet' b JOIN 'out/inscriptions.parquet' i USING (edcs_id)
+        GROUP BY ALL
+
+    Parameters:
+    -----------
+    json_paths : list
+        抽出結果ファイルのパスのリスト（JSON配列または .jsonl）
+    output_dir : str
+        Parquetファイルを保存するディレクトリ
+    source_path : str, optional
+        元データのファイルパス（コンパクト形式の抽出結果で属州・地名・年代を参照するため）
+    batch_rows : int
+        1つの行グループの行数
+
+    Returns:
+    --------
+    dict
+        表の名前と (保存したファイルパス, 行数)
+    """
+    if pa is None:
+        raise ImportError("Parquetでの保存には pyarrow が必要です（pip install pyarrow）")
+
+    os.makedirs(output_dir, exist_ok=True)
+    builders = {name: _TableBuilder(os.path.join(output_dir, f'{name}.parquet'), schema, batch_rows)
+                for name, schema in table_schemas().items()}
+    source_index = EdcsIndex(source_path) if source_path else None
+    try:
+        for json_path in json_paths:
+            for item in iter_json_records(json_path):
+                if not item.get('edcs_id'):
+                    continue
+                row = item.get('original_data')
+                if not row and source_index is not None:
+                    row = source_index.get(item['edcs_id'])
+                _add_result(builders, item, row or {})
+    finally:
+        if source_index is not None:
+            source_index.close()
+        for builder in builders.values():
+            builder.close()
+
+    return {name: (builder.path, builder.row_count) for name, builder in builders.items()}
+
+
+def benefactions_by_century(output_dir):
+    """
+    保存した表から、世紀ごと・object_type ごとの恵与行為の件数を集計する（Arrowの結合・集約）
+    """
+    benefactions = pq.read_table(os.path.join(output_dir, 'benefactions.parquet'),
+                                 columns=['edcs_id', 'object_type'])
+    inscriptions = pq.read_table(os.path.join(output_dir, 'inscriptions.parquet'),
+                                 columns=['edcs_id', 'century'])
+    joined = benefactions.join(inscriptions, 'edcs_id')
+    counts = joined.group_by(['century', 'object_type']).aggregate([('edcs_id', 'count')])
+    counts = counts.rename_columns(['century', 'object_type', 'count'])
+    return counts.sort_by([('century', 'ascending'), ('count', 'descending')])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='抽出結果を人物・経歴・恵与行為・関係などの表（Parquet）に展開')
+    parser.add_argument('inputs', nargs='+',
+                        help='抽出結果ファイルのパス（JSON配列または .jsonl、複数指定可）')
+    parser.add_argument('--source', '-s', type=str, default=None,
+                        help='元データ（filtered_data）のファイルパス（コンパクト形式の入力で属州・年代を参照）')
+    parser.add_argument('--output-dir', '-o', type=str, required=True,
+                        help='Parquetファイルを保存するディレクトリ')
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS,
+                        help=f'1つの行グループの行数（デフォルト: {BATCH_ROWS}）')
+    parser.add_argument('--summary', action='store_true',
+                        help='保存後に世紀ごと・object_type ごとの恵与行為の件数を表示する')
+
+    args = parser.parse_args()
+
+    print(f"抽出結果を読み込み中: {', '.join(args.inputs)}")
+    saved = export_tables(args.inputs, args.output_dir, source_path=args.source, batch_rows=args.batch_rows)
+    for name, (path, rows) in saved.items():
+        print(f"  {name}: {rows}行 → {path}")
+
+    if args.summary:
+        print("\n世紀ごとの恵与行為（object_type 別）:")
+        print(benefactions_by_century(args.output_dir).to_pandas().to_string(index=False))
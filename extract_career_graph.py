@@ -1,17 +1,29 @@
 import json
 import os
-from anthropic import Anthropic
-import google.generativeai as genai
-from openai import OpenAI
-from dotenv import load_dotenv
-from tqdm import tqdm
-
-# .envファイルから環境変数を読み込む
-load_dotenv()
-
-roman_emperors = {'Augustus': 'Q1405', 'Tiberius': 'Q1407', 'Caligula': 'Q1409', 'Claudius': 'Q1411', 'Nero': 'Q1413', 'Galba': 'Q1414', 'Otho': 'Q1416', 'Vitellius': 'Q1417', 'Vespasian': 'Q1419', 'Titus': 'Q1421', 'Domitian': 'Q1423', 'Nerva': 'Q1424', 'Trajan': 'Q1425', 'Hadrian': 'Q1427', 'Antoninus Pius': 'Q1429', 'Marcus Aurelius': 'Q1430', 'Lucius Verus': 'Q1433', 'Commodus': 'Q1434', 'Pertinax': 'Q1436', 'Didius Julianus': 'Q1440', 'Septimius Severus': 'Q1442', 'Caracalla': 'Q1446', 'Geta (emperor)': 'Q183089', 'Macrinus': 'Q1752', 'Diadumenian': 'Q46840', 'Elagabalus': 'Q1762', 'Severus Alexander': 'Q1769', 'Maximinus Thrax': 'Q1777', 'Gordian I': 'Q1782', 'Gordian II': 'Q1803', 'Pupienus': 'Q1797', 'Balbinus': 'Q1805', 'Gordian III': 'Q1812', 'Philip the Arab': 'Q1817', 'Philip II (Roman emperor)': 'Q318865', 'Decius': 'Q1830', 'Herennius Etruscus': 'Q273253', 'Trebonianus Gallus': 'Q171023', 'Hostilian': 'Q46837', 'Volusianus': 'Q202222', 'Aemilianus': 'Q177980', 'Silbannacus': 'Q442570', 'Valerian (emperor)': 'Q46750', 'Gallienus': 'Q104475', 'Saloninus': 'Q297494', 'Claudius Gothicus': 'Q46762', 'Quintillus': 'Q185844', 'Aurelian': 'Q46780', 'Tacitus (emperor)': 'Q177988', 'Florianus': 'Q199946', 'Probus (emperor)': 'Q187068', 'Carus': 'Q187004', 'Carinus': 'Q190097', 'Numerian': 'Q46821', 'Diocletian': 'Q43107', 'Maximian': 'Q46768', 'Galerius': 'Q172168', 'Constantius Chlorus': 'Q131195', 'Severus II': 'Q46814', 'Maxentius': 'Q182070', 'Licinius': 'Q184549', 'Maximinus Daza': 'Q189095', 'Valerius Valens': 'Q311274', 'Martinian (emperor)': 'Q268744', 'Constantine the Great': 'Q8413', 'Constantine II (emperor)': 'Q46734', 'Constans I': 'Q185538', 'Constantius II': 'Q46418', 'Magnentius': 'Q212876', 'Nepotianus': 'Q367598', 'Julian (emperor)': 'Q33941', 'Jovian (emperor)': 'Q34074', 'Valentinian I': 'Q46720', 'Valens': 'Q172471', 'Procopius (usurper)': 'Q316284', 'Gratian': 'Q189108', 'Magnus Maximus': 'Q211396', 'Valentinian II': 'Q46846', 'Eugenius': 'Q313058', 'Theodosius I': 'Q46696', 'Arcadius': 'Q159369', 'Honorius': 'Q159798', 'Constantine III (Western Roman emperor)': 'Q209793', 'Theodosius II': 'Q160353', 'Priscus Attalus': 'Q316286', 'Constantius III': 'Q201905', 'Joannes': 'Q309847', 'Valentinian III': 'Q170026', 'Marcian': 'Q178004', 'Petronius Maximus': 'Q191940', 'Avitus': 'Q203198', 'Majorian': 'Q191956', 'Libius Severus': 'Q207121', 'Anthemius': 'Q211772', 'Olybrius': 'Q193678', 'Glycerius': 'Q202543', 'Julius Nepos': 'Q103860', 'Romulus Augustulus': 'Q130601', 'Leo I (emperor)': 'Q183776', 'Leo II (emperor)': 'Q191707', 'Zeno (emperor)': 'Q183452', 'Basiliscus': 'Q193056', 'Anastasius I Dicorus': 'Q173470', 'Justin I': 'Q183445', 'Justinian I': 'Q41866', 'Justin II': 'Q183813', 'Tiberius II Constantine': 'Q31491', 'Maurice (emperor)': 'Q181764', 'Phocas': 'Q31556'}
+from collections import Counter
+import profiling
+from llm_stream import StreamAborted, output_budget, read_json_stream
+from record_io import compression_suffix, iter_json_records, ResultWriter, strip_compression_suffix
+from career_model import Inscription
+from career_schema import add_legacy_fields, compact_result, has_career, validate_result
+from edcs_index import EdcsIndex
+from edcs_fields import as_int
+from extraction_prompt import build_prompt, stale_scopes, stamp_result
+from spatial_index import add_query_arguments, iter_selected_records, query_from_args
+
+# プロバイダごとのモデル（MODELS は通常の抽出、CASCADE_MODELS はカスケードの1段目に使う小さなモデル）
+MODELS = {
+    'claude': "claude-sonnet-4-5-20250929",
+    'gemini': 'gemini-3-pro-preview',
+    'gpt': "gpt-5.2-2025-12-11",
+}
+CASCADE_MODELS = {
+    'claude': "claude-haiku-4-5-20251001",
+    'gemini': 'gemini-2.5-flash',
+    'gpt': "gpt-5-mini",
+}
 
-def load_filtered_inscriptions(json_path):
+def load_filtered_inscriptions(json_path, edcs_ids=None):
     """
     JSONファイルから碑文データを読み込む
 
@@ -19,17 +31,20 @@ def load_filtered_inscriptions(json_path):
     -----------
     json_path : str
         JSONファイルのパス
+    edcs_ids : list, optional
+        読み込むEDCS-IDのリスト（指定した場合はインデックスで該当する碑文のみを読み込む）
 
     Returns:
     --------
     list
         碑文データのリスト
     """
-    with open(json_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    if edcs_ids is not None:
+        return list(iter_selected_records(json_path, edcs_ids))
+    return list(iter_json_records(json_path))
 
 
-def call_llm(prompt, model_type, client):
+def call_llm(prompt, model_type, client, model_name=None):
     """
     指定されたLLMモデルを呼び出す
 
@@ -41,15 +56,18 @@ def call_llm(prompt, model_type, client):
         使用するモデル ('claude', 'gemini', 'gpt')
     client : object
         APIクライアント
+    model_name : str, optional
+        プロバイダ内のモデル名（指定しない場合は MODELS[model_type]）
 
     Returns:
     --------
     str
         LLMのレスポンステキスト
     """
+    model_name = model_name or MODELS.get(model_type)
     if model_type == 'claude':
         message = client.messages.create(
-            model="claude-sonnet-4-5-20250929",
+            model=model_name,
             max_tokens=8192,
             temperature=0,
             messages=[{"role": "user", "content": prompt}]
@@ -57,10 +75,10 @@ def call_llm(prompt, model_type, client):
         return message.content[0].text
 
     elif model_type == 'gemini':
-        model = client.GenerativeModel('gemini-3-pro-preview')
+        model = client.GenerativeModel(model_name)
         response = model.generate_content(
             prompt,
-            generation_config=genai.types.GenerationConfig(
+            generation_config=client.types.GenerationConfig(
                 max_output_tokens=8192,
                 temperature=0
             )
@@ -69,7 +87,7 @@ def call_llm(prompt, model_type, client):
 
     elif model_type == 'gpt':
         response = client.chat.completions.create(
-            model="gpt-5.2-2025-12-11",
+            model=model_name,
             messages=[{"role": "user", "content": prompt}],
             max_completion_tokens=16384,  # GPT supports up to 16,384 tokens
             temperature=0
@@ -80,7 +98,177 @@ def call_llm(prompt, model_type, client):
         raise ValueError(f"Unknown model type: {model_type}")
 
 
-def extract_person_and_career(inscription_text, edcs_id, client, model_type='claude', dating_from=None, dating_to=None):
+def _close_gemini_stream(response):
+    """
+    Gemini のストリーミング応答の受信を打ち切る
+
+    GenerateContentResponse には公開の close() がなく、resolve() は残りを最後まで
+    受信するため、内部のストリーム（gRPC の呼び出しは cancel()、REST はジェネレータの
+    close()）を閉じてサーバー側の生成を止める。
+    """
+    stream = getattr(response, '_iterator', None)
+    for name in ('cancel', 'close'):
+        method = getattr(stream, name, None)
+        if method is not None:
+            method()
+            return
+
+
+def iter_llm_stream(prompt, model_type, client, max_tokens=None, model_name=None):
+    """
+    指定されたLLMモデルをストリーミングで呼び出し、出力テキストをチャンクごとに返す
+
+    ジェネレータを close() すると、各プロバイダのストリーム（HTTPレスポンス）も閉じて
+    生成を打ち切る。
+
+    Parameters:
+    -----------
+    prompt : str
+        プロンプト
+    model_type : str
+        使用するモデル ('claude', 'gemini', 'gpt')
+    client : object
+        APIクライアント
+    max_tokens : int, optional
+        出力トークン数の上限（指定しない場合は call_llm と同じ上限）
+    model_name : str, optional
+        プロバイダ内のモデル名（指定しない場合は MODELS[model_type]）
+
+    Yields:
+    -------
+    str
+        出力テキストのチャンク
+    """
+    model_name = model_name or MODELS.get(model_type)
+    if model_type == 'claude':
+        with client.messages.stream(
+            model=model_name,
+            max_tokens=min(max_tokens or 8192, 8192),
+            temperature=0,
+            messages=[{"role": "user", "content": prompt}]
+        ) as stream:
+            yield from stream.text_stream
+
+    elif model_type == 'gemini':
+        model = client.GenerativeModel(model_name)
+        response = model.generate_content(
+            prompt,
+            generation_config=client.types.GenerationConfig(
+                max_output_tokens=min(max_tokens or 8192, 8192),
+                temperature=0
+            ),
+            stream=True
+        )
+        try:
+            for chunk in response:
+                # テキストを持たないチャンク（安全性の判定のみなど）では .text が例外を送出する
+                if chunk.parts:
+                    yield chunk.text
+        finally:
+            _close_gemini_stream(response)
+
+    elif model_type == 'gpt':
+        stream = client.chat.completions.create(
+            model=model_name,
+            messages=[{"role": "user", "content": prompt}],
+            max_completion_tokens=min(max_tokens or 16384, 16384),
+            temperature=0,
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+
+    else:
+        raise ValueError(f"Unknown model type: {model_type}")
+
+
+def call_llm_streaming(prompt, model_type, client, budget_chars=None, model_name=None):
+    """
+    LLMをストリーミングで呼び出し、最上位のJSONオブジェクトが閉じた時点で生成を打ち切る
+
+    出力が budget_chars を超えた場合や出力形式に違反した場合は、その時点で
+    ストリームを閉じて llm_stream.StreamAborted を送出する。
+
+    Returns:
+    --------
+    str
+        JSONオブジェクトの部分のテキスト
+    """
+    # API側の上限は予算より緩く設定する（ラテン語のJSONは1トークンあたり2字以上）
+    max_tokens = budget_chars // 2 if budget_chars else None
+    chunks = iter_llm_stream(prompt, model_type, client, max_tokens=max_tokens, model_name=model_name)
+    try:
+        text, stats = read_json_stream(chunks, budget_chars)
+    except StreamAborted as e:
+        profiling.count('llm_stream_aborted')
+        profiling.count('llm_output_chars', len(e.text))
+        raise
+    finally:
+        chunks.close()
+    profiling.count('llm_output_chars', stats['received_chars'])
+    profiling.count('llm_discarded_chars', stats['discarded_chars'])
+    return text
+
+
+def load_env():
+    """
+    .envファイルから環境変数を読み込む（python-dotenvがない場合は何もしない）
+    """
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def create_client(model_type, api_key=None):
+    """
+    指定されたモデルのAPIクライアントを作成する
+
+    各プロバイダのSDKは使用するモデルの分だけここで読み込む
+    （google.generativeai は grpc/protobuf を含み読み込みに数秒かかるため）
+
+    Parameters:
+    -----------
+    model_type : str
+        使用するモデル ('claude', 'gemini', 'gpt')
+    api_key : str, optional
+        APIキー（指定しない場合は環境変数から取得）
+
+    Returns:
+    --------
+    object
+        APIクライアント
+    """
+    load_env()
+
+    if model_type == 'claude':
+        from anthropic import Anthropic
+        if api_key:
+            return Anthropic(api_key=api_key)
+        return Anthropic()  # 環境変数ANTHROPIC_API_KEYから取得
+    elif model_type == 'gemini':
+        import google.generativeai as genai
+        if api_key:
+            genai.configure(api_key=api_key)
+        else:
+            genai.configure(api_key=os.environ.get('GEMINI_API_KEY'))
+        return genai
+    elif model_type == 'gpt':
+        from openai import OpenAI
+        if api_key:
+            return OpenAI(api_key=api_key)
+        return OpenAI()  # 環境変数OPENAI_API_KEYから取得
+    else:
+        raise ValueError(f"Unknown model type: {model_type}. Choose from: claude, gemini, gpt")
+
+
+def extract_person_and_career(inscription_text, edcs_id, client, model_type='claude', dating_from=None, dating_to=None,
+                              stream=False, model_name=None):
     """
     LLMを使用して碑文から人物と経歴を抽出する
 
@@ -94,368 +282,49 @@ def extract_person_and_career(inscription_text, edcs_id, client, model_type='cla
         APIクライアント
     model_type : str
         使用するモデル ('claude', 'gemini', 'gpt')
-    dating_from : float, optional
-        碑文の年代下限
-    dating_to : float, optional
-        碑文の年代上限
+    dating_from : int, optional
+        碑文の年代下限（旧形式の 151.0 や空文字列も可）
+    dating_to : int, optional
+        碑文の年代上限（旧形式の 151.0 や空文字列も可）
+    stream : bool
+        ストリーミングで呼び出し、JSONが閉じた時点・出力が碑文の長さに応じた上限を
+        超えた時点・出力形式に違反した時点で生成を打ち切るかどうか
+    model_name : str, optional
+        プロバイダ内のモデル名（指定しない場合は MODELS[model_type]）
 
     Returns:
     --------
     dict
         人物名と経歴情報を含む辞書
     """
-    # 皇帝リストをプロンプトに含める
-    emperor_list = "\n".join([f"  - {name} (Wikidata QID: {qid})" for name, qid in sorted(roman_emperors.items())])
-
-    dating_info = ""
-    if dating_from is not None and dating_to is not None:
-        try:
-            # 空文字列や無効な値をチェック
-            if dating_from != '' and dating_to != '':
-                dating_info = f"\n\nInscription dating: {int(float(dating_from))} - {int(float(dating_to))} CE"
-        except (ValueError, TypeError):
-            # 変換できない場合はスキップ
-            pass
-
-    prompt = """Please analyze the following Latin inscription and extract the information below in JSON format.
-
-Inscription text:
-""" + inscription_text + dating_info + """
-
-Information to extract:
-1. The names of ALL persons mentioned in the inscription, regardless of whether they are main subjects, dedicators, or mentioned in passing (e.g., government officials who approved the inscription, family members, colleagues, etc.). Extract every person.
-2. ALL communities/groups mentioned in the inscription, including legions, cities, towns, villages, associations, collegia, tribes, etc. For each community, extract:
-   - The label as it appears in the inscription (Latin form)
-   - A normalized label (standardized Latin form)
-   - A controlled category type (see community types list below)
-3. For EACH person, extract their social status, gender, ethnicity (Roman, Roman with local name, local) if evident from the text. Use standardized labels from the list below to minimize variation.
-4. For EACH person, if their career is described, extract the career path in exact order mentioned in the text. For each position, classify it into one of the position types listed below.
-5. For EACH person, if the inscription records any benefactions (evergetism) such as construction or repair of public buildings, temples, baths, roads, or donations of money, games, or feasts, extract those as well.
-    Types of benefaction to extract (use EXACTLY these type labels):
-        - Construction: type = "construction"
-        - Repair: type = "repair"
-        - Donation: type = "donation"
-        - Games: type = "games"
-        - Feast: type = "feast"
-        - Other: type = "other"
-    Types of objects to extract (use standardized labels):
-        - Building: "building", "temple", "bath", "road", "aqueduct", etc.
-        - Monetary donation: "money", "sportulae", "congiarium", etc.
-        - Games: "gladiatorial games", "theatrical performances", etc.
-        - Feast: "public banquet", etc.
-        - Statue: "statue", "signum", etc.
-        - Other: "other", etc.
-6. If following types of relationships between persons or between persons and communities are described, extract those as well.
-    Types of relationships to extract (use EXACTLY these type labels):
-        - Family relationships: type = "family"
-        - Colleague relationships: type = "colleague"
-        - Patronage relationships: type = "patronage"
-        - Dedicator and dedicatee relationships: type = "dedication"
-        - Economic relationships: type = "economic"
-        - Affiliation relationships (person to community): type = "affiliation"
-
-    For relationship property, use standardized labels from the list below:
-        Family: "father", "mother", "son", "daughter", "brother", "sister", "spouse", "husband", "wife", "grandfather", "grandmother", "grandson", "granddaughter", "uncle", "aunt", "nephew", "niece", "cousin"
-        Colleague: "co-officer", "fellow-soldier", "colleague", "associate"
-        Patronage: "patron", "client", "freedman", "freedwoman", "former-owner"
-        Dedication: "dedicator", "dedicatee", "honored-person", "person-who-erected"
-        Economic: "buyer", "seller", "debtor", "creditor", "business-partner", "tenant", "landlord", "contractor", "employer", "employee"
-        Affiliation: "member", "soldier", "decurion", "citizen", "resident", "officer", "priest"
-
-    For each relationship, extract:
-        - Type of relationship (use EXACTLY: "family", "colleague", "patronage", "dedication", "economic", or "affiliation")
-        - Property of the relationship (use standardized labels from above list)
-        - The text in the inscription that expresses this relationship
-        - If person-to-person: the name of the related person and their social status
-        - If person-to-community (affiliation): the community_id from the communities array
-        - Any other relevant notes
-
-    For economic relationships, look for terms like:
-        - Sale/purchase: emit, vendit, comparavit, mercatus est
-        - Debt: debitor, creditor, debitum
-        - Business partnership: socius, consors
-        - Lease/rental: conductor, locator, colonus
-        - Employment: operarius, redemptio operis
-
-Output format (JSON):
-{
-  "persons": [
-    {
-      "person_id": 0,
-      "person_name": "Name of the person (Latin form)",
-      "person_name_readable": "Name of the person (readable form)",
-      "praenomen": "Praenomen (first name, e.g., Gaius, Marcus, Lucius) if identifiable",
-      "nomen": "Nomen gentilicium (family name, e.g., Iulius, Cornelius) if identifiable",
-      "cognomen": "Cognomen (surname, e.g., Caesar, Scipio) if identifiable",
-      "person_name_normalized": "Normalized name (for emperors only, exact match from the list below)",
-      "person_name_link": "Wikidata QID (for emperors only, e.g., Q1421)",
-      "social_status": "Social status (e.g., emperor, senator, equestrian, decurion, freedman, slave, soldier, merchant, gladiator, etc.)",
-      "social_status_evidence": "Text evidence for the social status",
-      "gender": "Gender (male, female, unknown)",
-      "gender_evidence": "Text evidence for the gender",
-      "ethnicity": "Ethnicity (Roman, Roman with local name, local)",
-      "ethnicity_evidence": "Text evidence for the  ethnicity",
-      "age_at_death": "Age at death in years (if mentioned, e.g., from 'vixit anni LX' or 'vixit annis LX' or 'vix. ann. LX')",
-      "age_at_death_evidence": "Text evidence for the age at death (e.g., 'vixit anni LX')",
-      "has_career": true/false,
-      "career_path": [
-        {
-          "position": "Title or office (Latin)",
-          "position_normalized": "title or office without philological remarks in nominative form (Latin)",
-          "position_abstract": "most abstract form of the position, removing all qualifiers and specifications (Latin)",
-          "position_type": "Type of position following the classification below ( military, imperial administration, provincial administration, local administration, imperial priesthood, provincial priesthood, local priesthood, occupation, other)",
-          "position_description": "Description of the position (English)",
-          "order": 1
-        }
-      ],
-      "benefactions": [
-        {
-          "benefaction_type": "Type of benefaction based on benefaction type list",
-          "object": "What was built/repaired/donated (Latin)",
-          "object_type": "Type of object listed above",
-          "object_description": "Description of the object (English)",
-          "benefaction_text": "Text in the inscription expressing the benefaction",
-          "cost": "Cost or amount if mentioned",
-          "notes": "Additional information (e.g., de sua pecunia, sua impensa, etc.)"
-        }
-      ]
-    }
-  ],
-  "communities": [
-    {
-      "community_id": 0,
-      "community_name": "Name of the community as it appears in the inscription (Latin form)",
-      "community_name_normalized": "Normalized name of the community (standardized Latin form)",
-      "community_type": "Type of community from controlled vocabulary (see list below)",
-      "community_description": "Brief description of the community (English)",
-      "evidence": "Text in the inscription mentioning this community"
-    }
-  ],
-  "person_relationships": [
-    {
-      "source_person_id": 0,
-      "target_person_id": 1,
-      "target_community_id": null,
-      "type": "Type of relationship (e.g., family, colleague, patronage, dedication, economic, affiliation)",
-      "property": "Relationship detail (e.g., father, sibling, superior, dedicator, honored-person, member, soldier)",
-      "property_text": "Text in the inscription expressing the relationship",
-      "notes": "Other relevant information"
-    }
-  ],
-  "notes": "Other relevant information"
-}
-
-ROMAN EMPERORS LIST (for person_name_normalized and person_name_link):
-""" + emperor_list + """
-
-COMMUNITY TYPES (controlled vocabulary for community_type):
-Military Units:
-  - "legion" (legio)
-  - "cohort" (cohors)
-  - "ala" (cavalry unit)
-  - "turma" (cavalry squadron)
-  - "centuria" (century)
-  - "vexillatio" (detachment)
-  - "classis" (fleet)
-
-Administrative/Political Communities:
-  - "city" (urbs, civitas, colonia)
-  - "municipium" (municipality)
-  - "colonia" (colony)
-  - "vicus" (village/settlement)
-  - "pagus" (rural district)
-  - "provincia" (province)
-  - "regio" (region)
-  - "tribus" (tribe - voting district)
-
-Religious/Social Organizations:
-  - "collegium" (association, guild)
-  - "sodalitas" (religious association)
-  - "corpus" (corporate body)
-  - "ordo" (order, e.g., ordo decurionum)
-  - "familia" (household/familia)
-  - "templum" (temple community)
-
-Other:
-  - "populus" (people/community)
-  - "other" (if none of the above fit)
-
-Notes:
-- Extract ALL communities/groups mentioned in the inscription into the "communities" array, assigning each a unique community_id starting from 0.
-- If no communities are mentioned, use an empty array for "communities".
-- Extract ALL persons mentioned in the inscription into the "persons" array, assigning each a unique person_id starting from 0.
-- For example, if the inscription mentions: (1) the person being honored, (2) a proconsul who approved the honor, (3) the person's father, extract all three as separate entries in "persons" with person_id 0, 1, and 2.
-- If no person can be identified, create one entry with "person_name" set to "Unknown".
-- ROMAN NAME STRUCTURE (Tria Nomina): For Roman citizens, attempt to identify the three-part name structure:
-  * praenomen: The personal first name (e.g., Gaius, Marcus, Lucius, Publius, Titus, Quintus, etc.)
-  * nomen: The family name or nomen gentilicium (e.g., Iulius, Cornelius, Flavius, Valerius, etc.)
-  * cognomen: The surname or additional name (e.g., Caesar, Scipio, Maximus, etc.)
-  * Example: For "Gaius Iulius Caesar" → praenomen: "Gaius", nomen: "Iulius", cognomen: "Caesar"
-  * Example: For "C(aius) Iulius Caesar" → praenomen: "Caius", nomen: "Iulius", cognomen: "Caesar"
-  * If the name structure cannot be clearly identified (e.g., single name, non-Roman name), leave praenomen, nomen, and cognomen as empty strings
-  * For freedmen, the praenomen and nomen are typically inherited from the former owner, with the original name becoming the cognomen
-  * Some persons may have additional cognomina (agnomen) or filiation (e.g., "M(arci) f(ilius)" = son of Marcus)
-- For each person in "persons": if the social status is not evident from the text, set "social_status" to empty string "".
-- For each person in "persons": if no career information is present, set "has_career" to false and use an empty array for "career_path".
-- For each person in "persons": if no benefactions are mentioned, use an empty array for "benefactions".
-- IMPORTANT - SIMPLIFIED FORMAT FOR LARGE INSCRIPTIONS: If the inscription contains more than 20 persons, use a SIMPLIFIED format to reduce output size:
-  * For each person in "persons", include ONLY these fields: person_id, person_name, person_name_readable, praenomen, nomen, cognomen, person_name_normalized, person_name_link, social_status, social_status_evidence, gender, gender_evidence, ethnicity, ethnicity_evidence
-  * OMIT these fields: age_at_death, age_at_death_evidence, has_career, career_path, benefactions
-  * For "person_relationships": extract ONLY family relationships between persons, and affiliation relationships to the main community. Omit other relationship types.
-  * Still extract all persons and the main community, but with minimal details to stay within token limits.
-- AGE AT DEATH: For funerary inscriptions, extract the age at death if mentioned. Common Latin expressions include:
-  * "vixit annis" or "vixit anni" + number (e.g., "vixit annis LX" = lived 60 years)
-  * "vix. ann." or "v. a." or "vix. a." + number (abbreviated forms)
-  * "annos" or "annorum" + number (e.g., "annos XXX" = 30 years old)
-  * Convert Roman numerals to Arabic numbers (e.g., LX → 60, XXX → 30, XLV → 45)
-  * Record the exact Latin text in "age_at_death_evidence"
-  * If age is mentioned in months (menses/mensibus) or days (dies/diebus), still record in "age_at_death_evidence" but leave "age_at_death" empty
-  * If no age is mentioned, leave both "age_at_death" and "age_at_death_evidence" as empty strings
-- If no relationships are mentioned, use an empty array for "person_relationships".
-- Extract the career path in the order in which it appears in the inscription (this may not always correspond to chronological order).
-- IMPORTANT - CONSULAR DATING FORMULAS: Do NOT extract consular offices when they appear in DATING FORMULAS:
-  * Dating formulas use the ablative case: "[Name] consule" (singular) or "[Name] et [Name] consulibus" (plural)
-  * Common dating patterns: "Imp(eratore) [Name] Aug(usto) [N] co(n)s(ule)", "[Name] et [Name] co(n)s(ulibus)"
-  * These are temporal references for dating the inscription, NOT descriptions of the person's career
-  * However, if "consul" or related terms appear in OTHER grammatical cases (nominative, genitive, dative, accusative) as part of a person's career description, DO extract them
-  * Example to EXCLUDE: "Imp(eratore) Domitiano Caes(are) Aug(usto) Germ(anico) XIIII co(n)s(ule)" - this is a dating formula in ablative
-  * Example to INCLUDE: "[Name] consularis" (nominative) or "[Name] consulis" (genitive) describing the person's rank
-  * Example to INCLUDE: "consul designatus" (nominative), "consuli designato" (dative) - these describe career positions
-- In "person_relationships", use "source_person_id" and "target_person_id" to reference persons by their person_id in the "persons" array.
-- ALL relationships should be recorded in the "person_relationships" array:
-  * For person-to-person relationships: Use "source_person_id" and "target_person_id", set "target_community_id" to null
-    Example: If person 0 (main subject) has a relationship with person 1 (father), record: {"source_person_id": 0, "target_person_id": 1, "target_community_id": null, "type": "family", "property": "father", ...}
-  * For person-to-community relationships (affiliation): Use "source_person_id" and "target_community_id", set "target_person_id" to null
-    Example: If person 0 is a soldier of legion 1, record: {"source_person_id": 0, "target_person_id": null, "target_community_id": 1, "type": "affiliation", "property": "soldier", ...}
-    Example: If person 0 is a member of collegium 0, record: {"source_person_id": 0, "target_person_id": null, "target_community_id": 0, "type": "affiliation", "property": "member", ...}
-- EMPEROR IDENTIFICATION: If social_status is "emperor" for the main person or any related person:
-  * Consider the inscription text, dating range, and historical context
-  * Match the person to the correct emperor from the ROMAN EMPERORS LIST above
-  * Set person_name_normalized to the EXACT name from the list (e.g., "Titus", "Constantine the Great")
-  * Set person_name_link to the corresponding Wikidata QID (e.g., "Q1421")
-  * If multiple emperors have similar names, use the dating and context to distinguish (e.g., Constantine I vs Constantine II vs Constantine III)
-  * If no confident match can be made, leave person_name_normalized and person_name_link as empty strings
-  * For non-emperors, leave person_name_normalized and person_name_link as empty strings
-- For benefactions, look for verbs like: fecit, construxit, aedificavit, refecit, restituit, dedit, donavit, sumptibus suis, sua pecunia, sua impensa, etc.
-- Common benefaction types include:
-  * construction: Building new structures (templum, aedes, basilica, forum, porta, murus, aquaeductus, etc.)
-  * repair: Repairing existing structures (refecit, restituit)
-  * donation: Monetary gifts or distributions (sportulae, congiarium, etc.)
-  * games: Gladiatorial games, theatrical performances (ludi, munera)
-  * feast: Public banquets (epulum publicum)
-  * statue: Dedication of statues (statua, signum)
-
-STANDARDIZED SOCIAL STATUS LABELS (use these EXACTLY to minimize variation):
-Imperial Family:
-  - "emperor" (for Augustus, Caesar with imperial power)
-  - "empress" (for Augusta)
-  - "imperial-family" (for other imperial family members)
-
-Senatorial Order:
-  - "senator-clarissimus" (vir clarissimus, v.c.)
-  - "senator-consularis" (consular rank)
-  - "senator-praetorius" (praetorian rank)
-
-Equestrian Order:
-  - "equestrian-perfectissimus" (vir perfectissimus, v.p.)
-  - "equestrian-egregius" (vir egregius, v.e.)
-  - "equestrian-splendidus" (vir splendidus)
-  - "equestrian" (equo publico, general equestrian)
-
-Municipal Elite:
-  - "decurio" (decurion, member of local senate)
-  - "duovir" (duumvir)
-  - "aedilis" (aedile)
-  - "quaestor" (quaestor)
-  - "municipal-magistrate" (other municipal office holders)
-
-Military:
-  - "legatus" (legate)
-  - "tribunus" (tribune)
-  - "centurio" (centurion)
-  - "soldier" (miles, general soldier)
-  - "veteran" (veteranus)
-
-Legal Status:
-  - "freedman" (libertus)
-  - "freedwoman" (liberta)
-  - "slave" (servus, serva)
-  - "freeborn" (ingenuus, ingenua)
-
-Priesthood:
-  - "flamen" (flamen)
-  - "pontifex" (pontiff)
-  - "augur" (augur)
-  - "sacerdos" (priest/priestess)
-
-Occupations:
-  - "merchant" (negotiator, mercator)
-  - "medicus" (doctor)
-  - "gladiator" (gladiator)
-  - "actor" (actor)
-  - "artisan" (faber, etc.)
-
-Other:
-  - "unknown" (if status cannot be determined)
-  - "citizen" (if only citizenship is mentioned)
-
-- For social status, look for the indicators above and use the EXACT label from the list.
-- Always prefer more specific labels over general ones (e.g., "senator-clarissimus" over "senator").
-- For position_abstract in career_path: Extract only the core office/title name, removing all qualifiers, specifications, and additional information:
-  * Remove adjectives and qualifiers (perpetuus, ordinarius, designatus, suffectus, etc.)
-  * Remove prepositional phrases (in turmas equestres, cohortis primae, legionis III Augustae, etc.)
-  * Remove geographic or unit designations
-  * Remove temporal indicators (bis, ter, iterum, etc.)
-  * Keep only the fundamental office title
-  * Be sure position_abstract is in nominative form
-  Examples:
-    - "flamen perpetuus" → "flamen"
-    - "adlectus in turmas equestres" → "adlectus"
-    - "praefectus cohortis primae" → "praefectus"
-    - "tribunus militum legionis III Augustae" → "tribunus"
-    - "consul ordinarius" → "consul"
-    - "duovir quinquennalis" → "duovir"
-- For position_type in career_path: Classify each position into one of the following types (use EXACTLY these labels):
-  * "military": Military positions (legatus, tribunus, centurio, praefectus of military units, etc.)
-  * "imperial-administration": Imperial administrative positions (praefectus praetorio, praefectus urbi, procurator, a rationibus, etc.)
-  * "provincial-administration": Provincial administrative positions (legatus Augusti pro praetore, proconsul, legatus legionis, etc.)
-  * "local-administration": Municipal/local administrative positions (duovir, aedilis, quaestor, decurio, etc.)
-  * "imperial-priesthood": Imperial cult priesthoods (flamen divi, sodalis, arvalis, etc.)
-  * "provincial-priesthood": Provincial priesthoods (sacerdos provinciae, pontifex provinciae, etc.)
-  * "local-priesthood": Local priesthoods (flamen municipii, pontifex, augur at local level, etc.)
-  * "occupation": Non-political occupations and professions (negotiator, mercator, medicus, faber, etc.)
-  * "other": Positions that don't fit the above categories or unclear classifications
-- Output JSON only and do not include any explanatory text."""
+    with profiling.span('build_prompt'):
+        # 変換済みのデータでは整数または None（空文字列や無効な値は None になる）
+        prompt = build_prompt(inscription_text, as_int(dating_from), as_int(dating_to))
 
+    response_text = ""
     try:
         # LLMを呼び出す
-        response_text = call_llm(prompt, model_type, client)
-        # JSONの前後にある余分なテキストを削除
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
-        json_str = response_text[json_start:json_end]
-        result = json.loads(json_str)
+        with profiling.span('llm_call', edcs_id=edcs_id, model=model_name or MODELS.get(model_type)):
+            if stream:
+                response_text = call_llm_streaming(prompt, model_type, client,
+                                                   budget_chars=output_budget(inscription_text),
+                                                   model_name=model_name)
+            else:
+                response_text = call_llm(prompt, model_type, client, model_name=model_name)
+        with profiling.span('parse_json'):
+            # JSONの前後にある余分なテキストを削除
+            json_start = response_text.find('{')
+            json_end = response_text.rfind('}') + 1
+            json_str = response_text[json_start:json_end]
+            result = json.loads(json_str)
         result['edcs_id'] = edcs_id
 
         # 後方互換性のため、personsの最初の人物を旧形式のフィールドにも追加
         # また、旧形式のmain_persons/relationshipsも保持
-        if result.get('persons') and len(result['persons']) > 0:
-            first_person = result['persons'][0]
-            result['person_name'] = first_person.get('person_name', 'Unknown')
-            result['person_name_readable'] = first_person.get('person_name_readable', '')
-            result['person_name_normalized'] = first_person.get('person_name_normalized', '')
-            result['person_name_link'] = first_person.get('person_name_link', '')
-            result['social_status'] = first_person.get('social_status', '')
-            result['social_status_evidence'] = first_person.get('social_status_evidence', '')
-            result['has_career'] = first_person.get('has_career', False)
-            result['career_path'] = first_person.get('career_path', [])
-            result['benefactions'] = first_person.get('benefactions', [])
-
-            # main_persons形式も生成（RDF生成スクリプトの後方互換性のため）
-            result['main_persons'] = result['persons']
-
-            # person_relationshipsをrelationships形式に変換
-            result['relationships'] = result.get('person_relationships', [])
+        add_legacy_fields(result)
+
+        # プロンプトの変更時に再抽出の対象を判定できるよう、プロンプトのバージョンを記録
+        stamp_result(result)
 
         return result
     except json.JSONDecodeError as e:
@@ -472,6 +341,19 @@ Other:
             "raw_response": response_text,
             "error": error_msg
         }
+    except StreamAborted as e:
+        error_msg = f"出力の打ち切り (EDCS-ID: {edcs_id}): {e}"
+        print(error_msg)
+        return {
+            "edcs_id": edcs_id,
+            "person_name": "Parse Error",
+            "person_name_readable": "Parse Error",
+            "has_career": False,
+            "career_path": [],
+            "notes": f"出力の打ち切り（{e.reason}）: {str(e)}",
+            "raw_response": e.text,
+            "error": error_msg
+        }
     except Exception as e:
         error_msg = f"LLM呼び出しエラー (EDCS-ID: {edcs_id}): {e}"
         print(error_msg)
@@ -487,6 +369,103 @@ Other:
         }
 
 
+class CascadeStats:
+    """
+    カスケード抽出の段ごとの件数を集計するクラス
+
+    小さなモデルの結果をそのまま採用した件数（small_accepted）、上位モデルで
+    再抽出した件数（escalated）と、再抽出の理由ごとの件数（reasons）を数える。
+    """
+
+    def __init__(self, model_type):
+        self.model_type = model_type
+        self.small_accepted = 0
+        self.escalated = 0
+        self.large_errors = 0
+        self.reasons = Counter()
+
+    def record(self, issues, large_result=None):
+        if not issues:
+            self.small_accepted += 1
+            return
+        self.escalated += 1
+        # 理由は「:」より前の種類ごとに数える（語彙外の値などの具体的な値は含めない）
+        self.reasons.update({issue.split(':')[0] for issue in issues})
+        if large_result is not None and 'error' in large_result:
+            self.large_errors += 1
+
+    def summary(self):
+        total = self.small_accepted + self.escalated
+        return {
+            'model_type': self.model_type,
+            'small_model': CASCADE_MODELS.get(self.model_type),
+            'large_model': MODELS.get(self.model_type),
+            'total': total,
+            'small_accepted': self.small_accepted,
+            'escalated': self.escalated,
+            'large_errors': self.large_errors,
+            'small_hit_rate': round(self.small_accepted / total, 4) if total else None,
+            'reasons': dict(self.reasons.most_common()),
+        }
+
+    def save(self, path):
+        """
+        実行ごとの集計をJSON Linesに追記する（小さなモデルの採用率の調整用）
+        """
+        from datetime import datetime
+
+        record = {'timestamp': datetime.now().isoformat(timespec='seconds'), **self.summary()}
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def extract_with_cascade(inscription_text, edcs_id, client, model_type='claude', dating_from=None, dating_to=None,
+                         stream=False, cascade_stats=None):
+    """
+    小さなモデルで抽出し、検査で問題が見つかった場合のみ上位モデルで抽出し直す
+
+    小さなモデルの結果は career_schema.validate_result（出力形式・統制語彙・
+    person_id / community_id の参照・人物の抽出漏れ）で検査し、エラーまたは問題が
+    1件でもあれば MODELS[model_type] で再抽出する。採用した結果には
+    extraction_model としてモデル名を記録する。
+
+    Parameters:
+    -----------
+    cascade_stats : CascadeStats, optional
+        段ごとの件数を集計するオブジェクト
+
+    Returns:
+    --------
+    dict
+        人物名と経歴情報を含む辞書（extract_person_and_career と同じ形式）
+    """
+    small_model = CASCADE_MODELS[model_type]
+    result = extract_person_and_career(inscription_text, edcs_id, client, model_type,
+                                       dating_from=dating_from, dating_to=dating_to,
+                                       stream=stream, model_name=small_model)
+    if 'error' in result:
+        issues = [result['notes'] or result['error']]
+    else:
+        issues = validate_result(result, inscription_text)
+
+    if not issues:
+        if cascade_stats is not None:
+            cascade_stats.record(issues)
+        result['extraction_model'] = small_model
+        return result
+
+    print(f"  上位モデルで再抽出します（{len(issues)}件の問題: {issues[0]}）")
+    large_model = MODELS[model_type]
+    result = extract_person_and_career(inscription_text, edcs_id, client, model_type,
+                                       dating_from=dating_from, dating_to=dating_to,
+                                       stream=stream, model_name=large_model)
+    if cascade_stats is not None:
+        cascade_stats.record(issues, result)
+    if 'error' not in result:
+        result['extraction_model'] = large_model
+    return result
+
+
 def save_error_log(error_log_path, error_log, model_type, json_path):
     """
     エラーログをファイルに保存（追記モード）
@@ -515,7 +494,11 @@ def save_error_log(error_log_path, error_log, model_type, json_path):
             f.write("-" * 80 + "\n\n")
 
 
-def process_inscriptions(json_path, output_path, model_type='claude', api_key=None, limit=None):
+def process_inscriptions(json_path, output_path, model_type='claude', api_key=None, limit=None,
+                         dedup=False, dedup_threshold=0.9, checkpoint_interval=10,
+                         show_progress=True, progress_callback=None, compact=False, client=None,
+                         edcs_ids=None, pretty=False, stream=False, cascade=False, reextract_stale=False,
+                         on_result=None):
     """
     碑文データを処理し、人物と経歴情報を抽出する
 
@@ -524,59 +507,94 @@ def process_inscriptions(json_path, output_path, model_type='claude', api_key=No
     json_path : str
         入力JSONファイルのパス
     output_path : str
-        出力JSONファイルのパス
+        出力ファイルのパス（.jsonl の場合は1件ごとに追記。.gz / .zst で終わる場合は圧縮して保存）
     model_type : str
         使用するモデル ('claude', 'gemini', 'gpt')
     api_key : str, optional
         APIキー（指定しない場合は環境変数から取得）
     limit : int, optional
         処理する碑文の最大数（テスト用）
+    dedup : bool
+        同一テキストの碑文をまとめて1回だけ抽出するかどうか（準重複は報告のみ）
+    dedup_threshold : float
+        準重複として報告するJaccard類似度の下限
+    checkpoint_interval : int
+        何件ごとに結果ファイルを保存するか（1にすると1件ごとに保存）
+    show_progress : bool
+        tqdmの進捗バーを表示するかどうか
+    progress_callback : callable, optional
+        処理に着手した入力碑文の件数を受け取るコールバック（再開時の処理済み件数も含む）
+    compact : bool
+        元データ（original_data）と旧形式の重複フィールドを出力しないかどうか。
+        元データはEDCS-IDでfiltered_dataから参照する
+    client : object, optional
+        作成済みのAPIクライアント（指定しない場合は model_type から作成）
+    edcs_ids : list, optional
+        処理対象のEDCS-IDのリスト（spatial_index.query_edcs_ids() の結果など）
+    pretty : bool
+        .json の出力をインデント付きにするかどうか（デフォルトは空白なしの区切り文字）
+    stream : bool
+        LLMをストリーミングで呼び出し、JSONが閉じた時点で生成を打ち切るかどうか
+        （出力が上限を超えた場合・出力形式に違反した場合もエラーとして打ち切る）
+    cascade : bool
+        小さなモデル（CASCADE_MODELS）で抽出し、検査で問題が見つかった碑文のみ
+        上位モデル（MODELS）で抽出し直すかどうか。段ごとの件数は
+        <出力ファイル名>_cascade_stats.jsonl に実行ごとに追記する
+    reextract_stale : bool
+        処理済みの結果のうち、抽出時からプロンプトの関係する節が変更されたもの
+        （extraction_prompt.stale_scopes）も抽出し直し、既存の結果を置き換えるかどうか
+    on_result : callable, optional
+        結果を書き出すたびに (抽出結果, 元データ) を受け取るコールバック（エラーの結果は渡さない。
+        rdf_pipeline でRDFの生成を抽出と並行して行うために使う）
+
+    Returns:
+    --------
+    dict
+        処理件数・エラー件数・入力件数を含む統計情報（cascade の場合は段ごとの件数も含む）
     """
     # エラーログファイルのパスを生成
-    error_log_path = output_path.replace('.json', '_errors.log')
+    error_log_path = strip_compression_suffix(output_path).replace('.jsonl', '.json').replace('.json', '_errors.log')
+    cascade_stats_path = error_log_path.replace('_errors.log', '_cascade_stats.jsonl')
+    cascade_stats = CascadeStats(model_type) if cascade else None
     error_log = []
     pending_error_log = []  # チェックポイント保存用の一時バッファ
 
-    # APIクライアントを初期化
-    if model_type == 'claude':
-        if api_key:
-            client = Anthropic(api_key=api_key)
-        else:
-            client = Anthropic()  # 環境変数ANTHROPIC_API_KEYから取得
-    elif model_type == 'gemini':
-        if api_key:
-            genai.configure(api_key=api_key)
-        else:
-            genai.configure(api_key=os.environ.get('GEMINI_API_KEY'))
-        client = genai
-    elif model_type == 'gpt':
-        if api_key:
-            client = OpenAI(api_key=api_key)
-        else:
-            client = OpenAI()  # 環境変数OPENAI_API_KEYから取得
-    else:
-        raise ValueError(f"Unknown model type: {model_type}. Choose from: claude, gemini, gpt")
+    # APIクライアントを初期化（選択したモデルのSDKのみを読み込む）
+    if client is None:
+        client = create_client(model_type, api_key)
 
     # 碑文データを読み込む
     print(f"碑文データを読み込み中: {json_path}")
-    inscriptions = load_filtered_inscriptions(json_path)
+    with profiling.span('load_inscriptions'):
+        inscriptions = load_filtered_inscriptions(json_path, edcs_ids)
     print(f"読み込み完了: {len(inscriptions)}件")
 
     # 既存の出力ファイルがあれば読み込んで、処理済みのEDCS-IDを取得
     processed_ids = set()
-    results = []
-    if os.path.exists(output_path):
+    career_count = 0
+    writer = ResultWriter(output_path, pretty=pretty, record_type=Inscription)
+    if os.path.exists(output_path) and writer.jsonl:
+        # JSON LinesはEDCS-IDのインデックスから処理済みIDを取得する（追記分のみ索引を更新）
+        print(f"既存の出力ファイルを検出: {output_path}")
+        with profiling.span('resume'):
+            writer.repair_tail()
+            with EdcsIndex(output_path) as index:
+                processed_ids = set(index.ids())
+        writer.count = len(processed_ids)
+        print(f"処理済み: {len(processed_ids)}件")
+    elif os.path.exists(output_path):
         print(f"既存の出力ファイルを検出: {output_path}")
         try:
-            with open(output_path, 'r', encoding='utf-8') as f:
-                existing_results = json.load(f)
-                results = existing_results  # 既存の結果を保持
-                processed_ids = {item.get('edcs_id') for item in existing_results}
-                print(f"処理済み: {len(processed_ids)}件")
+            with profiling.span('resume'):
+                for existing in writer.load_existing():
+                    processed_ids.add(existing.get('edcs_id'))
+                    career_count += has_career(existing)
+            print(f"処理済み: {len(processed_ids)}件")
         except json.JSONDecodeError:
             print(f"警告: 既存ファイルの読み込みに失敗しました。最初から処理します。")
-            results = []
+            writer = ResultWriter(output_path, pretty=pretty, record_type=Inscription)
             processed_ids = set()
+            career_count = 0
 
     # 既存のエラーログがあれば読み込む
     error_log = []
@@ -600,30 +618,79 @@ def process_inscriptions(json_path, output_path, model_type='claude', api_key=No
         inscriptions = inscriptions[:limit]
         print(f"処理件数を{limit}件に制限")
 
-    # 未処理の碑文のみをフィルタリング
-    unprocessed_inscriptions = [item for item in inscriptions if item.get('EDCS-ID') not in processed_ids]
-    print(f"未処理: {len(unprocessed_inscriptions)}件")
+    # プロンプトの変更で古くなった結果を再抽出の対象に加える
+    stale_ids = set()
+    if reextract_stale and processed_ids:
+        texts = {item.get('EDCS-ID'): item.get('inscription', '') for item in inscriptions}
+        scope_counts = Counter()
+        seen_ids = set()
+        with profiling.span('find_stale'):
+            existing_results = writer.iter_records()
+            for existing in existing_results:
+                existing_id = existing.get('edcs_id')
+                if existing_id in seen_ids:
+                    # 前回の再抽出が中断された場合の古い行（後の行を優先）
+                    writer.superseded = True
+                seen_ids.add(existing_id)
+                if existing_id not in texts:
+                    continue
+                scopes = stale_scopes(existing, texts[existing_id])
+                if scopes:
+                    stale_ids.add(existing_id)
+                    scope_counts.update(scopes)
+                else:
+                    stale_ids.discard(existing_id)
+        print(f"プロンプトの変更により再抽出: {len(stale_ids)}件")
+        for scope, count in scope_counts.most_common():
+            print(f"  {scope}: {count}件")
+
+    # 未処理の碑文と再抽出する碑文のみをフィルタリング
+    unprocessed_inscriptions = [item for item in inscriptions
+                                if item.get('EDCS-ID') not in processed_ids or item.get('EDCS-ID') in stale_ids]
+    print(f"未処理: {len(unprocessed_inscriptions) - len(stale_ids)}件")
+
+    if progress_callback is not None and len(unprocessed_inscriptions) < len(inscriptions):
+        progress_callback(len(inscriptions) - len(unprocessed_inscriptions))
 
     if len(unprocessed_inscriptions) == 0:
         print("全ての碑文が既に処理済みです。")
-        return
+        if writer.superseded:
+            writer.close()
+        return {'processed': writer.count, 'errors': 0, 'total': len(inscriptions)}
+
+    # 重複テキストをまとめ、代表碑文のみをLLMに送る
+    duplicates = {}
+    if dedup:
+        from dedup_inscriptions import group_duplicate_inscriptions, fan_out_result
+        with profiling.span('dedup'):
+            unprocessed_inscriptions, duplicates, near_duplicates = group_duplicate_inscriptions(
+                unprocessed_inscriptions, threshold=dedup_threshold)
+        skipped = sum(len(members) for members in duplicates.values())
+        print(f"重複除去: {skipped}件を{len(duplicates)}グループの代表碑文の結果で補完")
+        if near_duplicates:
+            near_count = sum(len(members) for members in near_duplicates.values())
+            print(f"準重複: {near_count}件（{len(near_duplicates)}グループ、結果は複製せず個別に抽出）")
+
+    from tqdm import tqdm
 
     # 各碑文を処理
-    checkpoint_interval = 10  # 10件ごとに保存
     #for i, item in enumerate(inscriptions, 1):
     # tqdmを使用して進捗表示（未処理のもののみ）
     total_items = len(inscriptions)
-    for i, item in enumerate(tqdm(unprocessed_inscriptions, desc="Processing inscriptions"), 1):
+    for i, item in enumerate(tqdm(unprocessed_inscriptions, desc="Processing inscriptions",
+                                  disable=not show_progress), 1):
         edcs_id = item.get('EDCS-ID', 'Unknown')
         inscription_text = item.get('inscription', '')
+        if progress_callback is not None:
+            progress_callback(1 + len(duplicates.get(edcs_id, [])))
 
         # 全体の進捗を表示（処理済み + 現在の未処理）
-        current_position = len(processed_ids) + i
+        current_position = len(processed_ids) - len(stale_ids) + i
         print(f"\n[{current_position}/{total_items}] 処理中: {edcs_id}")
 
         if not inscription_text or inscription_text.strip() == "?":
             print(f"  警告: 碑文テキストが空またはunknownです")
-            results.append({
+            no_text_result = {
                 "edcs_id": edcs_id,
                 "person_name": "No Text",
                 "person_name_readable": "No Text",
@@ -631,14 +698,17 @@ def process_inscriptions(json_path, output_path, model_type='claude', api_key=No
                 "career_path": [],
                 "notes": "碑文テキストが存在しません",
                 "original_data": item
-            })
+            }
+            no_text_result = compact_result(no_text_result) if compact else no_text_result
+            writer.append(no_text_result)
+            if on_result is not None:
+                on_result(no_text_result, item)
 
             # チェックポイント保存
-            if len(results) % checkpoint_interval == 0 or i == len(unprocessed_inscriptions):
-                print(f"  チェックポイント: {len(results)}件を保存中...")
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, ensure_ascii=False, indent=2)
+            if writer.pending >= checkpoint_interval:
+                print(f"  チェックポイント: {writer.count}件を保存中...")
+                with profiling.span('checkpoint'):
+                    writer.flush()
 
             continue
 
@@ -648,14 +718,27 @@ def process_inscriptions(json_path, output_path, model_type='claude', api_key=No
             dating_from = item.get('dating_from')
             dating_to = item.get('dating_to')
 
-            result = extract_person_and_career(
-                inscription_text,
-                edcs_id,
-                client,
-                model_type,
-                dating_from=dating_from,
-                dating_to=dating_to
-            )
+            if cascade:
+                result = extract_with_cascade(
+                    inscription_text,
+                    edcs_id,
+                    client,
+                    model_type,
+                    dating_from=dating_from,
+                    dating_to=dating_to,
+                    stream=stream,
+                    cascade_stats=cascade_stats
+                )
+            else:
+                result = extract_person_and_career(
+                    inscription_text,
+                    edcs_id,
+                    client,
+                    model_type,
+                    dating_from=dating_from,
+                    dating_to=dating_to,
+                    stream=stream
+                )
 
             # エラーがあればログに記録し、結果には含めない
             if 'error' in result:
@@ -677,15 +760,35 @@ def process_inscriptions(json_path, output_path, model_type='claude', api_key=No
 
                 continue  # 結果リストに追加せずスキップ
 
-            result['original_data'] = item  # 元データも保持
-            results.append(result)
+            if compact:
+                result = compact_result(result)
+            else:
+                result['original_data'] = item  # 元データも保持
+            with profiling.span('write_result'):
+                if edcs_id in processed_ids:
+                    writer.replace(result)
+                else:
+                    writer.append(result)
+            if on_result is not None:
+                on_result(result, item)
+            career_count += has_career(result)
+
+            # 重複碑文にも同じ抽出結果を割り当てる
+            for member, similarity in duplicates.get(edcs_id, []):
+                member_result = fan_out_result(result, member, edcs_id, similarity)
+                if member_result['edcs_id'] in processed_ids:
+                    writer.replace(member_result)
+                else:
+                    writer.append(member_result)
+                if on_result is not None:
+                    on_result(member_result, member)
+                career_count += has_career(result)
 
             # チェックポイント保存
-            if len(results) % checkpoint_interval == 0 or i == len(unprocessed_inscriptions):
-                print(f"  チェックポイント: {len(results)}件を保存中...")
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, ensure_ascii=False, indent=2)
+            if writer.pending >= checkpoint_interval:
+                print(f"  チェックポイント: {writer.count}件を保存中...")
+                with profiling.span('checkpoint'):
+                    writer.flush()
 
             # 人物情報を表示
             persons = result.get('persons', [])
@@ -726,9 +829,8 @@ def process_inscriptions(json_path, output_path, model_type='claude', api_key=No
 
     # 結果を保存
     print(f"\n結果を保存中: {output_path}")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    with profiling.span('checkpoint'):
+        writer.close()
 
     # 最後に残っているエラーログを保存
     if pending_error_log:
@@ -739,14 +841,34 @@ def process_inscriptions(json_path, output_path, model_type='claude', api_key=No
     # 統計情報を表示
     print("\n" + "=" * 80)
     print("処理完了")
-    print(f"総処理件数: {len(results)}")
-    print(f"経歴情報あり: {sum(1 for r in results if r.get('has_career'))}")
-    print(f"経歴情報なし: {sum(1 for r in results if not r.get('has_career'))}")
+    print(f"総処理件数: {writer.count}")
+    if writer.jsonl:
+        # JSON Linesでは既存分を読み込まないため、今回の実行分のみを集計する
+        new_count = writer.count - len(processed_ids)
+        print(f"経歴情報あり（今回の実行分）: {career_count}")
+        print(f"経歴情報なし（今回の実行分）: {new_count - career_count}")
+    else:
+        print(f"経歴情報あり: {career_count}")
+        print(f"経歴情報なし: {writer.count - career_count}")
     print(f"エラー件数: {len(error_log)}")
     if error_log:
         print(f"エラーログファイル: {error_log_path}")
+    stats = {'processed': writer.count, 'errors': len(error_log), 'total': len(inscriptions)}
+    if cascade_stats is not None:
+        summary = cascade_stats.summary()
+        hit_rate = summary['small_hit_rate']
+        print(f"カスケード: {summary['small_model']} で採用 {summary['small_accepted']}件"
+              f"{f'（{hit_rate:.1%}）' if hit_rate is not None else ''}、"
+              f"{summary['large_model']} で再抽出 {summary['escalated']}件")
+        for reason, count in summary['reasons'].items():
+            print(f"    {reason}: {count}件")
+        cascade_stats.save(cascade_stats_path)
+        print(f"カスケードの集計: {cascade_stats_path}")
+        stats['cascade'] = summary
     print(f"結果ファイル: {output_path}")
 
+    return stats
+
 
 if __name__ == "__main__":
     import sys
@@ -765,10 +887,34 @@ if __name__ == "__main__":
                         default='filtered_data/2025-12-16-EDCS_via_Lat_Epig-prov_Africaproconsularis+place_Carthago-8520_filtered.json',
                         help='入力JSONファイルのパス')
     parser.add_argument('--output', '-o', type=str, default=None,
-                        help='出力JSONファイルのパス（指定しない場合は自動生成）')
+                        help='出力JSONファイルのパス（指定しない場合は自動生成。.gz / .zst で終わる場合は圧縮して保存）')
+    parser.add_argument('--pretty', action='store_true',
+                        help='.json の出力をインデント付きにする（デフォルトは空白なしの区切り文字）')
+    parser.add_argument('--stream', action='store_true',
+                        help='ストリーミングで呼び出し、JSONが閉じた時点・出力が碑文の長さに応じた上限を超えた時点で生成を打ち切る')
+    parser.add_argument('--cascade', action='store_true',
+                        help='小さなモデルで抽出し、検査（出力形式・統制語彙・ID参照・人物の抽出漏れ）で'
+                             '問題が見つかった碑文のみ上位モデルで抽出し直す')
+    parser.add_argument('--reextract-stale', action='store_true',
+                        help='抽出時からプロンプトの関係する節が変更された結果も抽出し直す'
+                             '（例: 皇帝リストのみの変更なら皇帝に言及する碑文のみ）')
+    parser.add_argument('--dedup', action='store_true',
+                        help='同一テキストの碑文を1回だけ抽出し、結果を各EDCS-IDに割り当てる（準重複は報告のみ）')
+    parser.add_argument('--dedup-threshold', type=float, default=0.9,
+                        help='準重複として報告するJaccard類似度の下限（デフォルト: 0.9）')
+    parser.add_argument('--compact', action='store_true',
+                        help='元データと旧形式の重複フィールドを出力しない（RDF生成時は --source で元データを指定）')
+    add_query_arguments(parser)
+    parser.add_argument('--profile', type=str, default=None,
+                        help='区間ごとの計測を有効にし、トレース（Chrome Trace形式のJSON）を保存するパス')
+    parser.add_argument('--profiler', type=str, default=None, choices=['cprofile', 'pyinstrument'],
+                        help='--profile と併用し、抽出処理全体を詳細にプロファイルする')
 
     args = parser.parse_args()
 
+    # .envファイルから環境変数を読み込む
+    load_env()
+
     # APIキーの確認
     api_key = args.api_key
     if not api_key:
@@ -802,8 +948,9 @@ if __name__ == "__main__":
             if filtered_data_idx + 1 < len(input_path_parts):
                 place_folder = input_path_parts[filtered_data_idx + 1]
 
-        # 入力ファイル名からベース名を動的に生成
-        input_basename = os.path.basename(args.input)
+        # 入力ファイル名からベース名を動的に生成（圧縮形式の拡張子は出力にも引き継ぐ）
+        input_basename = os.path.basename(strip_compression_suffix(args.input))
+        output_suffix = compression_suffix(args.input)
         # '_filtered.json'や'_errors.json'を削除してベース名を取得
         if input_basename.endswith('_filtered.json'):
             base_name = input_basename.replace('_filtered.json', '')
@@ -816,9 +963,9 @@ if __name__ == "__main__":
 
         # 地名フォルダがある場合は、それを含めた構造で出力
         if place_folder:
-            output_file = f'career_graphs/{args.model}/{place_folder}/{base_name}_career.json'
+            output_file = f'career_graphs/{args.model}/{place_folder}/{base_name}_career.json{output_suffix}'
         else:
-            output_file = f'career_graphs/{args.model}/{base_name}_career.json'
+            output_file = f'career_graphs/{args.model}/{base_name}_career.json{output_suffix}'
     else:
         output_file = args.output
 
@@ -828,11 +975,29 @@ if __name__ == "__main__":
     print(f"処理制限: {args.limit}件")
     print()
 
+    if args.profile:
+        profiling.enable(capture_mode=args.profiler, capture_dir=os.path.dirname(args.profile) or '.')
+
+    # 座標・年代範囲で対象を絞り込む（指定した場合のみ）
+    edcs_ids = query_from_args(args, args.input)
+
     # 処理実行
-    process_inscriptions(
-        args.input,
-        output_file,
-        model_type=args.model,
-        api_key=api_key,
-        limit=args.limit
-    )
+    with profiling.capture('extract_career_graph'):
+        process_inscriptions(
+            args.input,
+            output_file,
+            model_type=args.model,
+            api_key=api_key,
+            limit=args.limit,
+            dedup=args.dedup,
+            dedup_threshold=args.dedup_threshold,
+            compact=args.compact,
+            edcs_ids=edcs_ids,
+            pretty=args.pretty,
+            stream=args.stream,
+            cascade=args.cascade,
+            reextract_stale=args.reextract_stale
+        )
+
+    if args.profile:
+        profiling.finish(args.profile)
@@ -0,0 +1,51 @@
+import re
+import unicodedata
+
+
+# 欠損部分の記号（[3], [---], [...] など）
+_LACUNA_RE = re.compile(r'\[\s*(?:\d+|-+|\.+)\s*\]')
+# 括弧内の先頭・末尾に置かれた欠損文字数（[3 Ut]hina → [Ut]hina）
+_LEADING_LACUNA_RE = re.compile(r'\[\s*\d+\s+')
+_TRAILING_LACUNA_RE = re.compile(r'\s+\d+\s*\]')
+# 行区切り（/ または //）
+_LINE_BREAK_RE = re.compile(r'\s*/+\s*')
+# 単語構成文字と空白以外の記号
+_SYMBOL_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_inscription_text(text):
+    """
+    Leiden記法の碑文テキストを比較用に正規化する
+
+    補読・展開（[], ()）の括弧は外して文字を残し、欠損記号と行区切りは除去する。
+    大文字小文字・ダイアクリティカルマーク・i/j, u/v の表記揺れも吸収する。
+
+    Parameters:
+    -----------
+    text : str
+        碑文テキスト（EDCSの inscription フィールド）
+
+    Returns:
+    --------
+    str
+        正規化されたテキスト（空白区切り）
+    """
+    if not text:
+        return ''
+
+    text = text.replace('(?)', '')
+    text = _LACUNA_RE.sub(' ', text)
+    text = _LEADING_LACUNA_RE.sub('[', text)
+    text = _TRAILING_LACUNA_RE.sub(']', text)
+    text = _LINE_BREAK_RE.sub(' ', text)
+    text = _SYMBOL_RE.sub('', text)
+    # 括弧の外に残った数字（欠損文字数など）は除去
+    text = re.sub(r'\b\d+\b', ' ', text)
+
+    # ダイアクリティカルマークを除去し、ラテン語の表記揺れを統一
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = text.casefold().replace('j', 'i').replace('v', 'u')
+
+    return _WHITESPACE_RE.sub(' ', text).strip()
@@ -0,0 +1,195 @@
+# 抽出結果の最上位で配列でなければならないキー（抽出プロンプトの出力形式）
+ARRAY_KEYS = ('persons', 'communities', 'person_relationships')
+
+# 出力の上限（文字数）= 基本量 + 碑文テキスト1文字あたりの量
+# 既存の抽出結果では、出力は最大でも 3,800字（70字の碑文）、6,900字（376字の碑文）程度
+OUTPUT_BUDGET_BASE_CHARS = 8000
+OUTPUT_BUDGET_CHARS_PER_INPUT_CHAR = 40
+
+# JSONの前に許容する文字数（```json などのコードフェンスや短い前置き）
+MAX_PREAMBLE_CHARS = 200
+
+_WHITESPACE = ' \t\r\n'
+
+
+class StreamAborted(Exception):
+    """
+    ストリーミング中の出力を打ち切ったことを表す例外
+
+    Attributes:
+    -----------
+    reason : str
+        'budget'（出力が上限を超えた）、'schema'（出力形式に違反した）、
+        'incomplete'（JSONが閉じる前に出力が終わった）のいずれか
+    text : str
+        打ち切るまでに受け取った出力
+    """
+
+    def __init__(self, reason, message, text=''):
+        super().__init__(message)
+        self.reason = reason
+        self.text = text
+
+
+def output_budget(inscription_text):
+    """
+    碑文テキストの長さから出力の上限（文字数）を求める
+    """
+    return OUTPUT_BUDGET_BASE_CHARS + OUTPUT_BUDGET_CHARS_PER_INPUT_CHAR * len(inscription_text or '')
+
+
+class IncrementalJSONScanner:
+    """
+    チャンク単位で受け取ったテキストから、最上位のJSONオブジェクトの終わりを検出する
+
+    値そのものは組み立てず、文字列・エスケープ・括弧の深さだけを追跡する。
+    最上位のオブジェクトが閉じた時点で complete が True になり、end にその直後の
+    位置（受け取ったテキスト全体での位置）が入る。最初の { までの前置きは読み飛ばす。
+    出力が配列で始まる、ARRAY_KEYS のキーの値が配列でない、
+    persons の要素がオブジェクトでない、JSONの前に長い文章があるなどの場合は
+    StreamAborted（reason='schema'）を送出する。
+    """
+
+    def __init__(self, array_keys=ARRAY_KEYS):
+        self.array_keys = set(array_keys)
+        self.start = None
+        self.end = None
+        self.complete = False
+        self._pos = 0
+        self._preamble = False
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._key_chars = None
+        self._last_key = None
+        self._expect_key = False
+        self._expect_value = False
+        self._expect_item = False
+
+    def feed(self, chunk):
+        """
+        テキストの続きを読み進める（最上位のオブジェクトが閉じたら True を返す）
+        """
+        for char in chunk:
+            if self.complete:
+                break
+            self._step(char)
+            self._pos += 1
+        return self.complete
+
+    def _violation(self, message):
+        raise StreamAborted('schema', f"出力形式の違反: {message}")
+
+    def _step(self, char):
+        if self.start is None:
+            if char == '{':
+                self.start = self._pos
+                self._stack.append('{')
+                self._expect_key = True
+            elif char == '[' and not self._preamble:
+                # 前置きなしに配列で始まる出力（前置き中の [ は文章の一部とみなす）
+                self._violation("最上位がオブジェクトではありません")
+            elif self._pos >= MAX_PREAMBLE_CHARS:
+                self._violation("JSONの前に文章が続いています")
+            elif char not in _WHITESPACE:
+                self._preamble = True
+            return
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == '\\':
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._key_chars is not None:
+                    self._last_key = ''.join(self._key_chars)
+                    self._key_chars = None
+            elif self._key_chars is not None:
+                self._key_chars.append(char)
+            return
+
+        if char in _WHITESPACE:
+            return
+
+        depth = len(self._stack)
+        if self._expect_value:
+            # 最上位のキーの値の先頭
+            self._expect_value = False
+            if self._last_key in self.array_keys and char != '[':
+                self._violation(f"{self._last_key} が配列ではありません")
+            if self._last_key == 'persons':
+                self._expect_item = True
+        elif self._expect_item and depth == 2:
+            # persons 配列の各要素の先頭
+            self._expect_item = False
+            if char != '{' and char != ']':
+                self._violation("persons の要素がオブジェクトではありません")
+
+        if char == '"':
+            self._in_string = True
+            if depth == 1 and self._expect_key:
+                self._key_chars = []
+                self._expect_key = False
+        elif char == ':':
+            if depth == 1:
+                self._expect_value = True
+        elif char == ',':
+            if depth == 1:
+                self._expect_key = True
+            elif depth == 2 and self._last_key == 'persons' and self._stack[-1] == '[':
+                self._expect_item = True
+        elif char in '{[':
+            self._stack.append(char)
+        elif char in '}]':
+            if not self._stack or (char == '}') != (self._stack[-1] == '{'):
+                self._violation("括弧の対応が正しくありません")
+            self._stack.pop()
+            if not self._stack:
+                self.complete = True
+                self.end = self._pos + 1
+
+
+def read_json_stream(chunks, budget_chars=None):
+    """
+    LLMのストリーミング出力を読み、最上位のJSONオブジェクトが閉じた時点で読むのをやめる
+
+    Parameters:
+    -----------
+    chunks : iterable
+        出力テキストのチャンク
+    budget_chars : int, optional
+        出力の上限（文字数）。超えた場合は StreamAborted（reason='budget'）を送出する
+
+    Returns:
+    --------
+    str
+        JSONオブジェクトの部分のテキスト
+    dict
+        受け取った文字数（received_chars）と、オブジェクトが閉じた後に受け取って捨てた
+        文字数（discarded_chars）
+    """
+    scanner = IncrementalJSONScanner()
+    parts = []
+    received = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parts.append(chunk)
+        received += len(chunk)
+        try:
+            complete = scanner.feed(chunk)
+        except StreamAborted as e:
+            e.text = ''.join(parts)
+            raise
+        if complete:
+            # 残りのチャンクは読まない（呼び出し側でストリームを閉じる）
+            text = ''.join(parts)
+            return text[scanner.start:scanner.end], {
+                'received_chars': received,
+                'discarded_chars': len(text) - scanner.end,
+            }
+        if budget_chars is not None and received > budget_chars:
+            raise StreamAborted('budget', f"出力が上限（{budget_chars}字）を超えました", ''.join(parts))
+
+    raise StreamAborted('incomplete', "JSONが閉じる前に出力が終わりました", ''.join(parts))
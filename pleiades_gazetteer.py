@@ -0,0 +1,311 @@
+import argparse
+import csv
+import io
+import json
+import math
+import re
+import unicodedata
+from collections import defaultdict
+
+from edcs_fields import as_float
+from record_io import dump_json, iter_json_records, open_input, open_text, strip_compression_suffix
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+# 文字n-gramによる類似名の照合で採用するJaccard係数の下限と、照合する名前の最短の長さ
+FUZZY_THRESHOLD = 0.7
+FUZZY_MIN_LENGTH = 4
+NGRAM_SIZE = 3
+
+# 碑文の座標とPleiadesの代表点がこれ以上離れている候補は採用しない（km）
+MAX_DISTANCE_KM = 30.0
+
+_PARENTHESES_RE = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+_NON_WORD_RE = re.compile(r'[^a-z0-9 ]+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_name(name):
+    """
+    地名を照合用に正規化する（小文字化、アクセント記号の除去、v→u・j→i、記号の除去）
+    """
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(char for char in name if not unicodedata.combining(char)).lower()
+    name = _PARENTHESES_RE.sub(' ', name)
+    name = name.replace('v', 'u').replace('j', 'i')
+    name = _NON_WORD_RE.sub(' ', name)
+    return _SPACE_RE.sub(' ', name).strip()
+
+
+def split_place_names(place):
+    """
+    EDCSの地名（'Oudna, Hr. / Udhnah / Uthina' など）を個々の名前に分けて正規化する
+
+    '/' で区切られた別名と ',' で区切られた部分に分け、'Hr.'（Henchir）のような
+    短い略語だけの部分は除く。
+    """
+    names = []
+    for alias in (place or '').split('/'):
+        parts = [part.strip() for part in alias.split(',')]
+        parts = [part for part in parts if part and not (part.endswith('.') and len(part) <= 5)]
+        for candidate in [' '.join(parts)] + parts:
+            normalized = normalize_name(candidate)
+            if normalized and normalized not in names:
+                names.append(normalized)
+    return names
+
+
+def _ngrams(name):
+    padded = f" {name} "
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """
+    2点間の大円距離（km）
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 6371.0 * 2 * math.asin(math.sqrt(min(1.0, a)))
+
+
+def _split_variants(value):
+    return [variant.strip() for variant in re.split(r'[,/;]', value or '') if variant.strip()]
+
+
+def _place_id(row):
+    pid = row.get('pid') or row.get('path') or ''
+    if pid:
+        return pid.rstrip('/').rsplit('/', 1)[-1]
+    return str(row.get('id') or '')
+
+
+def iter_pleiades_names(path):
+    """
+    Pleiadesのダンプから (Pleiades ID, 名前, 緯度, 経度) を1件ずつ返す
+
+    対応する形式:
+        pleiades-places-latest.csv(.gz) : id, title, reprLat, reprLong
+        pleiades-names-latest.csv(.gz)  : pid, nameTransliterated, nameAttested, title, reprLat, reprLong
+        pleiades-places-latest.json(.gz) : @graph の各地点の id, title, reprPoint, names
+    """
+    base = strip_compression_suffix(path)
+    with open_input(path) as f:
+        if base.endswith('.csv'):
+            for row in csv.DictReader(io.TextIOWrapper(f, encoding='utf-8')):
+                place_id = _place_id(row)
+                lat, lon = as_float(row.get('reprLat')), as_float(row.get('reprLong'))
+                names = [row.get('title')] + _split_variants(row.get('nameTransliterated'))
+                names += _split_variants(row.get('nameAttested'))
+                for name in names:
+                    if name:
+                        yield place_id, name, lat, lon
+            return
+
+        if ijson is not None:
+            places = ijson.items(f, '@graph.item', use_float=True)
+        else:
+            places = json.load(f)['@graph']
+        for place in places:
+            place_id = str(place.get('id', ''))
+            point = place.get('reprPoint') or [None, None]
+            lon, lat = as_float(point[0]), as_float(point[1])
+            names = [place.get('title')]
+            for name in place.get('names') or []:
+                names += _split_variants(name.get('romanized')) + _split_variants(name.get('attested'))
+            for name in names:
+                if name:
+                    yield place_id, name, lat, lon
+
+
+class PleiadesGazetteer:
+    """
+    Pleiadesのダンプから作る地名の索引
+
+    正規化した名前の完全一致（辞書）と、文字3-gramの転置索引による類似名の照合で
+    候補の地点を求め、碑文の座標があれば MAX_DISTANCE_KM 以内の地点から選ぶ。
+
+    Parameters:
+    -----------
+    paths : list
+        Pleiadesのダンプのパス（iter_pleiades_names が対応する形式）
+    """
+
+    def __init__(self, paths):
+        self.locations = {}
+        self._exact = defaultdict(set)
+        self._names = []
+        self._name_ids = {}
+        self._ngram_index = defaultdict(list)
+        for path in paths:
+            for place_id, name, lat, lon in iter_pleiades_names(path):
+                self.add(place_id, name, lat, lon)
+
+    @property
+    def name_count(self):
+        return len(self._exact)
+
+    def add(self, place_id, name, lat=None, lon=None):
+        """
+        地点の名前を索引に加える
+        """
+        if lat is not None and lon is not None:
+            self.locations[place_id] = (lat, lon)
+        normalized = normalize_name(name)
+        if not normalized:
+            return
+        self._exact[normalized].add(place_id)
+        if normalized not in self._name_ids and len(normalized) >= FUZZY_MIN_LENGTH:
+            name_id = len(self._names)
+            self._name_ids[normalized] = name_id
+            self._names.append(normalized)
+            for gram in _ngrams(normalized):
+                self._ngram_index[gram].append(name_id)
+
+    def candidates(self, name):
+        """
+        正規化した名前に一致する地点と名前の類似度（完全一致は1.0）を返す
+        """
+        if name in self._exact:
+            return {place_id: 1.0 for place_id in self._exact[name]}
+        if len(name) < FUZZY_MIN_LENGTH:
+            return {}
+        grams = _ngrams(name)
+        shared = defaultdict(int)
+        for gram in grams:
+            for name_id in self._ngram_index.get(gram, ()):
+                shared[name_id] += 1
+        found = {}
+        for name_id, count in shared.items():
+            other = self._names[name_id]
+            score = count / (len(grams) + len(_ngrams(other)) - count)
+            if score >= FUZZY_THRESHOLD:
+                for place_id in self._exact[other]:
+                    found[place_id] = max(found.get(place_id, 0.0), score)
+        return found
+
+    def match(self, place, lat=None, lon=None):
+        """
+        EDCSの地名（と碑文の座標）から Pleiades ID を求める（決められない場合は None）
+
+        各別名の候補の類似度を求め、座標がある場合は MAX_DISTANCE_KM 以内の地点のうち
+        類似度が最も高いもの（同じ類似度では最も近いもの）を、座標がない場合は類似度が
+        最も高い候補が1つに決まるときのみ採用する。
+        """
+        found = {}
+        for name in split_place_names(place):
+            for place_id, score in self.candidates(name).items():
+                found[place_id] = max(found.get(place_id, 0.0), score)
+        if not found:
+            return None
+
+        if lat is not None and lon is not None:
+            nearby = []
+            for place_id, score in found.items():
+                location = self.locations.get(place_id)
+                if location is None:
+                    continue
+                distance = distance_km(lat, lon, *location)
+                if distance <= MAX_DISTANCE_KM:
+                    nearby.append((-score, distance, place_id))
+            return min(nearby)[2] if nearby else None
+
+        best = max(found.values())
+        best_ids = [place_id for place_id, score in found.items() if score == best]
+        return best_ids[0] if len(best_ids) == 1 else None
+
+
+class PleiadesMatcher:
+    """
+    地名ごとに Pleiades ID を1回だけ求めて保持する（create_rdf の pleiades_mapping として使う）
+
+    手作業の対応表（mapping）にある地名はそれを優先し、それ以外は地名索引で照合する。
+    同じ地名は最初に照合したときの碑文の座標で決まる。
+
+    Parameters:
+    -----------
+    gazetteer : PleiadesGazetteer
+        地名索引
+    mapping : dict, optional
+        地名 → Pleiades ID の対応表（--pleiades-mapping）
+    """
+
+    def __init__(self, gazetteer, mapping=None):
+        self.gazetteer = gazetteer
+        self.resolved = dict(mapping or {})
+        # 地名索引で照合できた地名（対応表にあった地名は含まない）
+        self.matched = set()
+        # 照合できなかった地名（後の碑文で照合できた場合は除く）
+        self.unresolved = set()
+        # 照合できなかった (地名, 座標の有無)。座標のない碑文で見つからなかった地名も、
+        # 座標のある碑文では照合し直す
+        self._misses = set()
+
+    def lookup(self, place, lat=None, lon=None):
+        """
+        地名（と碑文の座標）に対応する Pleiades ID を返す（見つからない場合は None）
+        """
+        if place in self.resolved:
+            return self.resolved[place]
+        key = (place, lat is not None and lon is not None)
+        if key in self._misses:
+            return None
+        pleiades_id = self.gazetteer.match(place, lat, lon)
+        if pleiades_id is None:
+            self._misses.add(key)
+            self.unresolved.add(place)
+        else:
+            self.resolved[place] = pleiades_id
+            self.matched.add(place)
+            self.unresolved.discard(place)
+        return pleiades_id
+
+
+def build_mapping(gazetteer, records, mapping=None):
+    """
+    filtered_data の碑文の地名ごとに Pleiades ID を求め、対応表（地名 → ID）と未解決の地名を返す
+    """
+    matcher = PleiadesMatcher(gazetteer, mapping)
+    for record in records:
+        place = record.get('place')
+        if place:
+            matcher.lookup(place, as_float(record.get('latitude')), as_float(record.get('longitude')))
+    return matcher.resolved, sorted(matcher.unresolved)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pleiadesのダンプから地名とPleiades IDの対応表を作成')
+    parser.add_argument('--gazetteer', '-g', type=str, nargs='+', required=True,
+                        help='Pleiadesのダンプ（pleiades-places-latest.csv.gz、pleiades-names-latest.csv.gz、'
+                             'pleiades-places-latest.json.gz）')
+    parser.add_argument('--input', '-i', type=str, nargs='+', required=True,
+                        help='filtered_data のJSONファイル（地名と座標を使う）')
+    parser.add_argument('--mapping', '-p', type=str, default=None,
+                        help='優先する既存の対応表（JSON形式）')
+    parser.add_argument('--output', '-o', type=str, required=True,
+                        help='対応表の出力先（create_rdf.py の --pleiades-mapping で使える形式）')
+
+    args = parser.parse_args()
+
+    from record_io import load_json
+
+    print(f"Pleiadesの地名索引を作成中: {', '.join(args.gazetteer)}")
+    gazetteer = PleiadesGazetteer(args.gazetteer)
+    print(f"地点: {len(gazetteer.locations)}件、名前: {gazetteer.name_count}件")
+
+    mapping = load_json(args.mapping) if args.mapping else None
+    records = (record for path in args.input for record in iter_json_records(path))
+    resolved, unresolved = build_mapping(gazetteer, records, mapping)
+
+    with open_text(args.output, 'w') as f:
+        dump_json(resolved, f, pretty=True)
+    print(f"対応表を保存: {args.output}（{len(resolved)}件）")
+    if unresolved:
+        print(f"見つからなかった地名: {len(unresolved)}件")
+        for place in unresolved[:20]:
+            print(f"  {place}")
@@ -0,0 +1,189 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+
+# --profile が指定されたときのみ有効になる
+_enabled = False
+_lock = threading.Lock()
+_events = []
+_stats = {}
+_counters = {}
+_origin = 0.0
+_capture_mode = None
+_capture_dir = '.'
+_null_span = contextlib.nullcontext()
+
+# トレースに残すイベント数の上限（超えた分は集計のみ）
+MAX_TRACE_EVENTS = 1_000_000
+
+
+def enable(capture_mode=None, capture_dir='.'):
+    """
+    計測を有効にする
+
+    Parameters:
+    -----------
+    capture_mode : str, optional
+        ホットループを詳細にプロファイルする方法 ('cprofile' または 'pyinstrument')
+    capture_dir : str
+        詳細プロファイルの出力先ディレクトリ
+    """
+    global _enabled, _origin, _capture_mode, _capture_dir
+    _enabled = True
+    _origin = time.perf_counter()
+    _capture_mode = capture_mode
+    _capture_dir = capture_dir
+
+
+def is_enabled():
+    return _enabled
+
+
+@contextlib.contextmanager
+def _span(name, args):
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        with _lock:
+            stat = _stats.setdefault(name, {'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+            stat['count'] += 1
+            stat['wall_s'] += wall
+            stat['cpu_s'] += cpu
+            if len(_events) < MAX_TRACE_EVENTS:
+                _events.append({
+                    'name': name,
+                    'ph': 'X',
+                    'ts': (wall_start - _origin) * 1e6,
+                    'dur': wall * 1e6,
+                    'pid': os.getpid(),
+                    'tid': threading.get_ident(),
+                    'args': dict(args, cpu_ms=round(cpu * 1e3, 3)),
+                })
+
+
+def span(name, **args):
+    """
+    名前付きの区間の壁時計時間とCPU時間を計測する
+
+    計測が無効な場合は何もしないコンテキストマネージャを返す
+
+    使用例:
+        with profiling.span('llm_call', edcs_id=edcs_id):
+            response_text = call_llm(prompt, model_type, client)
+    """
+    if not _enabled:
+        return _null_span
+    return _span(name, args)
+
+
+def count(name, n=1):
+    """
+    名前付きのカウンタを加算する
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+@contextlib.contextmanager
+def capture(name):
+    """
+    ホットループを cProfile / pyinstrument で詳細にプロファイルする
+
+    enable() で capture_mode を指定した場合のみ動作し、結果を
+    <capture_dir>/<name>.prof（cProfile）または <name>.html（pyinstrument）に保存する
+    """
+    if not _enabled or _capture_mode is None:
+        yield
+        return
+
+    os.makedirs(_capture_dir, exist_ok=True)
+    if _capture_mode == 'pyinstrument':
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            output_path = os.path.join(_capture_dir, f'{name}.html')
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+            print(f"プロファイルを保存: {output_path}")
+    else:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            output_path = os.path.join(_capture_dir, f'{name}.prof')
+            profiler.dump_stats(output_path)
+            print(f"プロファイルを保存: {output_path}")
+
+
+def _summary_unlocked():
+    spans = {name: {'count': stat['count'],
+                    'wall_s': round(stat['wall_s'], 6),
+                    'cpu_s': round(stat['cpu_s'], 6)}
+             for name, stat in sorted(_stats.items(), key=lambda kv: kv[1]['wall_s'], reverse=True)}
+    return {'spans': spans, 'counters': dict(_counters)}
+
+
+def summary():
+    """
+    区間ごとの集計（回数・壁時計時間・CPU時間）とカウンタを返す
+    """
+    with _lock:
+        return _summary_unlocked()
+
+
+def save_trace(path):
+    """
+    Chrome Trace Event形式のJSONを保存する（chrome://tracing、Perfetto、speedscopeで開ける）
+    """
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with _lock:
+        trace = {
+            'traceEvents': list(_events),
+            'displayTimeUnit': 'ms',
+            'otherData': _summary_unlocked(),
+        }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(trace, f, ensure_ascii=False)
+
+
+def print_summary():
+    """
+    区間ごとの集計を表示する
+    """
+    result = summary()
+    print("\n" + "=" * 80)
+    print("プロファイル（区間ごとの集計）")
+    print(f"{'区間':<24}{'回数':>10}{'壁時計(s)':>14}{'CPU(s)':>12}")
+    for name, stat in result['spans'].items():
+        print(f"{name:<24}{stat['count']:>10}{stat['wall_s']:>14.3f}{stat['cpu_s']:>12.3f}")
+    for name, value in result['counters'].items():
+        print(f"  {name}: {value}")
+
+
+def finish(trace_path):
+    """
+    計測が有効ならトレースを保存して集計を表示する
+    """
+    if not _enabled:
+        return
+    save_trace(trace_path)
+    print_summary()
+    print(f"トレースを保存: {trace_path}")
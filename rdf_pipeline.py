@@ -0,0 +1,254 @@
+import argparse
+import os
+import queue
+import threading
+import time
+
+import profiling
+from create_rdf import STREAM_PREFIXES, load_pleiades_mapping, write_inscription
+from edcs_index import EdcsIndex
+from extract_career_graph import load_env, process_inscriptions
+from rdf_writer import StreamingRDFWriter
+from record_io import compression_suffix, iter_json_records, strip_compression_suffix
+
+
+# 抽出とRDF生成を並行して行う場合の出力形式（行単位で追記できる形式のみ）
+PIPELINE_FORMATS = ('nt', 'nquads')
+
+# 抽出結果のキューの上限（RDFの生成が遅れた場合は抽出側が待つ）
+QUEUE_SIZE = 256
+
+_DONE = object()
+
+
+class RDFStage(threading.Thread):
+    """
+    抽出結果をキューから受け取り、RDFとして逐次書き出すスレッド
+
+    LLMの呼び出しは応答を待つ間GILを解放するため、抽出（メインスレッド）と
+    RDFの生成（このスレッド）は並行して進む。キューが空になるたびに出力を
+    フラッシュするので、抽出の途中でも書き出し済みのトリプルを読み出せる。
+
+    Parameters:
+    -----------
+    writer : StreamingRDFWriter
+        書き出し先
+    pleiades_mapping : dict or PleiadesMatcher, optional
+        地名とPleiades IDの対応表
+    queue_size : int
+        キューの上限
+    """
+
+    def __init__(self, writer, pleiades_mapping=None, queue_size=QUEUE_SIZE):
+        super().__init__(name='rdf-stage', daemon=True)
+        self.writer = writer
+        self.pleiades_mapping = pleiades_mapping or {}
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.count = 0
+        self.pleiades_count = 0
+        self.first_triple_at = None
+        self.error = None
+
+    def put(self, result, source_row=None):
+        """
+        抽出結果をキューに入れる（process_inscriptions の on_result に渡す）
+
+        コンパクト形式の結果は source_row（元データ）から碑文の属性を生成する。
+        RDFの生成が失敗していれば例外を送出して抽出も止める。
+        """
+        while True:
+            if self.error is not None:
+                raise RuntimeError(f"RDFの生成に失敗しました: {self.error}") from self.error
+            try:
+                self.queue.put((result, source_row), timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def run(self):
+        try:
+            while True:
+                entry = self.queue.get()
+                if entry is _DONE:
+                    break
+                result, source_row = entry
+                if result.get('original_data'):
+                    source_row = None
+                self.pleiades_count += write_inscription(self.writer, result, self.pleiades_mapping, source_row)
+                self.count += 1
+                if self.first_triple_at is None and self.writer.triple_count:
+                    self.first_triple_at = time.perf_counter()
+                if self.queue.empty():
+                    self.writer.flush()
+        except Exception as e:
+            self.error = e
+
+    def finish(self):
+        """
+        キューに残った結果を書き出し終えるまで待つ
+        """
+        while self.is_alive():
+            try:
+                self.queue.put(_DONE, timeout=1)
+                break
+            except queue.Full:
+                continue
+        self.join()
+        if self.error is not None:
+            raise RuntimeError(f"RDFの生成に失敗しました: {self.error}") from self.error
+
+
+def run_pipeline(json_path, output_path, rdf_path, model_type='claude', format='nt',
+                 pleiades_mapping_path=None, pleiades_gazetteer_paths=None, queue_size=QUEUE_SIZE,
+                 **extract_kwargs):
+    """
+    碑文からの抽出とRDFの生成を並行して行う
+
+    extract_career_graph.process_inscriptions の各結果をキューに入れ、別スレッドで
+    create_rdf と同じ処理（write_inscription）によりトリプルを追記する。出力ファイルに
+    既存の結果がある場合（再開時）は、抽出を始める前にそれらのRDFを書き出す。
+
+    Parameters:
+    -----------
+    json_path : str
+        入力JSONファイル（filtered_data）のパス
+    output_path : str
+        抽出結果ファイルのパス
+    rdf_path : str
+        RDFファイルのパス（実行ごとに作り直す。.gz / .zst で終わる場合は圧縮して保存）
+    model_type : str
+        使用するモデル ('claude', 'gemini', 'gpt')
+    format : str
+        'nt'（N-Triples）または 'nquads'（碑文ごとの名前付きグラフ）
+    pleiades_mapping_path : str, optional
+        地名とPleiades IDの対応表ファイルパス（JSON形式）
+    pleiades_gazetteer_paths : list, optional
+        Pleiadesのダンプのパス（対応表にない地名を地名索引で照合する）
+    queue_size : int
+        抽出結果のキューの上限
+    **extract_kwargs
+        process_inscriptions に渡す引数（limit、compact、client、stream など）
+
+    Returns:
+    --------
+    dict
+        抽出の統計情報、RDFに書き出した碑文数・トリプル数、最初のトリプルまでの時間と全体の時間
+    """
+    if format not in PIPELINE_FORMATS:
+        raise ValueError(f"パイプラインに対応していない形式です: {format}")
+    if extract_kwargs.get('reextract_stale'):
+        # 追記のみのRDFでは置き換えた結果の古いトリプルを取り除けない
+        raise ValueError("パイプラインでは reextract_stale を使えません（create_rdf.py で作り直してください）")
+
+    start = time.perf_counter()
+    rdf_dir = os.path.dirname(rdf_path)
+    if rdf_dir:
+        os.makedirs(rdf_dir, exist_ok=True)
+    writer = StreamingRDFWriter(rdf_path, format, STREAM_PREFIXES)
+    pleiades_mapping = load_pleiades_mapping(pleiades_mapping_path, pleiades_gazetteer_paths)
+    stage = RDFStage(writer, pleiades_mapping, queue_size=queue_size)
+    stage.start()
+
+    try:
+        # 再開時は既存の結果のRDFを先に書き出す（抽出を始める前なので結果ファイルの追記と競合しない）
+        existing = 0
+        if os.path.exists(output_path):
+            print(f"既存の抽出結果のRDFを書き出し中: {output_path}")
+            with EdcsIndex(json_path) as source_index:
+                for result in iter_json_records(output_path):
+                    source_row = None if result.get('original_data') else source_index.get(result.get('edcs_id'))
+                    stage.put(result, source_row)
+                    existing += 1
+            print(f"既存の抽出結果: {existing}件")
+
+        stats = process_inscriptions(json_path, output_path, model_type=model_type,
+                                     on_result=stage.put, **extract_kwargs)
+    finally:
+        stage.finish()
+        writer.close()
+
+    wall_s = time.perf_counter() - start
+    first_triple_s = stage.first_triple_at - start if stage.first_triple_at is not None else None
+    profiling.count('triples', writer.triple_count)
+
+    print("\n" + "=" * 80)
+    print("RDF生成完了（抽出と並行）")
+    print(f"RDFに書き出した碑文: {stage.count}件（うち既存の結果 {existing}件）")
+    print(f"総トリプル数: {writer.triple_count}")
+    if stage.pleiades_count:
+        print(f"Pleiades IDを追加: {stage.pleiades_count}件")
+    if first_triple_s is not None:
+        print(f"最初のトリプルまで: {first_triple_s:.2f}秒")
+    print(f"全体の時間: {wall_s:.2f}秒")
+    print(f"出力ファイル: {rdf_path}")
+
+    return {
+        'extract': stats,
+        'inscriptions': stage.count,
+        'triples': writer.triple_count,
+        'first_triple_s': first_triple_s,
+        'wall_s': wall_s,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='碑文からの人物・経歴の抽出とRDFの生成を並行して行う')
+    parser.add_argument('--input', '-i', type=str, required=True,
+                        help='入力JSONファイル（filtered_data）のパス')
+    parser.add_argument('--output', '-o', type=str, required=True,
+                        help='抽出結果ファイルのパス（.jsonl を推奨。既存の結果があれば続きから処理する）')
+    parser.add_argument('--rdf-output', '-r', type=str, default=None,
+                        help='RDFファイルのパス（指定しない場合は抽出結果ファイルと同じ場所に .nt / .nq で保存）')
+    parser.add_argument('--format', '-f', type=str, default='nt', choices=list(PIPELINE_FORMATS),
+                        help='RDFの形式（nt: N-Triples、nquads: 碑文ごとの名前付きグラフ、デフォルト: nt）')
+    parser.add_argument('--model', '-m', type=str, default='claude', choices=['claude', 'gemini', 'gpt'],
+                        help='使用するLLMモデル（デフォルト: claude）')
+    parser.add_argument('--api-key', '-k', type=str, default=None,
+                        help='APIキー（指定しない場合は環境変数から取得）')
+    parser.add_argument('--limit', '-l', type=int, default=None,
+                        help='処理する碑文の最大数（指定しない場合は全件）')
+    parser.add_argument('--pleiades-mapping', '-p', type=str, default=None,
+                        help='地名とPleiades IDの対応表ファイルパス（JSON形式）')
+    parser.add_argument('--pleiades-gazetteer', '-g', type=str, nargs='+', default=None,
+                        help='Pleiadesのダンプ（対応表にない地名を地名と座標で照合する）')
+    parser.add_argument('--compact', action='store_true',
+                        help='元データと旧形式の重複フィールドを抽出結果に出力しない')
+    parser.add_argument('--stream', action='store_true',
+                        help='LLMをストリーミングで呼び出し、JSONが閉じた時点で生成を打ち切る')
+    parser.add_argument('--cascade', action='store_true',
+                        help='小さなモデルで抽出し、検査で問題のある碑文のみ上位モデルで抽出し直す')
+    parser.add_argument('--dedup', action='store_true',
+                        help='同一テキストの碑文を1回だけ抽出する')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='区間ごとの計測を有効にし、トレース（Chrome Trace形式のJSON）を保存するパス')
+
+    args = parser.parse_args()
+
+    load_env()
+
+    rdf_path = args.rdf_output
+    if rdf_path is None:
+        extension = '.nq' if args.format == 'nquads' else '.nt'
+        base = strip_compression_suffix(args.output)
+        for suffix in ('.jsonl', '.json'):
+            if base.endswith(suffix):
+                base = base[:-len(suffix)]
+                break
+        rdf_path = base.replace('_career', '') + extension + compression_suffix(args.output)
+
+    print(f"使用モデル: {args.model}")
+    print(f"入力ファイル: {args.input}")
+    print(f"抽出結果ファイル: {args.output}")
+    print(f"RDFファイル: {rdf_path}")
+    print()
+
+    if args.profile:
+        profiling.enable(capture_dir=os.path.dirname(args.profile) or '.')
+
+    run_pipeline(args.input, args.output, rdf_path, model_type=args.model, format=args.format,
+                 pleiades_mapping_path=args.pleiades_mapping, pleiades_gazetteer_paths=args.pleiades_gazetteer,
+                 api_key=args.api_key, limit=args.limit,
+                 compact=args.compact, stream=args.stream, cascade=args.cascade, dedup=args.dedup)
+
+    if args.profile:
+        profiling.finish(args.profile)
@@ -0,0 +1,227 @@
+import json
+import re
+from collections import Counter
+
+from rdflib import Literal, URIRef, RDF, XSD
+
+from record_io import open_output
+
+
+# ストリーミング出力に対応する形式
+STREAM_FORMATS = ('turtle', 'nt', 'nquads', 'json-ld')
+
+# 1行が1トリプルで、碑文ごとの行を取り除いたり追記したりできる形式
+LINE_FORMATS = ('nt', 'nquads')
+
+# 接頭辞付き名前（prefix:local）で書けるローカル名（それ以外は <IRI> で書く）
+_LOCAL_NAME_RE = re.compile(r'^[A-Za-z0-9_](?:[A-Za-z0-9_\-]*[A-Za-z0-9_])?$')
+
+
+class TripleBlock:
+    """
+    1件の碑文のトリプルを追加順に保持する（rdflib.Graph.add と同じ呼び出し方ができる）
+    """
+
+    def __init__(self):
+        self.triples = []
+
+    def add(self, triple):
+        self.triples.append(triple)
+
+
+class _QNames:
+    """
+    IRIを接頭辞付き名前に変換する（rdflib の namespace_manager の代わりに Literal.n3() に渡す）
+    """
+
+    def __init__(self, prefixes):
+        # 長い名前空間から順に照合する
+        self.prefixes = sorted(prefixes, key=lambda pair: len(pair[1]), reverse=True)
+        self._cache = {}
+
+    def qname(self, uri):
+        """
+        接頭辞付き名前を返す（変換できない場合は None）
+        """
+        uri = str(uri)
+        if uri in self._cache:
+            return self._cache[uri]
+        result = None
+        for prefix, namespace in self.prefixes:
+            if uri.startswith(namespace):
+                local = uri[len(namespace):]
+                if _LOCAL_NAME_RE.match(local):
+                    result = f"{prefix}:{local}"
+                break
+        if len(self._cache) < 100000:
+            self._cache[uri] = result
+        return result
+
+    def normalizeUri(self, uri):
+        return self.qname(uri) or f"<{uri}>"
+
+
+class StreamingRDFWriter:
+    """
+    碑文ごとのトリプルを Turtle / N-Triples / N-Quads / JSON-LD として逐次書き出すクラス
+
+    rdflib の serialize() のようにグラフ全体を保持・ソートせず、碑文ごとのブロックを
+    追加順に書き出す。属性（身分・地名・関係の種類など）のように複数の碑文から
+    参照される主語のトリプルは、最初の1回だけ書き出す。同じ入力からは同じバイト列になる。
+    出力パスが .gz / .zst で終わる場合は圧縮しながら書き出す。
+
+    Parameters:
+    -----------
+    path : str
+        出力ファイルのパス
+    format : str
+        'turtle'、'nt'、'nquads'、'json-ld' のいずれか
+    prefixes : list
+        (接頭辞, 名前空間) のリスト
+    append : bool
+        既存のファイルに追記するかどうか（行単位の形式 'nt' / 'nquads' のみ）
+    """
+
+    def __init__(self, path, format, prefixes, append=False):
+        if format not in STREAM_FORMATS:
+            raise ValueError(f"ストリーミング出力に対応していない形式です: {format}")
+        if append and format not in LINE_FORMATS:
+            raise ValueError(f"追記に対応していない形式です: {format}")
+        self.format = format
+        self.prefixes = [(prefix, str(namespace)) for prefix, namespace in prefixes]
+        self.triple_count = 0
+        self.type_counts = Counter()
+        self._qnames = _QNames(self.prefixes)
+        self._shared_seen = set()
+        self._first_node = True
+        self._file = open_output(path, append=append)
+        if not append:
+            self._write_header()
+
+    def _write(self, text):
+        self._file.write(text.encode('utf-8'))
+
+    def _write_header(self):
+        if self.format == 'turtle':
+            self._write(''.join(f"@prefix {prefix}: <{namespace}> .\n" for prefix, namespace in self.prefixes))
+            self._write('\n')
+        elif self.format == 'json-ld':
+            context = {prefix: namespace for prefix, namespace in self.prefixes}
+            self._write('{\n  "@context": ' + json.dumps(context, ensure_ascii=False) + ',\n  "@graph": [\n')
+
+    def _term(self, term):
+        if isinstance(term, Literal):
+            return term.n3(self._qnames)
+        return self._qnames.normalizeUri(term)
+
+    def mark_written(self, triples):
+        """
+        既に出力にある共有の主語のトリプルを登録する（追記時に同じトリプルを書き出さない）
+        """
+        self._shared_seen.update(triples)
+
+    def write_block(self, triples, owner_id, graph=None):
+        """
+        1件の碑文のトリプルを書き出す
+
+        Parameters:
+        -----------
+        triples : list
+            (主語, 述語, 目的語) のリスト（TripleBlock.triples）
+        owner_id : str
+            碑文のEDCS-ID。ローカル名が owner_id で始まらない主語は共有の主語とみなし、
+            重複するトリプルを書き出さない
+        graph : URIRef, optional
+            N-Quads で碑文自身のトリプルを入れるグラフ（共有の主語のトリプルはデフォルトグラフ）
+        """
+        subjects = {}
+        shared = set()
+        for triple in triples:
+            subject = triple[0]
+            local = str(subject).rsplit('/', 1)[-1]
+            if local != owner_id and not local.startswith(owner_id + '_'):
+                if triple in self._shared_seen:
+                    continue
+                self._shared_seen.add(triple)
+                shared.add(subject)
+            predicates = subjects.setdefault(subject, {})
+            objects = predicates.setdefault(triple[1], [])
+            if triple[2] in objects:
+                continue
+            objects.append(triple[2])
+            self.triple_count += 1
+            if triple[1] == RDF.type:
+                self.type_counts[triple[2]] += 1
+
+        if self.format == 'turtle':
+            self._write_turtle(subjects)
+        elif self.format == 'nt':
+            self._write_ntriples(subjects)
+        elif self.format == 'nquads':
+            self._write_ntriples(subjects, graph, shared)
+        else:
+            self._write_jsonld(subjects)
+
+    def _write_turtle(self, subjects):
+        lines = []
+        for subject, predicates in subjects.items():
+            parts = []
+            for predicate, objects in predicates.items():
+                name = 'a' if predicate == RDF.type else self._term(predicate)
+                parts.append(f"{name} " + ' ,\n        '.join(self._term(o) for o in objects))
+            lines.append(f"{self._term(subject)} " + ' ;\n    '.join(parts) + ' .\n')
+        if lines:
+            self._write('\n'.join(lines) + '\n')
+
+    def _write_ntriples(self, subjects, graph=None, shared=()):
+        lines = []
+        graph_n3 = f" {graph.n3()}" if graph is not None else ''
+        for subject, predicates in subjects.items():
+            subject_n3 = subject.n3()
+            context = '' if subject in shared else graph_n3
+            for predicate, objects in predicates.items():
+                predicate_n3 = predicate.n3()
+                for o in objects:
+                    lines.append(f"{subject_n3} {predicate_n3} {o.n3()}{context} .\n")
+        self._write(''.join(lines))
+
+    def _jsonld_iri(self, uri):
+        return self._qnames.qname(uri) or str(uri)
+
+    def _jsonld_value(self, term):
+        if not isinstance(term, Literal):
+            return {'@id': self._jsonld_iri(term)}
+        if term.language:
+            return {'@value': str(term), '@language': term.language}
+        if term.datatype is not None and term.datatype != XSD.string:
+            return {'@value': str(term), '@type': self._jsonld_iri(term.datatype)}
+        return {'@value': str(term)}
+
+    def _write_jsonld(self, subjects):
+        for subject, predicates in subjects.items():
+            node = {'@id': self._jsonld_iri(subject)}
+            for predicate, objects in predicates.items():
+                if predicate == RDF.type and all(isinstance(o, URIRef) for o in objects):
+                    node['@type'] = [self._jsonld_iri(o) for o in objects]
+                else:
+                    node[self._jsonld_iri(predicate)] = [self._jsonld_value(o) for o in objects]
+            separator = '' if self._first_node else ',\n'
+            self._first_node = False
+            self._write(separator + '    ' + json.dumps(node, ensure_ascii=False))
+
+    def flush(self):
+        """
+        書き出し済みのブロックをファイルに反映する（出力を読みながら処理する場合用）
+        """
+        self._file.flush()
+
+    def close(self):
+        if self.format == 'json-ld':
+            self._write('\n  ]\n}\n')
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
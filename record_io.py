@@ -0,0 +1,507 @@
+import io
+import json
+import os
+
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+_READ_CHUNK_SIZE = 1 << 16
+
+
+# 拡張子で判定する圧縮形式（.json.zst、.jsonl.gz、.nt.zst など）
+COMPRESSION_SUFFIXES = ('.gz', '.zst')
+
+# 機械が読む出力の区切り文字（空白を入れない）
+COMPACT_SEPARATORS = (',', ':')
+
+
+def compression_suffix(path):
+    """
+    圧縮形式の拡張子（'.gz' / '.zst'）を返す（圧縮されていない場合は空文字列）
+    """
+    for suffix in COMPRESSION_SUFFIXES:
+        if path.endswith(suffix):
+            return suffix
+    return ''
+
+
+def strip_compression_suffix(path):
+    """
+    圧縮形式の拡張子を取り除いたパスを返す（例: xxx.jsonl.gz → xxx.jsonl）
+    """
+    suffix = compression_suffix(path)
+    return path[:-len(suffix)] if suffix else path
+
+
+def is_compressed_path(path):
+    """
+    拡張子から圧縮ファイルかどうかを判定する
+    """
+    return bool(compression_suffix(path))
+
+
+def is_jsonl_path(path):
+    """
+    拡張子からJSON Lines形式かどうかを判定する（.jsonl.gz / .jsonl.zst も含む）
+    """
+    return strip_compression_suffix(path).endswith('.jsonl')
+
+
+def open_input(path):
+    """
+    入力ファイルをバイナリ読み込みで開く（.gz / .zst の場合は読みながら展開する）
+    """
+    suffix = compression_suffix(path)
+    if suffix == '.gz':
+        import gzip
+        return gzip.open(path, 'rb')
+    if suffix == '.zst':
+        import zstandard
+        # 追記で複数のフレームが連結されている場合も最後まで読む（行単位で読めるようにバッファを挟む）
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True,
+                                                            closefd=True)
+        return io.BufferedReader(reader, buffer_size=_READ_CHUNK_SIZE)
+    return open(path, 'rb')
+
+
+def _iter_decompressed_chunks(path):
+    """
+    圧縮ファイルを展開したデータをチャンク単位で返す
+
+    展開できたデータはすべて返したうえで、最後の圧縮フレーム（gzip のメンバー）が
+    途中で終わっている場合は EOFError を送出する。
+    """
+    if compression_suffix(path) == '.gz':
+        import zlib
+        new_decompressor = lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)
+        decompress_error = zlib.error
+    else:
+        import zstandard
+        new_decompressor = lambda: zstandard.ZstdDecompressor().decompressobj()
+        decompress_error = zstandard.ZstdError
+
+    with open(path, 'rb') as f:
+        decompressor = None
+        while True:
+            data = f.read(_READ_CHUNK_SIZE)
+            if not data:
+                break
+            while data:
+                if decompressor is None:
+                    decompressor = new_decompressor()
+                try:
+                    yield decompressor.decompress(data)
+                except decompress_error as e:
+                    raise OSError(f"圧縮データの展開に失敗しました: {e}") from e
+                if not decompressor.eof:
+                    break
+                # 次のフレーム（追記されたデータ）に進む
+                data = decompressor.unused_data
+                decompressor = None
+    if decompressor is not None:
+        raise EOFError("圧縮フレームの途中でファイルが終わっています")
+
+
+def open_output(path, append=False):
+    """
+    出力ファイルをバイナリ書き込みで開く（.gz / .zst の場合は圧縮しながら書き込む）
+
+    gzip は速度を優先して圧縮レベル6で書き込み、ヘッダーの更新時刻を0に固定するため
+    同じ内容なら同じバイト列になる。
+    append=True の場合は末尾に新しい圧縮フレーム（gzip のメンバー）を追加する。
+    .zst には zstandard パッケージが必要。
+    """
+    mode = 'ab' if append else 'wb'
+    suffix = compression_suffix(path)
+    if suffix == '.gz':
+        import gzip
+        raw = open(path, mode)
+        f = gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=6, mtime=0)
+        # close() で元のファイルも閉じられるようにする
+        f.myfileobj = raw
+        return f
+    if suffix == '.zst':
+        import zstandard
+        return zstandard.ZstdCompressor().stream_writer(open(path, mode), closefd=True)
+    return open(path, mode)
+
+
+def open_text(path, mode='r'):
+    """
+    テキストファイルとして開く（'r' / 'w' / 'a'、圧縮ファイルも拡張子で判定して透過的に扱う）
+    """
+    if not is_compressed_path(path):
+        return open(path, mode, encoding='utf-8', newline='' if mode == 'r' else None)
+    raw = open_input(path) if mode == 'r' else open_output(path, append=(mode == 'a'))
+    return io.TextIOWrapper(raw, encoding='utf-8', newline='' if mode == 'r' else None)
+
+
+def load_json(path):
+    """
+    JSONファイル全体を読み込む（圧縮ファイルにも対応）
+    """
+    with open_input(path) as f:
+        return json.loads(f.read())
+
+
+def dump_json(obj, f, pretty=False):
+    """
+    JSONをテキストファイルに書き出す
+
+    pretty=False の場合は空白なしの区切り文字で出力する（機械が読む中間ファイル向け）。
+    json.dump() と違い、文字列全体を C 実装で一度に作ってから書き込む。
+    """
+    if pretty:
+        f.write(json.dumps(obj, ensure_ascii=False, indent=2))
+    else:
+        f.write(json.dumps(obj, ensure_ascii=False, separators=COMPACT_SEPARATORS))
+
+
+def _iter_json_array(f):
+    """
+    JSON配列の要素を1件ずつ、ファイル内のバイト位置とともに読み出す
+
+    ファイル全体を読み込まず、チャンク単位で json.JSONDecoder.raw_decode にかける。
+    f は newline='' で開いたテキストファイルであること（改行変換でバイト位置がずれるため）
+
+    Yields:
+    -------
+    tuple
+        (レコード, 開始バイト位置, バイト長)
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    byte_pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # 空白と区切り文字を読み飛ばす
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+                byte_pos += 1
+            if pos < len(buffer) or eof:
+                break
+            chunk = f.read(_READ_CHUNK_SIZE)
+            buffer, pos = buffer[pos:] + chunk, 0
+            eof = not chunk
+
+        if pos >= len(buffer):
+            if started:
+                raise ValueError("JSON配列が閉じられていません")
+            return
+
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError("JSON配列の形式ではありません")
+            started = True
+            pos += 1
+            byte_pos += 1
+            continue
+
+        if buffer[pos] == ']':
+            return
+
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # 要素が途中で切れているので続きを読み込む
+            chunk = f.read(_READ_CHUNK_SIZE)
+            buffer, pos = buffer[pos:] + chunk, 0
+            eof = not chunk
+            continue
+
+        length = len(buffer[pos:end].encode('utf-8'))
+        yield record, byte_pos, length
+        byte_pos += length
+        pos = end
+        if pos > _READ_CHUNK_SIZE:
+            buffer, pos = buffer[pos:], 0
+
+
+def iter_json_record_spans(path):
+    """
+    JSON配列またはJSON Linesファイルのレコードを、バイト位置とともに1件ずつ読み出す
+
+    圧縮ファイルの場合、バイト位置は展開後のデータ上の位置になる。
+
+    Yields:
+    -------
+    tuple
+        (レコード, 開始バイト位置, バイト長)
+    """
+    if is_jsonl_path(path):
+        offset = 0
+        with open_input(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line), offset, len(line.rstrip(b'\r\n'))
+                offset += len(line)
+    else:
+        with open_text(path) as f:
+            yield from _iter_json_array(f)
+
+
+def iter_json_records(path):
+    """
+    JSON配列またはJSON Linesファイルからレコードを1件ずつ読み出す
+
+    メモリ上には常に1件分のレコードしか保持しない。.gz / .zst の場合は読みながら展開する。
+
+    Parameters:
+    -----------
+    path : str
+        入力ファイルのパス（.json / .jsonl、およびその .gz / .zst）
+
+    Yields:
+    -------
+    dict
+        レコード
+    """
+    with open_input(path) as f:
+        if is_jsonl_path(path):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        elif ijson is not None:
+            yield from ijson.items(f, 'item', use_float=True)
+        else:
+            for record, _, _ in _iter_json_array(io.TextIOWrapper(f, encoding='utf-8', newline='')):
+                yield record
+
+
+def write_json_records(path, records, pretty=False):
+    """
+    レコードのリストをJSON配列またはJSON Linesとして保存する
+
+    一時ファイルに書き出してから置き換えるため、書き込み中に中断されても
+    既存のファイルが壊れることはない。既定では空白なしの区切り文字で出力し、
+    pretty=True の場合はインデント付きで出力する（JSON配列のみ）。
+    """
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    # 一時ファイルも同じ拡張子で圧縮する
+    suffix = compression_suffix(path)
+    tmp_path = strip_compression_suffix(path) + '.tmp' + suffix
+    with open_text(tmp_path, 'w') as f:
+        if is_jsonl_path(path):
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=COMPACT_SEPARATORS) + '\n')
+        else:
+            dump_json(list(records), f, pretty=pretty)
+    os.replace(tmp_path, path)
+
+
+class ResultWriter:
+    """
+    抽出結果の書き出しを担当するクラス
+
+    .json の場合は結果をメモリに保持し、flush() のたびにファイル全体を書き直す。
+    .jsonl の場合は1件ごとにファイル末尾へ追記するため、チェックポイントの
+    コストは結果件数に依存しない。.gz / .zst の場合は圧縮しながら書き込む
+    （.jsonl では実行ごとに圧縮フレームを追加する）。
+    replace() で置き換えた結果は、.jsonl では追記しておき close() の際に古い行を取り除く。
+    record_type を指定した場合、メモリに保持する結果（.json の結果と、.jsonl で古い行を
+    取り除く際の結果）はその型にして1件あたりのメモリを抑え、書き出す際に辞書に戻す。
+
+    Parameters:
+    -----------
+    path : str
+        出力ファイルのパス
+    pretty : bool
+        .json をインデント付きで書き出すかどうか
+    record_type : type, optional
+        from_dict() と to_dict() を持つ結果の型（career_model.Inscription など）。
+        指定しない場合は辞書のまま保持する
+    """
+
+    def __init__(self, path, pretty=False, record_type=None):
+        self.path = path
+        self.jsonl = is_jsonl_path(path)
+        self.pretty = pretty
+        self.record_type = record_type
+        self.records = []
+        self.count = 0
+        self.pending = 0
+        self._file = None
+        self._positions = None
+        self.superseded = False
+
+    def _load(self, record):
+        return record if self.record_type is None else self.record_type.from_dict(record)
+
+    def _dump(self, record):
+        return record if self.record_type is None else record.to_dict()
+
+    def _edcs_id(self, record):
+        return record.get('edcs_id') if self.record_type is None else record.edcs_id
+
+    def load_existing(self):
+        """
+        既存の出力ファイル（.json）のレコードを1件ずつ返す
+        """
+        if not os.path.exists(self.path):
+            return
+
+        records = load_json(self.path)
+        self.records = []
+        self.count = len(records)
+        for record in records:
+            self.records.append(self._load(record))
+            yield record
+
+    def iter_records(self):
+        """
+        書き出し済み（.json では保持している）結果を辞書として1件ずつ返す
+        """
+        if self.jsonl:
+            if os.path.exists(self.path):
+                yield from iter_json_records(self.path)
+            return
+        for record in self.records:
+            yield self._dump(record)
+
+    def repair_tail(self):
+        """
+        JSON Linesの最終行が強制終了で途中までしか書かれていなければ切り捨てる
+        """
+        if not os.path.exists(self.path):
+            return
+        if is_compressed_path(self.path):
+            self._repair_compressed_tail()
+            return
+
+        size = os.path.getsize(self.path)
+        with open(self.path, 'r+b') as f:
+            end = size
+            while end > 0:
+                start = max(0, end - _READ_CHUNK_SIZE)
+                f.seek(start)
+                block = f.read(end - start)
+                newline = block.rfind(b'\n')
+                if newline != -1:
+                    valid_end = start + newline + 1
+                    break
+                end = start
+            else:
+                valid_end = 0
+
+            if valid_end < size:
+                print(f"警告: 不完全な最終行を切り捨てます: {self.path}")
+                f.truncate(valid_end)
+
+    def _repair_compressed_tail(self):
+        """
+        圧縮されたJSON Linesが途中で切れていれば、完全な行だけで書き直す
+
+        圧縮データは途中で切り詰められないため、展開できた完全な行を読み出して
+        ファイル全体を作り直す（強制終了した場合のみ発生する）。
+        """
+        lines = []
+        truncated = False
+        try:
+            pending = b''
+            for chunk in _iter_decompressed_chunks(self.path):
+                pending += chunk
+                *complete, pending = pending.split(b'\n')
+                lines.extend(line + b'\n' for line in complete)
+            truncated = bool(pending)
+        except (EOFError, OSError):
+            # 圧縮フレームの途中で終わっている
+            truncated = True
+
+        if truncated:
+            print(f"警告: 不完全な最終行を切り捨てます: {self.path}")
+            tmp_path = strip_compression_suffix(self.path) + '.tmp' + compression_suffix(self.path)
+            with open_output(tmp_path) as f:
+                f.write(b''.join(lines))
+            os.replace(tmp_path, self.path)
+
+    def append(self, record):
+        """
+        抽出結果を1件追加する
+        """
+        self.count += 1
+        if self.jsonl:
+            if self._file is None:
+                output_dir = os.path.dirname(self.path)
+                if output_dir:
+                    os.makedirs(output_dir, exist_ok=True)
+                self._file = open_text(self.path, 'a')
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=COMPACT_SEPARATORS) + '\n')
+            self._file.flush()
+        else:
+            self.records.append(self._load(record))
+            self.pending += 1
+
+    def replace(self, record):
+        """
+        同じEDCS-IDの既存の結果を置き換える（既存の結果がなければ追加する）
+        """
+        if self.jsonl:
+            self.append(record)
+            self.count -= 1
+            self.superseded = True
+            return
+        if self._positions is None:
+            self._positions = {self._edcs_id(existing): i for i, existing in enumerate(self.records)}
+        position = self._positions.get(record.get('edcs_id'))
+        if position is None:
+            self._positions[record.get('edcs_id')] = len(self.records)
+            self.append(record)
+        else:
+            self.records[position] = self._load(record)
+            self.pending += 1
+
+    def _drop_superseded(self):
+        """
+        JSON Linesから置き換えられた古い行を取り除く（置き換えた結果は元の行の位置に置く）
+        """
+        records = []
+        edcs_ids = []
+        for record in iter_json_records(self.path):
+            edcs_ids.append(record.get('edcs_id'))
+            records.append(self._load(record))
+        latest = {edcs_id: i for i, edcs_id in enumerate(edcs_ids)}
+        kept = []
+        seen = set()
+        for record, edcs_id in zip(records, edcs_ids):
+            if edcs_id is None:
+                kept.append(record)
+            elif edcs_id not in seen:
+                seen.add(edcs_id)
+                kept.append(records[latest[edcs_id]])
+        write_json_records(self.path, (self._dump(record) for record in kept))
+        self.count = len(kept)
+
+    def flush(self):
+        """
+        保留中の結果をファイルに保存する
+        """
+        if not self.jsonl:
+            write_json_records(self.path, (self._dump(record) for record in self.records), pretty=self.pretty)
+        self.pending = 0
+
+    def close(self):
+        """
+        残りの結果を保存してファイルを閉じる
+        """
+        if self.jsonl:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self.superseded:
+                self._drop_superseded()
+                self.superseded = False
+        else:
+            self.flush()
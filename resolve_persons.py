@@ -0,0 +1,436 @@
+import argparse
+import os
+import re
+import unicodedata
+from collections import defaultdict
+
+from record_io import iter_json_records, write_json_records
+from edcs_index import EdcsIndex
+from edcs_fields import dating_range
+
+
+# 同じ人物とみなすスコアの下限（デフォルト）
+DEFAULT_THRESHOLD = 0.8
+
+# 少なくとも一方に年代がない組を同一人物とみなすスコアの下限（年代の重なりで確かめられないため、
+# Wikidata の QID の一致、または三名と正規化名の一致を求める）
+DEFAULT_UNDATED_THRESHOLD = 1.0
+
+# 年代範囲の許容幅（年）：範囲がこれ以上離れていれば別人とみなす
+DEFAULT_DATING_TOLERANCE = 25
+
+# ブロックの大きさの上限（年代のない人物同士の総当たりを避ける）
+DEFAULT_MAX_BLOCK_SIZE = 2000
+
+# スコアの重み（百分率の整数。小数の和の丸め誤差で閾値をわずかに下回らないようにする）
+WEIGHTS = {
+    'nomen': 35,
+    'cognomen': 35,
+    'praenomen': 15,
+    'normalized': 30,
+    'dating': 10,
+}
+
+# 同一人物として扱わない人物名
+_SKIP_NAMES = {'Unknown', 'Parse Error', 'Error', 'No Text'}
+
+# 表記ゆれのある個人名（praenomen）
+_PRAENOMEN_VARIANTS = {
+    'gaius': 'caius',
+    'gnaeus': 'cnaeus',
+    'cneus': 'cnaeus',
+    'gneus': 'cnaeus',
+}
+
+_QID_RE = re.compile(r'Q\d+')
+_NON_ALPHA_RE = re.compile(r'[^a-z ]+')
+
+
+def normalize_name_part(value):
+    """
+    人物名の要素（praenomen / nomen / cognomen）を比較用に正規化する
+
+    欠損（[---]、...）や記号を除き、ダイアクリティカルマークを外して小文字化し、
+    j→i、v→u に統一する。欠損を含む不完全な名前は空文字列を返す。
+    """
+    if not value or not isinstance(value, str):
+        return ''
+    if '[' in value or '...' in value or '?' in value:
+        return ''
+    text = unicodedata.normalize('NFKD', value)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = text.replace('j', 'i').replace('v', 'u')
+    text = _NON_ALPHA_RE.sub(' ', text)
+    return ' '.join(text.split())
+
+
+def wikidata_qid(link):
+    """
+    person_name_link からWikidataのQIDを取り出す（URL・QIDのどちらにも対応）
+    """
+    if not link or not isinstance(link, str):
+        return ''
+    match = _QID_RE.search(link)
+    return match.group(0) if match else ''
+
+
+def _iter_persons(item):
+    persons = item.get('persons', [])
+    if persons:
+        return persons
+    return [dict(person, person_id=idx) for idx, person in enumerate(item.get('main_persons', []))]
+
+
+def load_person_mentions(json_paths, source_path=None):
+    """
+    抽出結果から人物の言及を読み込む
+
+    Parameters:
+    -----------
+    json_paths : list
+        抽出結果ファイルのパスのリスト（JSON配列または .jsonl）
+    source_path : str, optional
+        元データのファイルパス（コンパクト形式の抽出結果で年代を参照するため）
+
+    Returns:
+    --------
+    list
+        人物の言及の辞書のリスト
+    """
+    source_index = EdcsIndex(source_path) if source_path else None
+    mentions = []
+    try:
+        for json_path in json_paths:
+            for item in iter_json_records(json_path):
+                edcs_id = item.get('edcs_id')
+                if not edcs_id:
+                    continue
+                row = item.get('original_data')
+                if not row and source_index is not None:
+                    row = source_index.get(edcs_id)
+                dating = dating_range(row)
+
+                for idx, person in enumerate(_iter_persons(item)):
+                    person_name = person.get('person_name', 'Unknown')
+                    if person_name in _SKIP_NAMES:
+                        continue
+                    praenomen = normalize_name_part(person.get('praenomen'))
+                    mentions.append({
+                        'edcs_id': edcs_id,
+                        'person_id': person.get('person_id', idx),
+                        'person_name': person_name,
+                        'label': person.get('person_name_normalized') or person.get('person_name_readable') or person_name,
+                        'praenomen': _PRAENOMEN_VARIANTS.get(praenomen, praenomen),
+                        'nomen': normalize_name_part(person.get('nomen')),
+                        'cognomen': normalize_name_part(person.get('cognomen')),
+                        'normalized': normalize_name_part(person.get('person_name_normalized')),
+                        'qid': wikidata_qid(person.get('person_name_link')),
+                        'gender': person.get('gender') if person.get('gender') in ('male', 'female') else '',
+                        'dating': dating,
+                    })
+    finally:
+        if source_index is not None:
+            source_index.close()
+    return mentions
+
+
+def blocking_keys(mention):
+    """
+    言及のブロッキングキーを返す
+
+    同じキーを持つ言及同士だけを比較するため、比較回数は全件の組み合わせではなく
+    ブロックの大きさの二乗の和に比例する。nomen + cognomen のブロックは praenomen の
+    ない言及と他の言及をつなぐためのもので、praenomen のある言及同士は比較しない。
+    """
+    keys = []
+    if mention['qid']:
+        keys.append(('qid', mention['qid']))
+    if mention['normalized']:
+        keys.append(('normalized', mention['normalized']))
+    if mention['nomen'] and mention['cognomen']:
+        if mention['praenomen']:
+            keys.append(('tria_nomina', mention['praenomen'], mention['nomen'], mention['cognomen']))
+        keys.append(('duo_nomina', mention['nomen'], mention['cognomen']))
+    return keys
+
+
+def score_pair(a, b, dating_tolerance=DEFAULT_DATING_TOLERANCE):
+    """
+    2つの言及が同一人物である度合いを0〜1で返す（矛盾がある場合は0）
+    """
+    if a['edcs_id'] == b['edcs_id']:
+        return 0.0
+    if a['qid'] and b['qid']:
+        return 1.0 if a['qid'] == b['qid'] else 0.0
+    if a['gender'] and b['gender'] and a['gender'] != b['gender']:
+        return 0.0
+
+    dating_overlap = False
+    if a['dating'] and b['dating']:
+        if a['dating'][0] > b['dating'][1] + dating_tolerance or b['dating'][0] > a['dating'][1] + dating_tolerance:
+            return 0.0
+        dating_overlap = True
+
+    score = 0
+    for part in ('praenomen', 'nomen', 'cognomen', 'normalized'):
+        if a[part] and b[part]:
+            if a[part] != b[part]:
+                return 0.0
+            score += WEIGHTS[part]
+    if dating_overlap:
+        score += WEIGHTS['dating']
+    return min(score, 100) / 100
+
+
+def _candidate_pairs(block, mentions, max_block_size, dating_tolerance, bridge=False):
+    """
+    ブロック内の比較対象の組を列挙する
+
+    年代の開始年で並べ、年代範囲が重なり得る組だけを比較する（ソート済み近傍法）。
+    年代のない言及はブロックが小さい場合のみ総当たりで比較する。
+    bridge=True の場合は、少なくとも一方の praenomen が空の組だけを返す。
+    """
+    dated = sorted((idx for idx in block if mentions[idx]['dating']),
+                   key=lambda idx: mentions[idx]['dating'][0])
+    undated = [idx for idx in block if not mentions[idx]['dating']]
+
+    for pos, i in enumerate(dated):
+        end = mentions[i]['dating'][1] + dating_tolerance
+        skip_full = bridge and mentions[i]['praenomen']
+        for j in dated[pos + 1:]:
+            if mentions[j]['dating'][0] > end:
+                break
+            if skip_full and mentions[j]['praenomen']:
+                continue
+            yield i, j
+
+    if len(block) <= max_block_size:
+        for pos, i in enumerate(undated):
+            skip_full = bridge and mentions[i]['praenomen']
+            for j in undated[pos + 1:] + dated:
+                if skip_full and mentions[j]['praenomen']:
+                    continue
+                yield i, j
+
+
+def _cluster_profile(mention):
+    """
+    クラスタの属性（碑文、praenomen、性別、QID、年代の窓）を1件の言及から作る
+
+    年代の窓は (開始年の最大値, 終了年の最小値) で、クラスタ内のすべての言及の
+    年代範囲と両立するかどうかを判定するのに使う。
+    """
+    return {
+        'ids': {mention['edcs_id']},
+        'praenomen': {mention['praenomen']} - {''},
+        'gender': {mention['gender']} - {''},
+        'qid': {mention['qid']} - {''},
+        'dating': tuple(mention['dating']) if mention['dating'] else None,
+    }
+
+
+def _profiles_conflict(a, b, dating_tolerance):
+    """
+    2つのクラスタが同じ碑文の言及を含むか、praenomen・性別・QID・年代の窓が矛盾するかどうか
+    """
+    if not a['ids'].isdisjoint(b['ids']):
+        return True
+    for key in ('praenomen', 'gender', 'qid'):
+        if a[key] and b[key] and a[key] != b[key]:
+            return True
+    if a['dating'] and b['dating']:
+        if a['dating'][0] > b['dating'][1] + dating_tolerance or b['dating'][0] > a['dating'][1] + dating_tolerance:
+            return True
+    return False
+
+
+def _merge_profiles(a, b):
+    a['ids'] |= b['ids']
+    for key in ('praenomen', 'gender', 'qid'):
+        a[key] |= b[key]
+    if a['dating'] and b['dating']:
+        a['dating'] = (max(a['dating'][0], b['dating'][0]), min(a['dating'][1], b['dating'][1]))
+    else:
+        a['dating'] = a['dating'] or b['dating']
+
+
+def resolve_persons(mentions, threshold=DEFAULT_THRESHOLD, dating_tolerance=DEFAULT_DATING_TOLERANCE,
+                    max_block_size=DEFAULT_MAX_BLOCK_SIZE, undated_threshold=DEFAULT_UNDATED_THRESHOLD):
+    """
+    人物の言及を同一人物ごとのクラスタにまとめる
+
+    ブロッキングキーごとに候補の組を作ってスコアを計算し、スコアの高い順に
+    Union-Findで結合する。少なくとも一方に年代がない組は undated_threshold 以上の
+    スコアを求める。同じ碑文の別人物が同じクラスタに入る結合と、praenomen・性別・
+    QID・年代の窓が矛盾するクラスタ同士の結合（praenomen のない言及を介した
+    C. Iulius Felix と M. Iulius Felix の連鎖など）は行わない。
+
+    Parameters:
+    -----------
+    mentions : list
+        load_person_mentions() の戻り値
+    threshold : float
+        同一人物とみなすスコアの下限
+    dating_tolerance : int
+        年代範囲の許容幅（年）
+    max_block_size : int
+        年代のない言及を総当たりで比較するブロックの大きさの上限
+    undated_threshold : float
+        少なくとも一方に年代がない組を同一人物とみなすスコアの下限
+
+    Returns:
+    --------
+    list
+        クラスタ（言及のインデックスのリスト）のリスト（2件以上のもののみ）
+    """
+    blocks = defaultdict(list)
+    for idx, mention in enumerate(mentions):
+        for key in blocking_keys(mention):
+            blocks[key].append(idx)
+
+    scored = {}
+    for key, block in blocks.items():
+        if len(block) < 2:
+            continue
+        bridge = key[0] == 'duo_nomina'
+        for i, j in _candidate_pairs(block, mentions, max_block_size, dating_tolerance, bridge):
+            pair = (i, j) if i < j else (j, i)
+            if pair in scored:
+                continue
+            score = score_pair(mentions[i], mentions[j], dating_tolerance)
+            dated = mentions[i]['dating'] and mentions[j]['dating']
+            if score >= (threshold if dated else max(threshold, undated_threshold)):
+                scored[pair] = score
+
+    parent = list(range(len(mentions)))
+    profiles = {}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for (i, j), score in sorted(scored.items(), key=lambda kv: kv[1], reverse=True):
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            continue
+        profile_i = profiles.get(root_i) or _cluster_profile(mentions[root_i])
+        profile_j = profiles.get(root_j) or _cluster_profile(mentions[root_j])
+        if _profiles_conflict(profile_i, profile_j, dating_tolerance):
+            continue
+        # 小さい方を大きい方に結合する
+        if len(profile_i['ids']) < len(profile_j['ids']):
+            root_i, root_j, profile_i, profile_j = root_j, root_i, profile_j, profile_i
+        parent[root_j] = root_i
+        _merge_profiles(profile_i, profile_j)
+        profiles[root_i] = profile_i
+        profiles.pop(root_j, None)
+
+    clusters = defaultdict(list)
+    for idx in range(len(mentions)):
+        clusters[find(idx)].append(idx)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def cluster_records(clusters, mentions):
+    """
+    クラスタを出力用の辞書のリストに変換する
+    """
+    records = []
+    for members in clusters:
+        members = sorted(members, key=lambda idx: (mentions[idx]['edcs_id'], str(mentions[idx]['person_id'])))
+        datings = [mentions[idx]['dating'] for idx in members if mentions[idx]['dating']]
+        qids = sorted({mentions[idx]['qid'] for idx in members if mentions[idx]['qid']})
+        canonical = mentions[members[0]]
+        records.append({
+            'cluster_id': f"{canonical['edcs_id']}_person_{canonical['person_id']}",
+            'label': canonical['label'],
+            'size': len(members),
+            'wikidata': qids,
+            'dating_from': min(d[0] for d in datings) if datings else None,
+            'dating_to': max(d[1] for d in datings) if datings else None,
+            'members': [{'edcs_id': mentions[idx]['edcs_id'],
+                         'person_id': mentions[idx]['person_id'],
+                         'person_name': mentions[idx]['person_name']} for idx in members],
+        })
+    records.sort(key=lambda record: (-record['size'], record['cluster_id']))
+    return records
+
+
+def create_same_as_graph(records):
+    """
+    クラスタから owl:sameAs のRDFグラフを作成する
+
+    クラスタ内の全ての組ではなく、代表の人物URIと各メンバーを結ぶ。
+    """
+    from rdflib import Graph, URIRef
+    from rdflib.namespace import OWL
+    from create_rdf import PERSON, bind_namespaces
+
+    g = Graph()
+    bind_namespaces(g)
+    g.bind('owl', OWL)
+    for record in records:
+        canonical_uri = PERSON[record['cluster_id']]
+        for member in record['members']:
+            member_uri = PERSON[f"{member['edcs_id']}_person_{member['person_id']}"]
+            if member_uri != canonical_uri:
+                g.add((member_uri, OWL.sameAs, canonical_uri))
+        for qid in record['wikidata']:
+            g.add((canonical_uri, OWL.sameAs, URIRef(f"http://www.wikidata.org/entity/{qid}")))
+    return g
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='碑文をまたいで同一人物をまとめ、owl:sameAs を出力')
+    parser.add_argument('inputs', nargs='+',
+                        help='抽出結果ファイルのパス（JSON配列または .jsonl、複数指定可）')
+    parser.add_argument('--source', '-s', type=str, default=None,
+                        help='元データ（filtered_data）のファイルパス（コンパクト形式の入力で年代を参照）')
+    parser.add_argument('--clusters', '-c', type=str, required=True,
+                        help='クラスタを保存するファイルのパス（.json または .jsonl）')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='owl:sameAs を保存するRDFファイルのパス')
+    parser.add_argument('--format', '-f', type=str, default='nt',
+                        choices=['turtle', 'xml', 'n3', 'nt', 'json-ld'],
+                        help='RDFのシリアライゼーション形式（デフォルト: nt）')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'同一人物とみなすスコアの下限（デフォルト: {DEFAULT_THRESHOLD}）')
+    parser.add_argument('--undated-threshold', type=float, default=DEFAULT_UNDATED_THRESHOLD,
+                        help=f'年代のない言及を含む組を同一人物とみなすスコアの下限（デフォルト: {DEFAULT_UNDATED_THRESHOLD}）')
+    parser.add_argument('--dating-tolerance', type=int, default=DEFAULT_DATING_TOLERANCE,
+                        help=f'年代範囲の許容幅（年、デフォルト: {DEFAULT_DATING_TOLERANCE}）')
+    parser.add_argument('--max-block-size', type=int, default=DEFAULT_MAX_BLOCK_SIZE,
+                        help=f'年代のない言及を総当たりで比較するブロックの上限（デフォルト: {DEFAULT_MAX_BLOCK_SIZE}）')
+
+    args = parser.parse_args()
+
+    print(f"人物の言及を読み込み中: {', '.join(args.inputs)}")
+    mentions = load_person_mentions(args.inputs, source_path=args.source)
+    print(f"読み込み完了: {len(mentions)}件")
+
+    clusters = resolve_persons(mentions, threshold=args.threshold,
+                               dating_tolerance=args.dating_tolerance,
+                               max_block_size=args.max_block_size,
+                               undated_threshold=args.undated_threshold)
+    records = cluster_records(clusters, mentions)
+    linked = sum(record['size'] for record in records)
+    print(f"同一人物のクラスタ: {len(records)}件（{linked}件の言及）")
+
+    clusters_dir = os.path.dirname(args.clusters)
+    if clusters_dir:
+        os.makedirs(clusters_dir, exist_ok=True)
+    write_json_records(args.clusters, records)
+    print(f"クラスタを保存: {args.clusters}")
+
+    if args.output:
+        g = create_same_as_graph(records)
+        output_dir = os.path.dirname(args.output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        g.serialize(destination=args.output, format=args.format)
+        print(f"owl:sameAs を保存: {args.output}（{len(g)}トリプル）")
+
+    for record in records[:10]:
+        print(f"  {record['label']}: {record['size']}件 {', '.join(m['edcs_id'] for m in record['members'][:5])}")
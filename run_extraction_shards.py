@@ -0,0 +1,263 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from tqdm import tqdm
+
+from extract_career_graph import process_inscriptions
+from record_io import iter_json_records, write_json_records
+
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def collect_input_files(input_path):
+    """
+    入力パス（ディレクトリまたは単一ファイル）からfiltered_dataのJSONファイルを集める
+    """
+    if os.path.isdir(input_path):
+        files = sorted(glob.glob(os.path.join(input_path, '**', '*.json'), recursive=True) +
+                       glob.glob(os.path.join(input_path, '**', '*.jsonl'), recursive=True))
+        return [f for f in files if not f.endswith(('_career.json', '_career.jsonl'))]
+    return [input_path]
+
+
+def save_manifest(manifest_path, manifest):
+    """
+    マニフェストを保存する（一時ファイル経由で置き換え）
+    """
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _write_shard(chunk, input_file, offset, index, shard_dir, output_dir):
+    """
+    1シャード分の碑文を書き出し、マニフェスト用のシャード情報を返す
+    """
+    shard_id = f"shard_{index:05d}"
+    shard_input = os.path.join(shard_dir, f"{shard_id}.json")
+    with open(shard_input, 'w', encoding='utf-8') as f:
+        json.dump(chunk, f, ensure_ascii=False)
+    return {
+        'shard_id': shard_id,
+        'source': input_file,
+        'offset': offset,
+        'count': len(chunk),
+        'input': shard_input,
+        # 1件ごとに追記できるよう、シャードの出力はJSON Linesにする
+        'output': os.path.join(output_dir, f"{shard_id}_career.jsonl"),
+        'status': 'pending',
+        'errors': 0,
+        'completed_at': None
+    }
+
+
+def create_shards(input_files, work_dir, shard_size):
+    """
+    入力ファイルをシャードに分割し、シャード情報のリストを返す
+
+    シャードは入力ファイルをまたがないため、出力を地名ごとに戻しやすい
+    """
+    shard_dir = os.path.join(work_dir, 'shards')
+    output_dir = os.path.join(work_dir, 'career')
+    os.makedirs(shard_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    shards = []
+    for input_file in input_files:
+        # 巨大なエクスポートでも全体を読み込まず、shard_size件ずつ書き出す
+        chunk = []
+        offset = 0
+        for item in iter_json_records(input_file):
+            chunk.append(item)
+            if len(chunk) == shard_size:
+                shards.append(_write_shard(chunk, input_file, offset, len(shards), shard_dir, output_dir))
+                offset += len(chunk)
+                chunk = []
+        if chunk:
+            shards.append(_write_shard(chunk, input_file, offset, len(shards), shard_dir, output_dir))
+            offset += len(chunk)
+        print(f"  {input_file}: {offset}件")
+
+    return shards
+
+
+def merge_shard_outputs(shards, output_path):
+    """
+    全シャードの抽出結果を1つのキャリアJSONにまとめる
+    """
+    results = []
+    for shard in shards:
+        if os.path.exists(shard['output']):
+            results.extend(iter_json_records(shard['output']))
+    write_json_records(output_path, results)
+    return len(results)
+
+
+def run_shards(input_path, work_dir, model_type='claude', api_key=None, shard_size=200,
+               concurrency=4, dedup=False, compact=False, merge_output=None, stream=False,
+               cascade=False, reextract_stale=False):
+    """
+    シャード単位で碑文を並列に抽出する（中断後の再開に対応）
+
+    各シャードの結果はJSON Linesに1件ごとに追記されるため、強制終了後に再実行しても
+    処理済みの碑文が再度LLMに送られることはない。完了状況はマニフェストに記録する。
+
+    Parameters:
+    -----------
+    input_path : str
+        filtered_dataのディレクトリ、または単一の入力JSONファイルのパス
+    work_dir : str
+        シャード・抽出結果・マニフェストを置く作業ディレクトリ
+    model_type : str
+        使用するモデル ('claude', 'gemini', 'gpt')
+    api_key : str, optional
+        APIキー（指定しない場合は環境変数から取得）
+    shard_size : int
+        1シャードあたりの碑文数
+    concurrency : int
+        同時に実行するシャード数（＝同時に行うLLM呼び出しの上限）
+    dedup : bool
+        シャード内で重複テキストをまとめて抽出するかどうか
+    compact : bool
+        元データと旧形式の重複フィールドを出力しないかどうか
+    merge_output : str, optional
+        全シャード完了後に結果をまとめて保存するパス
+    stream : bool
+        LLMをストリーミングで呼び出し、JSONが閉じた時点で生成を打ち切るかどうか
+    cascade : bool
+        小さなモデルで抽出し、検査で問題のある碑文のみ上位モデルで抽出し直すかどうか
+    reextract_stale : bool
+        プロンプトの関係する節が変更された処理済みの結果も抽出し直すかどうか
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    manifest_path = os.path.join(work_dir, MANIFEST_NAME)
+
+    if os.path.exists(manifest_path):
+        # シャード境界を変えないよう、既存のマニフェストをそのまま使う
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        print(f"既存のマニフェストから再開: {manifest_path}")
+        if manifest.get('model') != model_type:
+            print(f"警告: マニフェストのモデル ({manifest.get('model')}) と指定モデル ({model_type}) が異なります")
+    else:
+        input_files = collect_input_files(input_path)
+        print(f"シャードを作成中: {len(input_files)}ファイル")
+        manifest = {
+            'input': input_path,
+            'model': model_type,
+            'shard_size': shard_size,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'shards': create_shards(input_files, work_dir, shard_size)
+        }
+        save_manifest(manifest_path, manifest)
+
+    shards = manifest['shards']
+    pending = [shard for shard in shards if shard['status'] != 'done']
+    total = sum(shard['count'] for shard in shards)
+    done_count = total - sum(shard['count'] for shard in pending)
+    print(f"シャード数: {len(shards)}（未完了: {len(pending)}）")
+    print(f"碑文数: {total}件（完了済みシャード分: {done_count}件）")
+
+    manifest_lock = threading.Lock()
+    log_path = os.path.join(work_dir, 'extraction.log')
+    progress = tqdm(total=total, initial=done_count, desc="Processing shards")
+
+    def run_one(shard):
+        stats = process_inscriptions(
+            shard['input'],
+            shard['output'],
+            model_type=model_type,
+            api_key=api_key,
+            limit=None,
+            dedup=dedup,
+            compact=compact,
+            checkpoint_interval=1,
+            show_progress=False,
+            progress_callback=progress.update,
+            stream=stream,
+            cascade=cascade,
+            reextract_stale=reextract_stale
+        )
+        with manifest_lock:
+            shard['errors'] = stats['errors']
+            # エラーが残ったシャードは次回の実行で失敗分のみ再処理する
+            shard['status'] = 'done' if stats['errors'] == 0 else 'incomplete'
+            shard['completed_at'] = datetime.now().isoformat(timespec='seconds')
+            save_manifest(manifest_path, manifest)
+        return shard
+
+    # 各シャードの詳細ログはファイルに出力し、画面には全体の進捗のみを表示する
+    with open(log_path, 'a', encoding='utf-8') as log_file, contextlib.redirect_stdout(log_file):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(run_one, shard) for shard in pending]
+            for future in as_completed(futures):
+                future.result()
+    progress.close()
+
+    incomplete = [shard for shard in shards if shard['status'] != 'done']
+    print("\n" + "=" * 80)
+    print("シャード処理完了")
+    print(f"完了シャード: {len(shards) - len(incomplete)}/{len(shards)}")
+    print(f"エラーが残ったシャード: {len(incomplete)}")
+    print(f"詳細ログ: {log_path}")
+    print(f"マニフェスト: {manifest_path}")
+
+    if merge_output and not incomplete:
+        merged = merge_shard_outputs(shards, merge_output)
+        print(f"結果を統合: {merge_output}（{merged}件）")
+
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='シャード分割による碑文の一括抽出（再開可能）')
+    parser.add_argument('--input', '-i', type=str, required=True,
+                        help='filtered_dataのディレクトリ、または入力JSONファイルのパス')
+    parser.add_argument('--work-dir', '-w', type=str, required=True,
+                        help='シャード・抽出結果・マニフェストを置く作業ディレクトリ')
+    parser.add_argument('--model', '-m', type=str, default='claude',
+                        choices=['claude', 'gemini', 'gpt'],
+                        help='使用するモデル (claude, gemini, gpt)')
+    parser.add_argument('--api-key', '-k', type=str, default=None,
+                        help='APIキー（指定しない場合は環境変数から取得）')
+    parser.add_argument('--shard-size', '-s', type=int, default=200,
+                        help='1シャードあたりの碑文数（デフォルト: 200）')
+    parser.add_argument('--concurrency', '-c', type=int, default=4,
+                        help='同時に実行するシャード数（デフォルト: 4）')
+    parser.add_argument('--dedup', action='store_true',
+                        help='シャード内で同一テキストの碑文を1回だけ抽出する')
+    parser.add_argument('--compact', action='store_true',
+                        help='元データと旧形式の重複フィールドを出力しない')
+    parser.add_argument('--stream', action='store_true',
+                        help='ストリーミングで呼び出し、JSONが閉じた時点・出力が上限を超えた時点で生成を打ち切る')
+    parser.add_argument('--cascade', action='store_true',
+                        help='小さなモデルで抽出し、検査で問題のある碑文のみ上位モデルで抽出し直す')
+    parser.add_argument('--reextract-stale', action='store_true',
+                        help='プロンプトの関係する節が変更された処理済みの結果も抽出し直す')
+    parser.add_argument('--merge-output', type=str, default=None,
+                        help='全シャード完了後に結果を統合して保存するパス')
+
+    args = parser.parse_args()
+
+    run_shards(
+        args.input,
+        args.work_dir,
+        model_type=args.model,
+        api_key=args.api_key,
+        shard_size=args.shard_size,
+        concurrency=args.concurrency,
+        dedup=args.dedup,
+        compact=args.compact,
+        merge_output=args.merge_output,
+        stream=args.stream,
+        cascade=args.cascade,
+        reextract_stale=args.reextract_stale
+    )
@@ -0,0 +1,344 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+
+from edcs_fields import dating_range
+from edcs_index import record_key
+from leiden import normalize_inscription_text
+from record_io import is_compressed_path, is_jsonl_path, iter_json_records
+
+
+DEFAULT_INDEX_PATH = 'search_index.sqlite'
+
+# 検索できるフィールド（FTS5の列名）
+SEARCH_FIELDS = ('inscription', 'abbreviated', 'cleaning', 'evidence')
+
+# 抽出結果のうち索引に加える根拠のフィールド（要素のリスト, フィールド名）
+EVIDENCE_FIELDS = (
+    ('persons', 'social_status_evidence'),
+    ('benefactions', 'benefaction_text'),
+    ('person_relationships', 'property_text'),
+)
+
+# 展開（丸括弧）の中身。除去すると碑文に刻まれた略記の形が残る（aed(ilis) → aed）
+_EXPANSION_RE = re.compile(r'\([^)]*\)')
+# 検索語の区切り（"..." で囲んだ句、または空白区切りの語）
+_QUERY_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def abbreviated_text(text):
+    """
+    Leiden記法の展開を除き、碑文に刻まれた略記の形で正規化したテキストを返す
+    """
+    if not text:
+        return ''
+    return normalize_inscription_text(_EXPANSION_RE.sub('', text.replace('(?)', '')))
+
+
+def evidence_text(result):
+    """
+    抽出結果から根拠のテキスト（社会的地位の根拠、恵与の文言、関係の文言）を集める
+    """
+    texts = []
+    for person in result.get('persons') or []:
+        texts.append(person.get('social_status_evidence'))
+        for benefaction in person.get('benefactions') or []:
+            texts.append(benefaction.get('benefaction_text'))
+    for relationship in result.get('person_relationships') or []:
+        texts.append(relationship.get('property_text'))
+    return ' / '.join(text for text in texts if text)
+
+
+def build_match_query(query, prefix=False):
+    """
+    検索語を索引と同じ正規化にかけ、FTS5のMATCH式に変換する
+
+    空白区切りの語はすべてを含む碑文（AND）、"..." で囲んだ語は句として検索する。
+    末尾の * は前方一致（prefix=True の場合はすべての語を前方一致）。
+
+    Parameters:
+    -----------
+    query : str
+        検索語（Leiden記法のままでもよい。例: 'aed(ilis) "flamen perpetuus"'）
+    prefix : bool
+        すべての語を前方一致で検索する
+
+    Returns:
+    --------
+    str or None
+        MATCH式（有効な語がない場合は None）
+    """
+    terms = []
+    for phrase, word in _QUERY_TERM_RE.findall(query or ''):
+        text = phrase or word
+        starred = prefix or text.endswith('*')
+        normalized = normalize_inscription_text(text.rstrip('*'))
+        if not normalized:
+            continue
+        if phrase:
+            terms.append(f'"{normalized}"' + (' *' if starred else ''))
+        else:
+            # 正規化で複数の語に分かれた場合（aed(ilis)[que] など）はそれぞれを条件にする
+            words = normalized.split()
+            terms.extend(f'"{w}"' for w in words[:-1])
+            terms.append(f'"{words[-1]}"' + (' *' if starred else ''))
+    return ' '.join(terms) or None
+
+
+class SearchIndex:
+    """
+    碑文テキストと抽出結果の根拠に対する全文検索インデックス（SQLite FTS5）
+
+    FTS5の列は inscription（補読・展開を含めて正規化した本文）、abbreviated（展開を
+    除いた略記の形）、cleaning（inscription_interpretive_cleaning）、evidence（抽出結果の
+    根拠）の4つ。括弧・欠損記号・i/j, u/v の揺れは leiden.normalize_inscription_text で
+    索引前に吸収し、検索語にも同じ正規化をかけるので、'aedilis' でも 'aed' でも
+    'aed(ilis)' でも一致する。
+
+    province・place・年代は通常の表に持ち、B-treeインデックスで絞り込む。取り込んだ
+    ファイルのサイズと更新時刻を記録し、変わっていないファイルは読み飛ばす。JSON Lines
+    への追記は追記分のみを、それ以外の変更はそのファイルのレコードを取り込み直す。
+
+    使用例:
+        with SearchIndex('search_index.sqlite') as index:
+            index.add_file('filtered_data/Uthina/xxx.json')
+            hits = index.search('flamen perpetuus', province='Africa proconsularis', dating=(100, 200))
+    """
+
+    def __init__(self, index_path=DEFAULT_INDEX_PATH):
+        self.index_path = index_path
+        self._conn = sqlite3.connect(index_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents (rowid INTEGER PRIMARY KEY, edcs_id TEXT UNIQUE, "
+            "province TEXT, place TEXT, dating_from INTEGER, dating_to INTEGER, "
+            "inscription TEXT, cleaning TEXT, evidence TEXT)")
+        self._conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS texts USING fts5({', '.join(SEARCH_FIELDS)}, "
+            "tokenize = 'unicode61 remove_diacritics 2')")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_province ON documents (province)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_place ON documents (place)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_dating ON documents (dating_from, dating_to)")
+
+    def _source_state(self, path):
+        row = self._conn.execute("SELECT size, mtime_ns FROM sources WHERE path = ?", (path,)).fetchone()
+        return row if row else (-1, -1)
+
+    def add_file(self, path, rebuild=False):
+        """
+        filtered_data または抽出結果のファイルを索引に取り込む（変わっていなければ何もしない）
+
+        Returns:
+        --------
+        int
+            取り込んだレコード数
+        """
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        size, mtime = stat.st_size, stat.st_mtime_ns
+        indexed_size, indexed_mtime = self._source_state(key)
+        if not rebuild and indexed_size == size and indexed_mtime == mtime:
+            return 0
+
+        if (not rebuild and not is_compressed_path(path) and is_jsonl_path(path)
+                and 0 < indexed_size < size and self._ends_line_at(path, indexed_size)):
+            # JSON Linesへの追記分のみを取り込む
+            records = self._iter_tail(path, indexed_size)
+        else:
+            records = iter_json_records(path)
+
+        count = 0
+        for record in records:
+            if self.add_record(record):
+                count += 1
+        self._conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (key, size, mtime))
+        self._conn.commit()
+        return count
+
+    @staticmethod
+    def _ends_line_at(path, offset):
+        with open(path, 'rb') as f:
+            f.seek(offset - 1)
+            return f.read(1) == b'\n'
+
+    @staticmethod
+    def _iter_tail(path, start):
+        with open(path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def add_record(self, record):
+        """
+        1件のレコードを索引に加える（同じEDCS-IDの既存の内容と統合する）
+
+        filtered_data のレコードは本文と province・place・年代を、抽出結果は根拠のテキストを
+        （旧形式で original_data を持つ場合は本文なども）更新する。
+        """
+        edcs_id = record_key(record)
+        if not edcs_id:
+            return False
+        row = record.get('original_data') or (None if 'persons' in record else record)
+        existing = self._conn.execute(
+            "SELECT rowid, province, place, dating_from, dating_to, inscription, cleaning, evidence "
+            "FROM documents WHERE edcs_id = ?", (edcs_id,)).fetchone()
+        rowid, province, place, dating_from, dating_to, inscription, cleaning, evidence = (
+            existing or (None, None, None, None, None, '', '', ''))
+
+        if row is not None:
+            dating = dating_range(row)
+            province = row.get('province') or province
+            place = row.get('place') or place
+            if dating:
+                dating_from, dating_to = dating
+            inscription = row.get('inscription') or inscription
+            cleaning = row.get('inscription_interpretive_cleaning') or cleaning
+        if 'persons' in record:
+            evidence = evidence_text(record)
+
+        if rowid is not None:
+            self._conn.execute("DELETE FROM texts WHERE rowid = ?", (rowid,))
+        cursor = self._conn.execute(
+            "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (rowid, edcs_id, province, place, dating_from, dating_to, inscription, cleaning, evidence))
+        self._conn.execute(
+            "INSERT INTO texts (rowid, inscription, abbreviated, cleaning, evidence) VALUES (?, ?, ?, ?, ?)",
+            (cursor.lastrowid, normalize_inscription_text(inscription), abbreviated_text(inscription),
+             normalize_inscription_text(cleaning), normalize_inscription_text(evidence)))
+        return True
+
+    def search(self, query, province=None, place=None, dating=None, fields=None, prefix=False, limit=20):
+        """
+        全文検索する
+
+        Parameters:
+        -----------
+        query : str
+            検索語（build_match_query を参照）
+        province : str, optional
+            属州（完全一致）
+        place : str, optional
+            地名（部分一致。'Uthina' で 'Oudna, Hr. / Udhnah / Uthina' に一致する）
+        dating : tuple, optional
+            (年代下限, 年代上限)。この範囲と年代が重なる碑文に絞り込む
+        fields : list, optional
+            検索するフィールド（SEARCH_FIELDS の一部。指定しない場合はすべて）
+        prefix : bool
+            すべての語を前方一致で検索する
+        limit : int
+            返す件数の上限
+
+        Returns:
+        --------
+        list
+            一致した碑文（edcs_id, province, place, dating_from, dating_to, inscription, snippet）の
+            辞書のリスト（関連度順）
+        """
+        match = build_match_query(query, prefix=prefix)
+        if match is None:
+            return []
+        if fields:
+            unknown = set(fields) - set(SEARCH_FIELDS)
+            if unknown:
+                raise ValueError(f"検索できないフィールドです: {', '.join(sorted(unknown))}")
+            match = f"{{{' '.join(fields)}}} : ({match})"
+
+        conditions = ["texts MATCH ?"]
+        params = [match]
+        if province:
+            conditions.append("d.province = ?")
+            params.append(province)
+        if place:
+            conditions.append("d.place LIKE ?")
+            params.append(f"%{place}%")
+        if dating:
+            conditions.append("d.dating_from <= ? AND d.dating_to >= ?")
+            params.extend([dating[1], dating[0]])
+        params.append(limit)
+
+        rows = self._conn.execute(
+            "SELECT d.edcs_id, d.province, d.place, d.dating_from, d.dating_to, d.inscription, "
+            "snippet(texts, -1, '[', ']', '…', 12) "
+            "FROM texts JOIN documents d ON d.rowid = texts.rowid "
+            f"WHERE {' AND '.join(conditions)} ORDER BY rank LIMIT ?", params)
+        keys = ('edcs_id', 'province', 'place', 'dating_from', 'dating_to', 'inscription', 'snippet')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def optimize(self):
+        """
+        FTS5の索引のセグメントを統合する（大量に取り込んだ後に実行すると検索が速くなる）
+        """
+        self._conn.execute("INSERT INTO texts (texts) VALUES ('optimize')")
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='碑文テキストと抽出結果の根拠の全文検索インデックス')
+    parser.add_argument('--index', '-x', type=str, default=DEFAULT_INDEX_PATH,
+                        help=f'インデックスファイルのパス（デフォルト: {DEFAULT_INDEX_PATH}）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='ファイルを取り込む（変更のないファイルは読み飛ばす）')
+    build_parser.add_argument('paths', nargs='+',
+                              help='filtered_data または抽出結果のファイル、またはそれらを含むディレクトリ')
+    build_parser.add_argument('--rebuild', action='store_true', help='変更の有無にかかわらず取り込み直す')
+
+    search_parser = subparsers.add_parser('search', help='全文検索する')
+    search_parser.add_argument('query', help='検索語（"..." で句検索、末尾の * で前方一致）')
+    search_parser.add_argument('--province', type=str, default=None, help='属州で絞り込む')
+    search_parser.add_argument('--place', type=str, default=None, help='地名（部分一致）で絞り込む')
+    search_parser.add_argument('--dating', type=int, nargs=2, default=None, metavar=('FROM', 'TO'),
+                               help='年代の範囲と重なる碑文に絞り込む')
+    search_parser.add_argument('--fields', type=str, nargs='+', default=None, choices=list(SEARCH_FIELDS),
+                               help='検索するフィールド（指定しない場合はすべて）')
+    search_parser.add_argument('--prefix', action='store_true', help='すべての語を前方一致で検索する')
+    search_parser.add_argument('--limit', '-l', type=int, default=20, help='表示する件数（デフォルト: 20）')
+
+    args = parser.parse_args()
+
+    with SearchIndex(args.index) as index:
+        if args.command == 'build':
+            paths = []
+            for path in args.paths:
+                if os.path.isdir(path):
+                    for root, _, files in os.walk(path):
+                        paths.extend(os.path.join(root, name) for name in sorted(files)
+                                     if re.search(r'\.jsonl?(\.gz|\.zst)?$', name))
+                else:
+                    paths.append(path)
+            total = 0
+            for path in paths:
+                count = index.add_file(path, rebuild=args.rebuild)
+                total += count
+                if count:
+                    print(f"{path}: {count}件")
+            if total:
+                index.optimize()
+            print(f"取り込んだレコード: {total}件、索引の碑文数: {len(index)}件 → {args.index}")
+        else:
+            start = time.perf_counter()
+            hits = index.search(args.query, province=args.province, place=args.place, dating=args.dating,
+                                fields=args.fields, prefix=args.prefix, limit=args.limit)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            for hit in hits:
+                dating = '' if hit['dating_from'] is None else f" {hit['dating_from']}–{hit['dating_to']}"
+                print(f"{hit['edcs_id']}  {hit['place'] or ''}{dating}")
+                print(f"    {hit['snippet']}")
+            print(f"{len(hits)}件（{elapsed_ms:.1f} ms）")
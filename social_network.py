@@ -0,0 +1,438 @@
+import argparse
+import os
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from record_io import iter_json_records
+
+
+_SKIP_NAMES = {'Parse Error', 'Error', 'No Text'}
+
+
+class SocialNetwork:
+    """
+    人物・コミュニティを整数の節点、関係を辺とするネットワーク
+
+    節点の属性は nodes（pandas.DataFrame）、辺は整数配列で保持し、グラフアルゴリズム用に
+    無向のCSR形式の隣接構造（indptr / indices / edge_ids）を持つ。節点のキーは
+    create_rdf.py のURIのローカル名（例: EDCS-xxx_person_0、EDCS-xxx_community_0）と同じ。
+
+    Attributes:
+    -----------
+    nodes : pandas.DataFrame
+        node_id, key, kind（person / community）, label, edcs_id, category, mentions
+    sources, targets : numpy.ndarray
+        辺の始点・終点の節点番号（int32）
+    edge_types, edge_properties : numpy.ndarray
+        辺の種類（family / patronage / affiliation など）と詳細のコード（int32）
+    edge_type_vocab, edge_property_vocab : list
+        コードに対応する文字列
+    edge_edcs_ids : list
+        辺の根拠となる碑文のEDCS-ID
+    indptr, indices, edge_ids : numpy.ndarray
+        無向の隣接構造（indices[indptr[i]:indptr[i + 1]] が節点 i の隣接節点）
+    """
+
+    def __init__(self, nodes, sources, targets, edge_types, edge_properties,
+                 edge_type_vocab, edge_property_vocab, edge_edcs_ids):
+        self.nodes = nodes
+        self.sources = sources
+        self.targets = targets
+        self.edge_types = edge_types
+        self.edge_properties = edge_properties
+        self.edge_type_vocab = edge_type_vocab
+        self.edge_property_vocab = edge_property_vocab
+        self.edge_edcs_ids = edge_edcs_ids
+        self._key_to_node = {key: idx for idx, key in enumerate(nodes['key'])}
+        self._build_adjacency()
+
+    def _build_adjacency(self):
+        node_count = len(self.nodes)
+        edge_count = len(self.sources)
+        heads = np.concatenate([self.sources, self.targets]).astype(np.int64)
+        tails = np.concatenate([self.targets, self.sources]).astype(np.int32)
+        edge_ids = np.concatenate([np.arange(edge_count), np.arange(edge_count)]).astype(np.int32)
+        order = np.argsort(heads, kind='stable')
+        self.indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(heads, minlength=node_count), out=self.indptr[1:])
+        self.indices = tails[order]
+        self.edge_ids = edge_ids[order]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node_id(self, key):
+        """
+        節点のキーから節点番号を返す
+        """
+        return self._key_to_node[key]
+
+    def neighbors(self, node):
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def adjacency_matrix(self):
+        """
+        無向の隣接行列を scipy.sparse の CSR 行列で返す（値は辺の本数）
+        """
+        from scipy.sparse import csr_matrix
+
+        return csr_matrix((np.ones(len(self.indices), dtype=np.int32), self.indices, self.indptr),
+                          shape=(len(self), len(self)))
+
+    def degree(self):
+        """
+        各節点の次数（自己ループは2と数える）
+        """
+        return np.diff(self.indptr)
+
+    def pagerank(self, damping=0.85, max_iter=100, tol=1e-10):
+        """
+        無向グラフとしてのPageRank（べき乗法）
+        """
+        node_count = len(self)
+        if node_count == 0:
+            return np.empty(0)
+        degree = self.degree().astype(np.float64)
+        heads = np.repeat(np.arange(node_count), np.diff(self.indptr))
+        rank = np.full(node_count, 1.0 / node_count)
+        dangling = degree == 0
+        for _ in range(max_iter):
+            share = np.divide(rank, degree, out=np.zeros(node_count), where=~dangling)
+            incoming = np.bincount(self.indices, weights=share[heads], minlength=node_count)
+            updated = (1 - damping) / node_count + damping * (incoming + rank[dangling].sum() / node_count)
+            if np.abs(updated - rank).sum() < tol:
+                rank = updated
+                break
+            rank = updated
+        return rank
+
+    def components(self):
+        """
+        連結成分のラベル（節点ごと）と成分数を返す
+        """
+        from scipy.sparse.csgraph import connected_components
+
+        count, labels = connected_components(self.adjacency_matrix(), directed=False)
+        return labels, count
+
+    def ego_network(self, node, radius=1):
+        """
+        節点から radius ステップ以内の節点と、それらの間の辺を返す
+
+        Returns:
+        --------
+        numpy.ndarray
+            節点番号（中心からの距離順）
+        numpy.ndarray
+            辺の番号
+        """
+        distance = np.full(len(self), -1, dtype=np.int32)
+        distance[node] = 0
+        frontier = np.array([node], dtype=np.int64)
+        for step in range(1, radius + 1):
+            if len(frontier) == 0:
+                break
+            starts = self.indptr[frontier]
+            ends = self.indptr[frontier + 1]
+            reached = np.concatenate([self.indices[s:e] for s, e in zip(starts, ends)])
+            reached = np.unique(reached[distance[reached] < 0])
+            distance[reached] = step
+            frontier = reached
+        members = np.flatnonzero(distance >= 0)
+        members = members[np.argsort(distance[members], kind='stable')]
+        inside = (distance[self.sources] >= 0) & (distance[self.targets] >= 0)
+        return members, np.flatnonzero(inside)
+
+    def edges_table(self):
+        """
+        辺の一覧を pandas.DataFrame で返す
+        """
+        keys = self.nodes['key'].to_numpy()
+        return pd.DataFrame({
+            'source': self.sources,
+            'target': self.targets,
+            'source_key': keys[self.sources],
+            'target_key': keys[self.targets],
+            'type': np.asarray(self.edge_type_vocab, dtype=object)[self.edge_types],
+            'property': np.asarray(self.edge_property_vocab, dtype=object)[self.edge_properties],
+            'edcs_id': self.edge_edcs_ids,
+        })
+
+    def metrics_table(self):
+        """
+        節点の一覧に次数・PageRank・連結成分を加えた pandas.DataFrame を返す
+        """
+        labels, _ = self.components()
+        sizes = np.bincount(labels)
+        table = self.nodes.copy()
+        table['degree'] = self.degree()
+        table['pagerank'] = self.pagerank()
+        table['component'] = labels
+        table['component_size'] = sizes[labels]
+        return table
+
+
+class _Vocabulary:
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+def load_person_clusters(clusters_path):
+    """
+    resolve_persons.py のクラスタから 人物キー → クラスタの代表キー の対応を作る
+    """
+    mapping = {}
+    for record in iter_json_records(clusters_path):
+        for member in record['members']:
+            mapping[f"{member['edcs_id']}_person_{member['person_id']}"] = record['cluster_id']
+    return mapping
+
+
+def build_social_network(json_paths, person_clusters=None, merge_communities=False):
+    """
+    抽出結果から人物・コミュニティ・関係のネットワークを作成する
+
+    Parameters:
+    -----------
+    json_paths : list
+        抽出結果ファイルのパスのリスト（JSON配列または .jsonl）
+    person_clusters : dict, optional
+        人物キー → 同一人物のクラスタの代表キー（load_person_clusters() の戻り値）。
+        指定した場合は碑文をまたいで同一人物の節点をまとめる
+    merge_communities : bool
+        community_name_normalized が同じコミュニティを碑文をまたいで1つの節点にまとめるかどうか
+
+    Returns:
+    --------
+    SocialNetwork
+        ネットワーク
+    """
+    person_clusters = person_clusters or {}
+    node_index = {}
+    node_rows = []
+    sources = []
+    targets = []
+    edge_types = []
+    edge_properties = []
+    edge_edcs_ids = []
+    type_vocab = _Vocabulary()
+    property_vocab = _Vocabulary()
+
+    def add_node(key, kind, label, edcs_id, category):
+        idx = node_index.get(key)
+        if idx is None:
+            idx = len(node_rows)
+            node_index[key] = idx
+            node_rows.append([idx, key, kind, label, edcs_id, category, 0])
+        node_rows[idx][6] += 1
+        return idx
+
+    for json_path in json_paths:
+        for item in iter_json_records(json_path):
+            edcs_id = item.get('edcs_id')
+            if not edcs_id:
+                continue
+
+            persons = item.get('persons', [])
+            if not persons:
+                persons = [dict(person, person_id=idx) for idx, person in enumerate(item.get('main_persons', []))]
+            person_nodes = {}
+            for person in persons:
+                person_name = person.get('person_name', 'Unknown')
+                if person_name in _SKIP_NAMES:
+                    continue
+                person_id = person.get('person_id', 0)
+                key = f"{edcs_id}_person_{person_id}"
+                person_nodes[person_id] = add_node(
+                    person_clusters.get(key, key), 'person',
+                    person.get('person_name_normalized') or person.get('person_name_readable') or person_name,
+                    edcs_id, person.get('social_status') or '')
+
+            community_nodes = {}
+            for community in item.get('communities', []):
+                community_id = community.get('community_id', 0)
+                name = community.get('community_name_normalized') or community.get('community_name') or ''
+                key = f"{edcs_id}_community_{community_id}"
+                if merge_communities and name:
+                    key = f"community_{name}"
+                community_nodes[community_id] = add_node(
+                    key, 'community', name, edcs_id, community.get('community_type') or '')
+
+            relationships = item.get('person_relationships', item.get('relationships', []))
+            for idx, rel_item in enumerate(relationships, 1):
+                source_person_id = rel_item.get('source_person_id')
+                target_person_id = rel_item.get('target_person_id')
+                target_community_id = rel_item.get('target_community_id')
+                if source_person_id is None:
+                    source_person_id = rel_item.get('source_person_index', 0)
+                if target_person_id is None:
+                    target_person_id = rel_item.get('target_person_index')
+
+                source = person_nodes.get(source_person_id)
+                if source is None:
+                    continue
+                if target_community_id is not None:
+                    target = community_nodes.get(target_community_id)
+                elif target_person_id is not None:
+                    target = person_nodes.get(target_person_id)
+                else:
+                    # 旧形式：関係の相手が人物リストにない場合は create_rdf.py と同じキーで節点を作る
+                    target_name = rel_item.get('target_person_name', rel_item.get('person_name', ''))
+                    if not target_name:
+                        continue
+                    target = add_node(f"{edcs_id}_rel_{idx}", 'person', target_name, edcs_id,
+                                      rel_item.get('social_status') or '')
+                if target is None:
+                    continue
+
+                sources.append(source)
+                targets.append(target)
+                edge_types.append(type_vocab.code(rel_item.get('type') or ''))
+                edge_properties.append(property_vocab.code(rel_item.get('property') or ''))
+                edge_edcs_ids.append(edcs_id)
+
+    nodes = pd.DataFrame(node_rows, columns=['node_id', 'key', 'kind', 'label', 'edcs_id', 'category', 'mentions'])
+    return SocialNetwork(
+        nodes=nodes,
+        sources=np.asarray(sources, dtype=np.int32),
+        targets=np.asarray(targets, dtype=np.int32),
+        edge_types=np.asarray(edge_types, dtype=np.int32),
+        edge_properties=np.asarray(edge_properties, dtype=np.int32),
+        edge_type_vocab=type_vocab.values,
+        edge_property_vocab=property_vocab.values,
+        edge_edcs_ids=edge_edcs_ids,
+    )
+
+
+def write_graphml(network, path, node_table=None, edge_ids=None, node_ids=None):
+    """
+    ネットワークをGraphML形式で保存する（Gephi・Cytoscape・networkx などで読み込める）
+
+    node_ids / edge_ids を指定した場合はその部分グラフのみを保存する。
+    """
+    node_table = network.nodes if node_table is None else node_table
+    if node_ids is not None:
+        node_table = node_table.iloc[node_ids]
+    edge_ids = np.arange(len(network.sources)) if edge_ids is None else edge_ids
+
+    node_attributes = [column for column in node_table.columns if column != 'node_id']
+    attribute_types = {column: ('double' if node_table[column].dtype.kind == 'f'
+                                else 'long' if node_table[column].dtype.kind in 'iu'
+                                else 'string') for column in node_attributes}
+
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        for column in node_attributes:
+            f.write(f'  <key id="n_{column}" for="node" attr.name="{column}" '
+                    f'attr.type="{attribute_types[column]}"/>\n')
+        for column in ('type', 'property', 'edcs_id'):
+            f.write(f'  <key id="e_{column}" for="edge" attr.name="{column}" attr.type="string"/>\n')
+        f.write('  <graph id="G" edgedefault="directed">\n')
+        for row in node_table.itertuples(index=False):
+            values = row._asdict()
+            f.write(f'    <node id="n{values["node_id"]}">')
+            for column in node_attributes:
+                value = values[column]
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    continue
+                f.write(f'<data key="n_{column}">{escape(str(value))}</data>')
+            f.write('</node>\n')
+        type_vocab = network.edge_type_vocab
+        property_vocab = network.edge_property_vocab
+        for edge in edge_ids:
+            f.write(f'    <edge id="e{edge}" source="n{network.sources[edge]}" target="n{network.targets[edge]}">'
+                    f'<data key="e_type">{escape(type_vocab[network.edge_types[edge]])}</data>'
+                    f'<data key="e_property">{escape(property_vocab[network.edge_properties[edge]])}</data>'
+                    f'<data key="e_edcs_id">{escape(network.edge_edcs_ids[edge])}</data>'
+                    '</edge>\n')
+        f.write('  </graph>\n</graphml>\n')
+
+
+def export_network(network, output_dir, output_format='parquet'):
+    """
+    節点（指標付き）と辺の一覧を Parquet または CSV で保存する
+
+    Returns:
+    --------
+    dict
+        表の名前と保存したファイルパス
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    saved = {}
+    for name, table in (('nodes', network.metrics_table()), ('edges', network.edges_table())):
+        path = os.path.join(output_dir, f'{name}.{output_format}')
+        if output_format == 'parquet':
+            table.to_parquet(path, index=False)
+        else:
+            table.to_csv(path, index=False, encoding='utf-8')
+        saved[name] = path
+    return saved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='人物・コミュニティ・関係のネットワークを出力')
+    parser.add_argument('inputs', nargs='+',
+                        help='抽出結果ファイルのパス（JSON配列または .jsonl、複数指定可）')
+    parser.add_argument('--clusters', '-c', type=str, default=None,
+                        help='resolve_persons.py のクラスタファイル（同一人物の節点をまとめる）')
+    parser.add_argument('--merge-communities', action='store_true',
+                        help='正規化名が同じコミュニティを1つの節点にまとめる')
+    parser.add_argument('--output-dir', '-o', type=str, default=None,
+                        help='節点・辺の一覧を保存するディレクトリ')
+    parser.add_argument('--format', '-f', type=str, default='parquet', choices=['parquet', 'csv'],
+                        help='節点・辺の一覧の保存形式（デフォルト: parquet）')
+    parser.add_argument('--graphml', type=str, default=None,
+                        help='GraphML形式で保存するファイルのパス')
+    parser.add_argument('--ego', type=str, default=None,
+                        help='この節点キー（例: EDCS-21000597_person_0）の周辺のみを対象にする')
+    parser.add_argument('--radius', type=int, default=1,
+                        help='--ego の範囲（ステップ数、デフォルト: 1）')
+    parser.add_argument('--top', type=int, default=10,
+                        help='PageRankの上位として表示する節点数（デフォルト: 10）')
+
+    args = parser.parse_args()
+
+    person_clusters = load_person_clusters(args.clusters) if args.clusters else None
+    network = build_social_network(args.inputs, person_clusters=person_clusters,
+                                   merge_communities=args.merge_communities)
+    labels, component_count = network.components()
+    print(f"節点: {len(network)}件（人物 {int((network.nodes['kind'] == 'person').sum())}件）、"
+          f"辺: {len(network.sources)}件、連結成分: {component_count}件")
+
+    if args.ego:
+        members, edge_ids = network.ego_network(network.node_id(args.ego), radius=args.radius)
+        print(f"{args.ego} の周辺（{args.radius}ステップ）: 節点 {len(members)}件、辺 {len(edge_ids)}件")
+        for node in members:
+            row = network.nodes.iloc[node]
+            print(f"  {row['key']} ({row['kind']}): {row['label']}")
+        if args.graphml:
+            write_graphml(network, args.graphml, node_ids=members, edge_ids=edge_ids)
+            print(f"GraphMLを保存: {args.graphml}")
+    else:
+        metrics = network.metrics_table()
+        print(f"\nPageRank 上位{args.top}件:")
+        for row in metrics.nlargest(args.top, 'pagerank').itertuples():
+            print(f"  {row.pagerank:.4f}  {row.key} ({row.kind}): {row.label}  次数 {row.degree}")
+        if args.graphml:
+            write_graphml(network, args.graphml, node_table=metrics)
+            print(f"GraphMLを保存: {args.graphml}")
+
+    if args.output_dir:
+        saved = export_network(network, args.output_dir, output_format=args.format)
+        for name, path in saved.items():
+            print(f"{name}: {path}")
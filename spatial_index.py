@@ -0,0 +1,305 @@
+import argparse
+import math
+import os
+import sqlite3
+
+from record_io import iter_json_records
+from edcs_index import EdcsIndex, record_key
+from edcs_fields import as_float, dating_range
+
+
+SPATIAL_INDEX_SUFFIX = '.spatial.sqlite'
+
+# 座標インデックスの緯度方向のグリッドの幅（度）
+GRID_DEGREES = 0.1
+
+# 緯度1度あたりの距離（km）
+_KM_PER_DEGREE = 111.32
+_EARTH_RADIUS_KM = 6371.0088
+
+
+def spatial_index_path_for(path):
+    """
+    データファイルに対応する空間・年代インデックスファイルのパスを返す
+    """
+    return path + SPATIAL_INDEX_SUFFIX
+
+
+def _index_row(record):
+    """
+    レコードから (EDCS-ID, 緯度, 経度, 年代下限, 年代上限) を取り出す
+
+    抽出結果（original_data を持つ旧形式）と filtered_data のどちらにも対応する。
+    """
+    row = record.get('original_data') or record
+    latitude = as_float(row.get('latitude'))
+    longitude = as_float(row.get('longitude'))
+    if latitude is None or longitude is None or math.isnan(latitude) or math.isnan(longitude):
+        latitude = longitude = None
+    dating = dating_range(row)
+    return (record_key(record), latitude, longitude,
+            dating[0] if dating else None, dating[1] if dating else None)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    2点間の大円距離（km）
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * _EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _radius_bbox(latitude, longitude, radius_km):
+    """
+    中心と半径を含む外接矩形 (min_lon, min_lat, max_lon, max_lat) を返す
+    """
+    dlat = radius_km / _KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(latitude))
+    dlon = 180.0 if cos_lat < 1e-6 else min(radius_km / (_KM_PER_DEGREE * cos_lat), 180.0)
+    return longitude - dlon, latitude - dlat, longitude + dlon, latitude + dlat
+
+
+class SpatialIndex:
+    """
+    JSON/JSONLファイルに対する座標・年代範囲のオンディスクインデックス
+
+    SQLiteのB-treeインデックスを2つ持つ。座標は緯度方向のグリッド（GRID_DEGREES 度ごとの帯）と
+    経度の複合インデックスで、矩形・半径の検索は帯ごとの範囲検索になる。年代は区間の長さを
+    2のべき乗で分類し、分類ごとに dating_from の範囲検索で重なる区間を探す（区間木と同じく
+    結果の件数に比例した時間で検索できる）。EdcsIndex と同様にデータファイルの隣に保存し、
+    データファイルが変わっていれば開くときに作り直す。
+
+    使用例:
+        with SpatialIndex('filtered_data/Uthina/xxx.json') as index:
+            ids = index.query(near=(36.6, 10.18, 5), dating=(100, 200))
+    """
+
+    def __init__(self, path, rebuild=False, records=None):
+        self.path = path
+        self.index_path = spatial_index_path_for(path)
+        self._conn = sqlite3.connect(self.index_path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records (rowid INTEGER PRIMARY KEY, edcs_id TEXT, "
+            "latitude REAL, longitude REAL, lat_cell INTEGER, "
+            "dating_from INTEGER, dating_to INTEGER, span_class INTEGER)")
+        self.refresh(rebuild=rebuild, records=records)
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def refresh(self, rebuild=False, records=None):
+        """
+        データファイルの変更を検出してインデックスを作り直す
+
+        records を渡した場合は、ファイルを読み直さずにそのレコードから作成する
+        （変換直後など、データがメモリにある場合に使う）。
+        """
+        if not os.path.exists(self.path):
+            size, mtime = 0, 0
+        else:
+            stat = os.stat(self.path)
+            size, mtime = stat.st_size, stat.st_mtime_ns
+
+        indexed_size = int(self._meta('size') or -1)
+        indexed_mtime = int(self._meta('mtime_ns') or -1)
+        if records is None and not rebuild and indexed_size == size and indexed_mtime == mtime:
+            return
+
+        # 一括挿入の後にインデックスを作る方が速い
+        self._conn.execute("DROP INDEX IF EXISTS records_geo")
+        self._conn.execute("DROP INDEX IF EXISTS records_dating")
+        self._conn.execute("DELETE FROM records")
+
+        if records is None and size:
+            records = iter_json_records(self.path)
+        rows = []
+        for rowid, record in enumerate(records or []):
+            edcs_id, latitude, longitude, dating_from, dating_to = _index_row(record)
+            lat_cell = None if latitude is None else math.floor(latitude / GRID_DEGREES)
+            span_class = None if dating_from is None else (dating_to - dating_from).bit_length()
+            rows.append((rowid, edcs_id, latitude, longitude, lat_cell, dating_from, dating_to, span_class))
+        self._conn.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self._conn.execute(
+            "CREATE INDEX records_geo ON records (lat_cell, longitude) WHERE lat_cell IS NOT NULL")
+        self._conn.execute(
+            "CREATE INDEX records_dating ON records (span_class, dating_from, dating_to, edcs_id) "
+            "WHERE span_class IS NOT NULL")
+
+        span_classes = sorted({row[7] for row in rows if row[7] is not None})
+        self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                               [('size', str(size)), ('mtime_ns', str(mtime)),
+                                ('span_classes', ','.join(map(str, span_classes)))])
+        self._conn.commit()
+
+    def _query_box(self, min_lon, min_lat, max_lon, max_lat):
+        cells = list(range(math.floor(min_lat / GRID_DEGREES), math.floor(max_lat / GRID_DEGREES) + 1))
+        rows = []
+        # SQLiteのパラメータ数の上限を超えないよう、帯を分けて検索する
+        for start in range(0, len(cells), 500):
+            chunk = cells[start:start + 500]
+            rows.extend(self._conn.execute(
+                "SELECT rowid, edcs_id, latitude, longitude, dating_from, dating_to FROM records "
+                f"WHERE lat_cell IN ({', '.join('?' * len(chunk))}) "
+                "AND longitude BETWEEN ? AND ? AND latitude BETWEEN ? AND ?",
+                chunk + [min_lon, max_lon, min_lat, max_lat]))
+        return rows
+
+    def _query_dating(self, dating_from, dating_to):
+        rows = []
+        span_classes = self._meta('span_classes')
+        for span_class in map(int, span_classes.split(',') if span_classes else []):
+            # この分類の区間の長さは 2^span_class - 1 年以下
+            max_span = (1 << span_class) - 1
+            rows.extend(self._conn.execute(
+                "SELECT rowid, edcs_id FROM records "
+                "WHERE span_class = ? AND dating_from BETWEEN ? AND ? AND dating_to >= ?",
+                (span_class, dating_from - max_span, dating_to, dating_from)))
+        return rows
+
+    def query(self, bbox=None, near=None, dating=None):
+        """
+        条件に合う碑文のEDCS-IDをファイル内の順序で返す
+
+        Parameters:
+        -----------
+        bbox : tuple, optional
+            (min_lon, min_lat, max_lon, max_lat) の矩形
+        near : tuple, optional
+            (緯度, 経度, 半径km) の円
+        dating : tuple, optional
+            (from, to) の年代範囲（年代範囲が重なる碑文を返す）
+
+        Returns:
+        --------
+        list
+            EDCS-IDのリスト（条件を指定しない場合は全件）
+        """
+        if dating is not None:
+            dating = (min(dating), max(dating))
+
+        if bbox is None and near is None:
+            if dating is None:
+                rows = self._conn.execute("SELECT rowid, edcs_id FROM records").fetchall()
+            else:
+                rows = self._query_dating(*dating)
+            return [edcs_id for _, edcs_id in sorted(rows)]
+
+        # 矩形と円の外接矩形の共通部分を帯ごとに検索し、年代と距離は結果に対して判定する
+        boxes = []
+        if bbox is not None:
+            boxes.append(bbox)
+        if near is not None:
+            boxes.append(_radius_bbox(*near))
+        min_lon = max(box[0] for box in boxes)
+        min_lat = max(box[1] for box in boxes)
+        max_lon = min(box[2] for box in boxes)
+        max_lat = min(box[3] for box in boxes)
+        if min_lon > max_lon or min_lat > max_lat:
+            return []
+
+        selected = []
+        for rowid, edcs_id, latitude, longitude, dating_from, dating_to in self._query_box(
+                min_lon, min_lat, max_lon, max_lat):
+            if dating is not None and (dating_from is None or dating_from > dating[1] or dating_to < dating[0]):
+                continue
+            if near is not None and haversine_km(near[0], near[1], latitude, longitude) > near[2]:
+                continue
+            selected.append((rowid, edcs_id))
+        return [edcs_id for _, edcs_id in sorted(selected)]
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def query_edcs_ids(path, bbox=None, near=None, dating=None):
+    """
+    データファイルから条件に合う碑文のEDCS-IDを返す（インデックスは必要に応じて作成）
+    """
+    with SpatialIndex(path) as index:
+        return index.query(bbox=bbox, near=near, dating=dating)
+
+
+def iter_selected_records(path, edcs_ids):
+    """
+    EDCS-IDのレコードを EdcsIndex 経由で1件ずつ読み込む（ファイル全体は読み込まない）
+    """
+    with EdcsIndex(path) as index:
+        for edcs_id in edcs_ids:
+            record = index.get(edcs_id)
+            if record is not None:
+                yield record
+
+
+def add_query_arguments(parser):
+    """
+    --bbox / --near / --dating の引数をパーサーに追加する
+    """
+    parser.add_argument('--bbox', type=float, nargs=4, default=None,
+                        metavar=('MIN_LON', 'MIN_LAT', 'MAX_LON', 'MAX_LAT'),
+                        help='矩形内の碑文のみを対象にする')
+    parser.add_argument('--near', type=float, nargs=3, default=None,
+                        metavar=('LAT', 'LON', 'RADIUS_KM'),
+                        help='中心から半径（km）以内の碑文のみを対象にする')
+    parser.add_argument('--dating', type=int, nargs=2, default=None,
+                        metavar=('FROM', 'TO'),
+                        help='年代範囲が重なる碑文のみを対象にする')
+
+
+def query_from_args(args, path):
+    """
+    コマンドライン引数に空間・年代の条件があればEDCS-IDのリストを、なければ None を返す
+    """
+    if args.bbox is None and args.near is None and args.dating is None:
+        return None
+    edcs_ids = query_edcs_ids(path, bbox=args.bbox, near=args.near, dating=args.dating)
+    print(f"空間・年代の条件に一致: {len(edcs_ids)}件")
+    return edcs_ids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='座標・年代範囲による碑文のインデックスと検索')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='インデックスを作成（または更新）する')
+    build_parser.add_argument('paths', nargs='+', help='データファイルのパス')
+    build_parser.add_argument('--rebuild', action='store_true', help='既存のインデックスを作り直す')
+
+    query_parser = subparsers.add_parser('query', help='条件に合う碑文を取り出す')
+    query_parser.add_argument('path', help='データファイルのパス')
+    add_query_arguments(query_parser)
+    query_parser.add_argument('--output', '-o', type=str, default=None,
+                              help='一致したレコードを書き出すファイルのパス（.json または .jsonl）')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        for path in args.paths:
+            with SpatialIndex(path, rebuild=args.rebuild) as index:
+                print(f"{path}: {len(index)}件 → {index.index_path}")
+    else:
+        edcs_ids = query_edcs_ids(args.path, bbox=args.bbox, near=args.near, dating=args.dating)
+        if args.output:
+            from record_io import write_json_records
+            output_dir = os.path.dirname(args.output)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            write_json_records(args.output, iter_selected_records(args.path, edcs_ids))
+            print(f"{len(edcs_ids)}件を保存: {args.output}")
+        else:
+            for edcs_id in edcs_ids:
+                print(edcs_id)
+            print(f"一致: {len(edcs_ids)}件")
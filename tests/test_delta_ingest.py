@@ -0,0 +1,44 @@
+import json
+
+from create_rdf import create_rdf_graph
+from delta_ingest import rebuild_rdf
+
+
+def _result(edcs_id, evidence, nomen):
+    return {
+        'edcs_id': edcs_id,
+        'persons': [{'person_id': 0, 'person_name': f"{nomen} Felix", 'nomen': nomen, 'cognomen': 'Felix',
+                     'social_status': 'emperor', 'social_status_evidence': evidence}],
+        'communities': [],
+        'person_relationships': [],
+    }
+
+
+def _write(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def test_delta_rebuild_matches_full_rebuild(tmp_path):
+    source_path = tmp_path / 'source.json'
+    source_path.write_text(json.dumps([
+        {'EDCS-ID': f"EDCS-{i}", 'province': 'Numidia', 'place': 'Lambaesis', 'inscription': 'text'}
+        for i in range(1, 4)
+    ]), encoding='utf-8')
+    old_results = tmp_path / 'old.jsonl'
+    new_results = tmp_path / 'new.jsonl'
+    _write(old_results, [_result('EDCS-1', 'Had]rian[i', 'Aelius'), _result('EDCS-2', 'Traianus', 'Ulpius'),
+                         _result('EDCS-3', 'Antoninus', 'Aurelius')])
+    # EDCS-1 を削除し、EDCS-2 を変更する
+    _write(new_results, [_result('EDCS-2', 'Traianus Augustus', 'Ulpius'), _result('EDCS-3', 'Antoninus', 'Aurelius')])
+
+    delta_path = tmp_path / 'delta.nt'
+    full_path = tmp_path / 'full.nt'
+    create_rdf_graph(str(old_results), str(delta_path), format='nt', source_path=str(source_path))
+    rebuild_rdf(str(delta_path), str(new_results), str(source_path), ['EDCS-1', 'EDCS-2'])
+    create_rdf_graph(str(new_results), str(full_path), format='nt', source_path=str(source_path))
+
+    delta_lines = delta_path.read_text(encoding='utf-8').splitlines()
+    assert len(delta_lines) == len(set(delta_lines))
+    assert sorted(delta_lines) == sorted(full_path.read_text(encoding='utf-8').splitlines())
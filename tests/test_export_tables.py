@@ -0,0 +1,21 @@
+import json
+
+import pyarrow.parquet as pq
+
+from export_tables import export_tables
+
+
+def test_oldest_format_person_and_has_career(tmp_path):
+    results_path = tmp_path / 'results.jsonl'
+    results_path.write_text('\n'.join(json.dumps(record) for record in [
+        {'edcs_id': 'EDCS-1', 'person_name': 'C Aurelius Honoratus', 'has_career': True,
+         'career_path': [{'position': 'decurio', 'order': 1}]},
+        {'edcs_id': 'EDCS-2', 'person_name': 'Unknown', 'career_path': []},
+        {'edcs_id': 'EDCS-3', 'persons': [{'person_id': 0, 'person_name': 'X', 'has_career': False,
+                                           'career_path': [{'position': 'miles', 'order': 1}]}]},
+    ]), encoding='utf-8')
+    export_tables([str(results_path)], str(tmp_path / 'out'))
+
+    persons = pq.read_table(tmp_path / 'out' / 'persons.parquet').to_pylist()
+    assert [(person['person_key'], person['has_career']) for person in persons] == [
+        ('EDCS-1_person_0', True), ('EDCS-3_person_0', False)]
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import pytest
+
+from extract_career_graph import call_llm_streaming
+from llm_stream import StreamAborted
+
+
+class _GeminiStream:
+    def __init__(self, texts):
+        self._texts = texts
+        self.cancelled = False
+
+    def __iter__(self):
+        for text in self._texts:
+            if self.cancelled:
+                return
+            yield SimpleNamespace(parts=[text] if text else [], text=text)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def _gemini_client(stream):
+    class Response:
+        _iterator = stream
+
+        def __iter__(self):
+            return iter(stream)
+
+    model = SimpleNamespace(generate_content=lambda prompt, generation_config, stream: Response())
+    return SimpleNamespace(GenerativeModel=lambda name: model,
+                           types=SimpleNamespace(GenerationConfig=lambda **kwargs: kwargs))
+
+
+def test_gemini_stream_is_cancelled_when_json_completes():
+    stream = _GeminiStream(['', '{"persons": []}', ' trailing text'])
+    assert call_llm_streaming('prompt', 'gemini', _gemini_client(stream)) == '{"persons": []}'
+    assert stream.cancelled
+
+
+def test_gemini_stream_is_cancelled_on_schema_violation():
+    stream = _GeminiStream(['[{"persons": []}]'])
+    with pytest.raises(StreamAborted):
+        call_llm_streaming('prompt', 'gemini', _gemini_client(stream))
+    assert stream.cancelled
@@ -0,0 +1,16 @@
+import pytest
+
+from llm_stream import IncrementalJSONScanner, StreamAborted
+
+
+def test_scanner_skips_preamble_with_brackets():
+    text = 'Here is the result [JSON]:\n```json\n{"persons": [], "communities": []}\n```'
+    scanner = IncrementalJSONScanner()
+    assert scanner.feed(text)
+    assert text[scanner.start:scanner.end] == '{"persons": [], "communities": []}'
+
+
+def test_scanner_rejects_top_level_array():
+    with pytest.raises(StreamAborted) as excinfo:
+        IncrementalJSONScanner().feed('  [{"persons": []}]')
+    assert excinfo.value.reason == 'schema'
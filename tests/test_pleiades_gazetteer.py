@@ -0,0 +1,39 @@
+from pleiades_gazetteer import PleiadesGazetteer, PleiadesMatcher
+
+
+def _gazetteer():
+    gazetteer = PleiadesGazetteer([])
+    # 別名の完全一致の地点（約23km離れている）と類似名の地点（約1km）
+    gazetteer.add('1', 'Thuburbo Maius', 36.2, 9.9)
+    gazetteer.add('2', 'Thuburbo Maiorus', 36.4, 9.9)
+    return gazetteer
+
+
+def test_exact_name_beats_nearer_fuzzy_candidate():
+    assert _gazetteer().match('Thuburbo Maius / Thuburbo Maiorum', 36.41, 9.9) == '1'
+
+
+def test_distance_breaks_ties_between_equal_names():
+    gazetteer = _gazetteer()
+    gazetteer.add('3', 'Thuburbo Maius', 36.4, 9.9)
+    assert gazetteer.match('Thuburbo Maius', 36.41, 9.9) == '3'
+
+
+def test_matcher_counts_only_gazetteer_matches():
+    matcher = PleiadesMatcher(_gazetteer(), {'Uthina': '324835'})
+    assert matcher.lookup('Uthina') == '324835'
+    assert matcher.lookup('Thuburbo Maius', 36.21, 9.9) == '1'
+    assert matcher.lookup('Karthago', 36.85, 10.3) is None
+    assert matcher.matched == {'Thuburbo Maius'}
+    assert len(matcher.resolved) == 2
+
+
+def test_miss_without_coordinates_is_retried_with_coordinates():
+    gazetteer = _gazetteer()
+    gazetteer.add('3', 'Thuburbo Maius', 36.4, 9.9)
+    matcher = PleiadesMatcher(gazetteer)
+    # 同名の地点が2つあるため、座標がなければ決められない
+    assert matcher.lookup('Thuburbo Maius') is None
+    assert matcher.unresolved == {'Thuburbo Maius'}
+    assert matcher.lookup('Thuburbo Maius', 36.41, 9.9) == '3'
+    assert matcher.unresolved == set()
@@ -0,0 +1,20 @@
+import pytest
+
+from career_model import Inscription
+from record_io import ResultWriter, iter_json_records
+
+
+@pytest.mark.parametrize('suffix', ['.json', '.jsonl'])
+@pytest.mark.parametrize('record_type', [None, Inscription])
+def test_replace_keeps_latest_result_in_place(tmp_path, suffix, record_type):
+    path = str(tmp_path / f"results{suffix}")
+    writer = ResultWriter(path, record_type=record_type)
+    writer.append({'edcs_id': 'EDCS-1', 'persons': [], 'notes': 'old'})
+    writer.append({'edcs_id': 'EDCS-2', 'persons': []})
+    writer.replace({'edcs_id': 'EDCS-1', 'persons': [], 'notes': 'new'})
+    writer.close()
+
+    assert list(iter_json_records(path)) == [
+        {'edcs_id': 'EDCS-1', 'persons': [], 'notes': 'new'},
+        {'edcs_id': 'EDCS-2', 'persons': []},
+    ]
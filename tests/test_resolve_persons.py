@@ -0,0 +1,40 @@
+from resolve_persons import DEFAULT_THRESHOLD, resolve_persons, score_pair
+
+
+def _mention(edcs_id, praenomen='', nomen='iulius', cognomen='felix', dating=(100, 150)):
+    return {
+        'edcs_id': edcs_id, 'person_id': 0, 'person_name': 'x', 'label': 'x',
+        'praenomen': praenomen, 'nomen': nomen, 'cognomen': cognomen, 'normalized': '',
+        'qid': '', 'gender': '', 'dating': dating,
+    }
+
+
+def test_nomen_cognomen_and_dating_reach_default_threshold():
+    score = score_pair(_mention('EDCS-1', praenomen='quintus'), _mention('EDCS-2'))
+    assert score == 0.8
+    assert score >= DEFAULT_THRESHOLD
+
+
+def test_duo_nomina_bridge_links_mention_without_praenomen():
+    mentions = [_mention('EDCS-1', praenomen='quintus'), _mention('EDCS-2')]
+    assert resolve_persons(mentions) == [[0, 1]]
+
+
+def test_bridge_does_not_link_conflicting_praenomina():
+    mentions = [_mention('EDCS-1', praenomen='quintus'), _mention('EDCS-2', praenomen='marcus')]
+    assert resolve_persons(mentions) == []
+
+
+def test_bridge_does_not_chain_conflicting_praenomina():
+    mentions = [_mention('EDCS-1', praenomen='caius'), _mention('EDCS-2'), _mention('EDCS-3', praenomen='marcus')]
+    clusters = resolve_persons(mentions)
+    assert len(clusters) == 1
+    assert sorted(clusters[0]) in ([0, 1], [1, 2])
+
+
+def test_undated_mentions_need_more_than_matching_names():
+    mentions = [_mention('EDCS-1', praenomen='caius', dating=None), _mention('EDCS-2', praenomen='caius', dating=None)]
+    assert score_pair(*mentions) == 0.85
+    assert resolve_persons(mentions) == []
+    mentions = [dict(mention, qid='Q1405') for mention in mentions]
+    assert resolve_persons(mentions) == [[0, 1]]
@@ -0,0 +1,24 @@
+import json
+
+from career_schema import SOCIAL_STATUSES
+from extraction_prompt import _SOCIAL_STATUS_LABELS
+from validate_career_graph import validate_file
+
+
+def test_social_statuses_match_prompt_labels():
+    labels = {line.split('"')[1] for line in _SOCIAL_STATUS_LABELS.splitlines() if line.startswith('  - "')}
+    assert SOCIAL_STATUSES == labels
+
+
+def test_compact_result_uses_source_text(tmp_path):
+    source_path = tmp_path / 'source.json'
+    source_path.write_text(json.dumps([
+        {'EDCS-ID': 'EDCS-1', 'inscription': 'Caius Aurelius Honoratus decurio flamen perpetuus ob merita'},
+    ]), encoding='utf-8')
+    results_path = tmp_path / 'a_career.jsonl'
+    results_path.write_text(json.dumps({'edcs_id': 'EDCS-1', 'persons': []}) + '\n', encoding='utf-8')
+
+    assert validate_file(str(results_path))[2] == []
+    _, count, violations = validate_file(str(results_path), source_path=str(source_path))
+    assert count == 1
+    assert violations[0]['issues'] == ["碑文テキストがあるのに人物が抽出されていません"]
@@ -0,0 +1,220 @@
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from career_schema import SOCIAL_STATUSES, validate_result
+from edcs_index import EdcsIndex
+from record_io import iter_json_records, write_json_records
+
+
+# career_graphs 以下で検査する抽出結果ファイル（*_career.json / *_career.jsonl、圧縮も可）
+CAREER_FILE_RE = re.compile(r'_career\.jsonl?(\.gz|\.zst)?$')
+
+_SKIP_NAMES = {'Parse Error', 'Error'}
+
+
+def find_career_files(paths):
+    """
+    ファイルとディレクトリ（再帰的に探す）から抽出結果ファイルのパスを集める
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names) if CAREER_FILE_RE.search(name))
+        else:
+            files.append(path)
+    return files
+
+
+def _normalized(result):
+    """
+    旧形式（main_persons、source_person_index など）の結果を create_rdf.py と同じ解釈で新形式に揃える
+    """
+    persons = result.get('persons')
+    relationships = result.get('person_relationships')
+    if persons and relationships is not None:
+        return result
+    result = dict(result)
+    if not persons:
+        result['persons'] = [dict(person, person_id=idx)
+                             for idx, person in enumerate(result.get('main_persons') or [])]
+    if relationships is None:
+        relationships = []
+        for rel_item in result.get('relationships') or []:
+            rel_item = dict(rel_item)
+            if rel_item.get('source_person_id') is None:
+                rel_item['source_person_id'] = rel_item.get('source_person_index', 0)
+            if rel_item.get('target_person_id') is None:
+                rel_item['target_person_id'] = rel_item.get('target_person_index')
+            relationships.append(rel_item)
+        result['person_relationships'] = relationships
+    return result
+
+
+def check_result(result, source_row=None):
+    """
+    1件の抽出結果の参照整合性と統制語彙を検査し、問題点のリストを返す
+
+    career_schema.validate_result の検査（出力形式、position_type などの語彙、
+    person_id / community_id の参照）に加えて、social_status の語彙と、人物ごとの
+    career_path の order の重複・欠落（create_rdf.py で経歴のURIが衝突する）を検査する。
+    碑文テキストは original_data から、なければ source_row（元データの行）から取る。
+    """
+    result = _normalized(result)
+    persons = result.get('persons')
+    row = result.get('original_data') or source_row or {}
+    if not persons:
+        # 人物のない結果は、十分な長さの碑文テキストがある場合のみ問題とする
+        return validate_result(result, row.get('inscription') or '')
+    if any(isinstance(person, dict) and person.get('person_name') in _SKIP_NAMES for person in persons):
+        return ["抽出に失敗した結果です"]
+
+    issues = validate_result(result, row.get('inscription') or '')
+    if not isinstance(persons, list) or not all(isinstance(person, dict) for person in persons):
+        return issues
+
+    for person in persons:
+        person_id = person.get('person_id')
+        social_status = person.get('social_status')
+        if social_status and social_status not in SOCIAL_STATUSES:
+            issues.append(f"語彙外のsocial_status: {social_status}")
+        orders = Counter()
+        for position in person.get('career_path') or []:
+            order = position.get('order')
+            if order is None or order == '':
+                issues.append(f"order のない経歴があります（person_id {person_id}）")
+            else:
+                orders[order] += 1
+        duplicated = sorted(str(order) for order, count in orders.items() if count > 1)
+        if duplicated:
+            issues.append(f"career_path の order が重複しています（person_id {person_id}）: {', '.join(duplicated)}")
+    return [issue for issue in issues if issue]
+
+
+def validate_file(path, source_path=None):
+    """
+    抽出結果ファイルを1件ずつ読んで検査する（プロセスプールの各ワーカーで実行する）
+
+    Parameters:
+    -----------
+    path : str
+        抽出結果ファイルのパス
+    source_path : str, optional
+        元データ（filtered_data）のファイルパス（コンパクト形式の結果の碑文テキストを参照する）
+
+    Returns:
+    --------
+    tuple
+        (ファイルパス, 検査した結果の件数, 問題のあった結果のリスト)
+    """
+    count = 0
+    violations = []
+    source_index = EdcsIndex(source_path) if source_path else None
+    try:
+        for result in iter_json_records(path):
+            count += 1
+            source_row = None
+            if source_index is not None and not result.get('original_data'):
+                source_row = source_index.get(result.get('edcs_id'))
+            issues = check_result(result, source_row)
+            if issues:
+                violations.append({'path': path, 'edcs_id': result.get('edcs_id'), 'issues': issues})
+    finally:
+        if source_index is not None:
+            source_index.close()
+    return path, count, violations
+
+
+def issue_kind(issue):
+    """
+    問題点の種類（集計用に値の部分を除いたもの）
+    """
+    return re.sub(r'（person_id [^）]*）', '', issue.split(':', 1)[0])
+
+
+def validate_files(paths, workers=None, source_path=None):
+    """
+    複数の抽出結果ファイルを並列に検査する
+
+    Parameters:
+    -----------
+    paths : list
+        抽出結果ファイルのパス
+    workers : int, optional
+        プロセス数（指定しない場合はCPU数。1の場合は同じプロセスで順に検査する）
+    source_path : str, optional
+        元データ（filtered_data）のファイルパス（コンパクト形式の結果の碑文テキストを参照する）
+
+    Yields:
+    -------
+    tuple
+        validate_file の戻り値（ファイルの順）
+    """
+    if source_path:
+        # 各ワーカーが同時にインデックスを作らないよう、先に作成・更新しておく
+        EdcsIndex(source_path).close()
+    validate = partial(validate_file, source_path=source_path)
+    workers = min(workers or os.cpu_count() or 1, len(paths) or 1)
+    if workers == 1:
+        for path in paths:
+            yield validate(path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(validate, paths)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='抽出結果の参照整合性と統制語彙を検査する')
+    parser.add_argument('paths', nargs='*', default=['career_graphs'],
+                        help='抽出結果ファイルまたはディレクトリ（デフォルト: career_graphs）')
+    parser.add_argument('--source', '-s', type=str, default=None,
+                        help='元データ（filtered_data）のファイルパス（コンパクト形式の結果で碑文テキストを参照）')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='並列に検査するプロセス数（デフォルト: CPU数）')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='問題のあった碑文と問題点を保存するファイル（.jsonl を推奨）')
+    parser.add_argument('--show', type=int, default=20,
+                        help='表示する問題のあった碑文の件数（デフォルト: 20）')
+
+    args = parser.parse_args()
+
+    files = find_career_files(args.paths)
+    if not files:
+        print("抽出結果ファイルが見つかりません")
+        sys.exit(2)
+
+    start = time.perf_counter()
+    total = 0
+    all_violations = []
+    kinds = Counter()
+    for path, count, violations in validate_files(files, workers=args.workers, source_path=args.source):
+        total += count
+        all_violations.extend(violations)
+        for violation in violations:
+            kinds.update(issue_kind(issue) for issue in violation['issues'])
+        print(f"{path}: {count}件中 {len(violations)}件に問題")
+    elapsed = time.perf_counter() - start
+
+    for violation in all_violations[:args.show]:
+        print(f"  {violation['edcs_id']}: {'; '.join(violation['issues'])}")
+    if len(all_violations) > args.show:
+        print(f"  ...ほか {len(all_violations) - args.show}件")
+
+    print("\n" + "=" * 80)
+    print(f"検査した結果: {total}件（{len(files)}ファイル、{elapsed:.2f}秒）")
+    print(f"問題のあった結果: {len(all_violations)}件")
+    for kind, count in kinds.most_common():
+        print(f"  {kind}: {count}件")
+
+    if args.output:
+        write_json_records(args.output, all_violations)
+        print(f"問題点を保存: {args.output}")
+
+    sys.exit(1 if all_violations else 0)